@@ -1,42 +1,61 @@
 import streamlit as st
-import anthropic
-import pandas as pd
-import io
+import os
 import time
+import hashlib
+import importlib.util
+import uuid
+from functools import partial
+
+from seo_engine import (
+    DEFAULT_GUIDELINES,
+    DEFAULT_TEMPLATE,
+    EXPORT_FORMATS,
+    TokenUsage,
+    brief_cache_key,
+    brief_filename,
+    build_export,
+    get_brief_prefetcher,
+    get_brief_store,
+    get_client_registry,
+    get_job_queue,
+    get_model_router,
+    get_response_cache,
+    get_telemetry,
+    request_brief,
+    request_brief_by_sections,
+    request_many_strategies,
+    request_strategies,
+)
+from seo_engine.budget import estimate_tokens
+from seo_engine.config import (
+    CANNIBALIZATION_THRESHOLD,
+    NOVELTY_THRESHOLD,
+    PROMPT_TOKEN_BUDGET,
+    STRATEGY_MAX_TITLES,
+    STREAM_REFRESH_SECONDS,
+)
+from seo_engine.jobs import ACTIVE_STATUSES
 
 # ============================================================================
-# CONTEXT CONSTANTS
+# UI SETTINGS
 # ============================================================================
 
-DEFAULT_GUIDELINES = """AUDIENCE: [Define your target audience here]
-TONE: [Define tone: Informative, Casual, Professional, etc.]
-CONTENT FOCUS: [What topics or themes to prioritize]
-CONSTRAINTS: [What to avoid or exclude]
-MANDATORY ELEMENTS: [Required angles, comparisons, or frameworks]
-GOALS: [SEO goals, conversion goals, etc.]"""
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
 
-DEFAULT_TEMPLATE = """## Metadatos
-- Target Audience: [Target]
-- Tone: [Tone]
-- Goal: [Specific SEO Goal]
+DEFAULT_BRIEF_CONCURRENCY = 5
+MAX_BRIEF_CONCURRENCY = 10
 
-## Article Structure
-- H1: [Title]
-- Slug URL: [slug]
-- Intent: [Intent]
-- Meta Title / Description: [...]
+JOB_POLL_SECONDS = 1.0
+RECENT_JOBS_SHOWN = 5
 
-## Content Outline (Detailed)
-- H2: [Topic]
-  - Key points to cover...
-  - Analogies to use...
-- H2: [Topic]...
+BRIEFS_PER_PAGE = 10
+KEYWORD_CONFLICTS_SHOWN = 20
 
-## Keywords Table
-- Keyword | Volume | Notes
-
-## LLM Optimization Notes
-- Instructions on how to write the content (transitions, structure, etc.)."""
+DEFAULT_PREFETCH_BUDGET = 3
+PREFETCH_POLICIES = {
+    "keep": "Keep unused briefs in the cache",
+    "discard": "Discard unused briefs"
+}
 
 # ============================================================================
 # PAGE CONFIGURATION
@@ -52,104 +71,17 @@ st.set_page_config(
 # CSS STYLING: CLEAN LIGHT THEME
 # ============================================================================
 
-st.markdown("""
-<style>
-    /* 1. FUENTE GLOBAL */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap');
-    html, body, [class*="css"], .stApp { font-family: 'Inter', sans-serif; }
-
-    /* 2. FONDO PRINCIPAL (BLANCO PURO) */
-    .stApp {
-        background-color: #ffffff !important;
-        color: #111827 !important;
-    }
-
-    /* 3. BARRA LATERAL */
-    [data-testid="stSidebar"] {
-        background-color: #f8f9fa !important;
-        border-right: 1px solid #e5e7eb;
-    }
-
-    /* 4. TEXTOS DE LA BARRA LATERAL */
-    [data-testid="stSidebar"] h1,
-    [data-testid="stSidebar"] h2,
-    [data-testid="stSidebar"] h3,
-    [data-testid="stSidebar"] p,
-    [data-testid="stSidebar"] label,
-    [data-testid="stSidebar"] span,
-    [data-testid="stSidebar"] div {
-        color: #111827 !important;
-    }
-
-    /* 5. CAJAS DESPLEGABLES */
-    .streamlit-expanderHeader {
-        background-color: #ffffff !important;
-        color: #111827 !important;
-        border: 1px solid #e5e7eb !important;
-        border-radius: 6px !important;
-    }
-    .streamlit-expanderHeader:hover {
-        border-color: #cbd5e1 !important;
-        color: #000000 !important;
-    }
-    .streamlit-expanderHeader svg {
-        fill: #111827 !important;
-    }
-
-    /* 6. INPUTS */
-    .stTextInput input, .stTextArea textarea {
-        background-color: #ffffff !important;
-        color: #111827 !important;
-        border: 1px solid #d1d5db !important;
-        border-radius: 6px !important;
-    }
-    .stTextInput input:focus, .stTextArea textarea:focus {
-        border-color: #6366f1 !important;
-        box-shadow: 0 0 0 1px #6366f1 !important;
-    }
-
-    /* 7. SUBIR ARCHIVOS */
-    [data-testid="stFileUploader"] section {
-        background-color: #ffffff !important;
-        border: 1px dashed #d1d5db !important;
-    }
-    [data-testid="stFileUploader"] span, [data-testid="stFileUploader"] small {
-        color: #4b5563 !important;
-    }
-
-    /* 8. BOTONES */
-    .stButton > button {
-        background: linear-gradient(135deg, #4f46e5 0%, #7c3aed 100%) !important;
-        color: white !important;
-        border: none !important;
-        border-radius: 8px !important;
-        font-weight: 600 !important;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1) !important;
-    }
-    .stButton > button:hover {
-        transform: translateY(-1px);
-        box-shadow: 0 4px 6px rgba(0,0,0,0.1) !important;
-    }
-
-    /* 9. TARJETAS */
-    .strategy-card, .result-card {
-        background-color: #ffffff;
-        border: 1px solid #e5e7eb;
-        border-radius: 10px;
-        padding: 1.5rem;
-        box-shadow: 0 1px 3px rgba(0,0,0,0.05);
-    }
-
-    /* 10. TÍTULOS */
-    h1 {
-        color: #111827 !important;
-        font-weight: 800 !important;
-    }
-    .main h2, .main h3 {
-        color: #374151 !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource
+def load_static_asset(name):
+    """Read a file from static/ once per server process.
+
+    Streamlit drops elements a rerun does not re-emit, so the styles and header
+    are still sent every rerun; only reading and building them is done once.
+    """
+    with open(os.path.join(STATIC_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+st.markdown(f"<style>\n{load_static_asset('styles.css')}</style>", unsafe_allow_html=True)
 
 # ============================================================================
 # INITIALIZE SESSION STATE
@@ -161,29 +93,56 @@ if "generated_strategies" not in st.session_state:
 if "selected_strategies" not in st.session_state:
     st.session_state.selected_strategies = []
 
-if "generated_briefs" not in st.session_state:
-    st.session_state.generated_briefs = {}
+if "strategy_details" not in st.session_state:
+    st.session_state.strategy_details = {}
+
+brief_store = get_brief_store()
+
+if "brief_handles" not in st.session_state:
+    # Brief text lives in the brief store; the session keeps {title: {size, created_at}} handles. The store id
+    # is kept in the URL so a refreshed page, or a restarted server, finds its briefs again.
+    st.session_state.brief_session_id = st.query_params.get("session") or uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.brief_session_id
+    st.session_state.brief_handles = brief_store.handles(st.session_state.brief_session_id)
+
+if "prefetched_briefs" not in st.session_state:
+    st.session_state.prefetched_briefs = {}
+
+if "last_run_usage" not in st.session_state:
+    st.session_state.last_run_usage = None
+
+if "upload_hashes" not in st.session_state:
+    st.session_state.upload_hashes = {}
+
+if "active_brief_job" not in st.session_state:
+    st.session_state.active_brief_job = st.query_params.get("job")
+    st.session_state.brief_job_synced_at = 0.0
+    st.session_state.brief_job_errors = []
 
 # ============================================================================
 # HELPER FUNCTIONS - FILE PROCESSING
 # ============================================================================
 
+@st.cache_data(max_entries=16, show_spinner=False)
+def parse_titles_file(content_hash, file_name, _data):
+    """Titles from an uploaded file, memoised by content hash so reruns never re-parse it."""
+    # Imported on first upload: the file readers load pandas.
+    from seo_engine import parse_titles
+    return parse_titles(_data, file_name)
+
 def load_titles_from_file(uploaded_file):
     if uploaded_file is None:
         return []
-    try:
-        if uploaded_file.name.endswith('.csv'):
-            df = pd.read_csv(uploaded_file)
-        elif uploaded_file.name.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(uploaded_file)
-        else:
-            st.error("Unsupported file format. Please use CSV or Excel.")
-            return []
-
-        if len(df.columns) > 0:
-            titles = df.iloc[:, 0].dropna().astype(str).tolist()
-            return [title.strip() for title in titles if title.strip()]
+    if not uploaded_file.name.endswith(('.csv', '.xlsx', '.xls')):
+        st.error("Unsupported file format. Please use CSV or Excel.")
         return []
+    try:
+        # Hash each upload once; later reruns look the hash up by Streamlit's file id.
+        content_hash = st.session_state.upload_hashes.get(uploaded_file.file_id)
+        if content_hash is None:
+            content_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+            st.session_state.upload_hashes = {uploaded_file.file_id: content_hash}
+        return parse_titles_file(content_hash, uploaded_file.name, uploaded_file.getvalue())
     except Exception as e:
         st.error(f"Error reading file: {e}")
         return []
@@ -222,147 +181,283 @@ def combine_guidelines(file_content, manual_content):
         combined.append(manual_content.strip())
     return "\n\n".join(combined)
 
+# ============================================================================
+# HELPER FUNCTIONS - TITLE INDEX
+# ============================================================================
+
+@st.cache_resource(max_entries=8)
+def get_title_index(titles_hash, _titles):
+    """Build the index once per distinct title list (keyed by its content hash)."""
+    from seo_engine import TitleIndex
+    return TitleIndex(_titles)
+
 # ============================================================================
 # HELPER FUNCTIONS - AI CLIENT
 # ============================================================================
 
+response_cache = get_response_cache()
+client_registry = get_client_registry()
+brief_prefetcher = get_brief_prefetcher()
+job_queue = get_job_queue()
+telemetry = get_telemetry()
+model_router = get_model_router()
+
 def get_anthropic_client(api_key_input):
-    """Verify and return Anthropic client with user API key."""
+    """Verify and return a pooled Anthropic client for the user (or server) API key."""
     if api_key_input and api_key_input.strip():
         try:
-            return anthropic.Anthropic(api_key=api_key_input.strip())
+            return client_registry.get(api_key_input.strip())
         except Exception as e:
             st.error(f"Error with provided API key: {e}")
             return None
     try:
         api_key = st.secrets["anthropic"]["api_key"]
         if api_key and api_key != "your-anthropic-api-key-here":
-            return anthropic.Anthropic(api_key=api_key)
+            return client_registry.get(api_key)
     except Exception:
         pass
     st.warning("⚠️ Please enter your Anthropic API Key in the Settings section of the sidebar.")
     st.stop()
     return None
 
-def generate_strategies(existing_titles, guidelines, api_key_input):
+def generate_strategies(existing_titles, guidelines, api_key_input, use_cache=True, on_title=None, usage=None,
+                        title_index=None, novelty_threshold=NOVELTY_THRESHOLD, on_duplicate=None):
     """Generate 10 new content strategy titles based strictly on user guidelines."""
     client = get_anthropic_client(api_key_input)
     if not client:
         return []
 
-    prompt = f"""You are an expert SEO strategist.
-
-EXISTING TITLES (to avoid repetition):
-{existing_titles if existing_titles.strip() else "None provided"}
-
-STRATEGIC GUIDELINES:
-{guidelines}
-
-Your task: Generate EXACTLY 10 new article titles based STRICTLY on the "STRATEGIC GUIDELINES" provided above.
-
-Constraints:
-1. The titles must appeal specifically to the AUDIENCE defined in the guidelines.
-2. Adopt the TONE defined in the guidelines completely.
-3. Avoid repeating themes from existing titles.
-4. If the guidelines mention specific topics, keywords, or constraints, follow them precisely.
-
-Format your response as a numbered list (1-10) with ONLY the titles, one per line.
-Do not include any additional explanation or commentary."""
-
     try:
-        message = client.messages.create(
-            model="claude-3-haiku-20240307",
-            max_tokens=1024,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
+        return request_strategies(
+            client, existing_titles, guidelines, use_cache=use_cache, on_title=on_title, usage=usage,
+            title_index=title_index, novelty_threshold=novelty_threshold, on_duplicate=on_duplicate
         )
-
-        response_text = message.content[0].text
-        titles = [line.strip() for line in response_text.split('\n') if line.strip() and line.strip()[0].isdigit()]
-
-        cleaned_titles = []
-        for title in titles:
-            cleaned = title.split('.', 1)[-1].split(')', 1)[-1].strip()
-            if cleaned:
-                cleaned_titles.append(cleaned)
-
-        return cleaned_titles[:10]
-
     except Exception as e:
         st.error(f"Error generating strategies: {e}")
         return []
 
-def generate_brief(title, template, guidelines, api_key_input):
-    """Generate a full content brief strictly following user guidelines and template."""
+def generate_many_strategies(existing_titles, guidelines, api_key_input, count, use_cache=True, usage=None,
+                             title_index=None, novelty_threshold=NOVELTY_THRESHOLD, on_duplicate=None):
+    """Generate count ranked titles with parallel shard requests; returns {title, score, shard, ...} dicts."""
     client = get_anthropic_client(api_key_input)
     if not client:
-        return ""
-
-    prompt = f"""You are an expert SEO content strategist creating detailed content briefs.
-
-ARTICLE TITLE:
-{title}
-
-STRATEGIC GUIDELINES:
-{guidelines}
-
-BRIEF TEMPLATE STRUCTURE TO FOLLOW:
-{template}
-
-Your task: Create a comprehensive content brief for this article that STRICTLY follows the template structure provided above.
-
-Requirements:
-1. Fill in ALL sections from the template.
-2. Target Audience & Tone: Must match the STRATEGIC GUIDELINES provided exactly.
-3. Create a detailed content outline with multiple H2 sections.
-4. Provide a keywords table relevant to the specific topic.
-5. Add LLM optimization notes on how to write this content based on the guidelines.
-6. Follow all constraints and requirements specified in the guidelines.
-
-Generate a complete, actionable brief that a writer or LLM can use to create high-quality content."""
+        return []
 
     try:
-        message = client.messages.create(
-            model="claude-3-haiku-20240307",
-            max_tokens=4096,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
+        return request_many_strategies(
+            client, existing_titles, guidelines, count, use_cache=use_cache, usage=usage,
+            title_index=title_index, novelty_threshold=novelty_threshold, on_duplicate=on_duplicate
         )
+    except Exception as e:
+        st.error(f"Error generating strategies: {e}")
+        return []
 
-        return message.content[0].text
+def generate_brief(title, template, guidelines, api_key_input, use_cache=True, on_text=None, usage=None,
+                   by_sections=False):
+    """Generate a full content brief strictly following user guidelines and template, on the manual_brief route."""
+    client = get_anthropic_client(api_key_input)
+    if not client:
+        return ""
 
+    try:
+        if by_sections:
+            return request_brief_by_sections(
+                client, title, template, guidelines, use_cache, on_text, usage, route="manual_brief"
+            )
+        return request_brief(client, title, template, guidelines, use_cache, on_text, usage, route="manual_brief")
     except Exception as e:
         st.error(f"Error generating brief: {e}")
         return ""
 
+def submit_brief_job(titles, template, guidelines, api_key_input, max_workers, use_cache=True, use_batches=False,
+                     prefetched=None, by_sections=False):
+    """Queue a background brief job and return its id (None without a client)."""
+    client = get_anthropic_client(api_key_input)
+    if not client:
+        return None
+    return job_queue.submit(
+        client, titles, template, guidelines, max_workers, use_cache=use_cache, use_batches=use_batches,
+        prefetched=prefetched, by_sections=by_sections
+    )
+
+def attach_brief_job(job_id):
+    """Follow a background job in this session; the id is kept in the URL so a refresh reattaches."""
+    st.session_state.active_brief_job = job_id
+    st.session_state.brief_job_synced_at = 0.0
+    st.session_state.brief_job_errors = []
+    st.query_params["job"] = job_id
+
+def detach_brief_job():
+    st.session_state.active_brief_job = None
+    st.query_params.pop("job", None)
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_brief_job(show_live):
+    """Copy the attached job's finished briefs into the session and show its progress.
+
+    Reruns on its own every JOB_POLL_SECONDS, and reruns the whole app once the job ends.
+    """
+    job_id = st.session_state.active_brief_job
+    job = job_queue.get(job_id) if job_id else None
+    if job is None:
+        detach_brief_job()
+        return
+
+    arrived = []
+    for title, brief, error, finished_at, stats in job_queue.results(job_id, since=st.session_state.brief_job_synced_at):
+        if error:
+            st.session_state.brief_job_errors.append((title, error))
+        else:
+            st.session_state.brief_handles[title] = brief_store.put(
+                st.session_state.brief_session_id, title, brief, {"generated_at": finished_at, **(stats or {})}
+            )
+            arrived.append((title, brief))
+        st.session_state.brief_job_synced_at = finished_at
+    if arrived and "keyword_index" in st.session_state:
+        st.session_state.keyword_index.add_many(arrived)
+
+    finished = job["done"] + job["failed"]
+    if job["status"] not in ACTIVE_STATUSES:
+        st.session_state.last_run_usage = job["usage"]
+        detach_brief_job()
+        if job["status"] == "done":
+            st.toast(f"✅ {job['done']} briefs generated" + (f", {job['failed']} failed" if job["failed"] else ""))
+        elif job["status"] == "failed":
+            st.toast(f"❌ Brief job failed: {job['error']}")
+        else:
+            st.toast(f"⏹️ Brief job {job['status']} after {finished}/{job['total']} briefs")
+        st.rerun()
+
+    st.progress(finished / max(1, job["total"]))
+    progress_col, cancel_col = st.columns([3, 1])
+    with progress_col:
+        if job["status"] == "queued":
+            st.caption("⏳ Waiting for a free worker...")
+        else:
+            st.caption(f"✍️ {finished}/{job['total']} briefs done" + (f", {job['failed']} failed" if job["failed"] else ""))
+    with cancel_col:
+        if st.button("⏹️ Cancel", key=f"cancel_{job_id}", use_container_width=True):
+            job_queue.cancel(job_id)
+
+    if show_live:
+        for title, text in job_queue.partial_briefs(job_id).items():
+            with st.expander(f"✍️ {title}", expanded=job["total"] == 1):
+                st.markdown(text)
+
+def prefetch_key(title, template, guidelines, by_sections):
+    """BriefPrefetcher key of a title's brief; briefs written by sections get their own keys."""
+    key = brief_cache_key(title, template, guidelines)
+    return f"sections:{key}" if by_sections else key
+
+def claim_prefetched_briefs(titles, policy, template=None, guidelines=None, by_sections=False):
+    """Hand over this session's prefetched futures for titles and apply policy to the rest.
+
+    A prefetched brief is only handed over if it was requested with the
+    current template, guidelines and section setting; one prefetched with
+    inputs that changed since is treated as unused. With the "keep" policy
+    unused briefs stay in the response cache for later reuse; with "discard"
+    they are cancelled or deleted from it.
+    """
+    claimed = {}
+    for title, key in st.session_state.prefetched_briefs.items():
+        if title in titles and key == prefetch_key(title, template, guidelines, by_sections):
+            future = brief_prefetcher.take(key)
+            if future is not None:
+                claimed[title] = future
+        elif policy == "discard":
+            brief_prefetcher.discard(key)
+        else:
+            brief_prefetcher.take(key)
+    st.session_state.prefetched_briefs = {}
+    return claimed
+
+class MarkdownStreamer:
+    """Collects streamed text and repaints a placeholder at most every STREAM_REFRESH_SECONDS."""
+
+    def __init__(self, placeholder):
+        self.placeholder = placeholder
+        self.chunks = []
+        self._painted_at = 0.0
+
+    def __call__(self, chunk):
+        self.chunks.append(chunk)
+        if time.monotonic() - self._painted_at >= STREAM_REFRESH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        self.placeholder.markdown("".join(self.chunks))
+        self._painted_at = time.monotonic()
+
+def get_keyword_index():
+    """This session's KeywordIndex, read from the brief store once and then updated as briefs arrive."""
+    if "keyword_index" not in st.session_state:
+        from seo_engine.keywords import KeywordIndex
+        index = KeywordIndex()
+        records = brief_store.records(st.session_state.brief_session_id, list(st.session_state.brief_handles))
+        index.add_many((record["title"], record["brief"]) for record in records)
+        st.session_state.keyword_index = index
+    return st.session_state.keyword_index
+
+def export_all_briefs(session_id, titles, fmt):
+    """The bytes of an EXPORT_FORMATS export of a session's briefs; called only when Download All is clicked."""
+    with build_export(brief_store.records(session_id, titles), fmt) as f:
+        return f.read()
+
+@st.fragment
+def show_brief_list():
+    """The generated briefs, BRIEFS_PER_PAGE at a time.
+
+    A fragment, so filtering, paging and opening briefs rerun only this list.
+    A brief's text is only loaded from the brief store and sent to the browser
+    while it is open, and download buttons load it when clicked.
+    """
+    session_id = st.session_state.brief_session_id
+    briefs = st.session_state.brief_handles
+    if len(briefs) > BRIEFS_PER_PAGE:
+        query = st.text_input(
+            "Filter briefs", placeholder="🔎 Filter by title...", key="brief_filter", label_visibility="collapsed",
+            on_change=lambda: st.session_state.update(brief_page=1)
+        )
+        titles = [title for title in briefs if query.strip().lower() in title.lower()]
+    else:
+        titles = list(briefs)
+
+    pages = max(1, (len(titles) + BRIEFS_PER_PAGE - 1) // BRIEFS_PER_PAGE)
+    if st.session_state.get("brief_page", 1) > pages:
+        st.session_state.brief_page = pages
+    page = st.number_input("Page", min_value=1, max_value=pages, key="brief_page") if pages > 1 else 1
+    start = (page - 1) * BRIEFS_PER_PAGE
+    shown = titles[start:start + BRIEFS_PER_PAGE]
+    if pages > 1 or len(titles) < len(briefs):
+        st.caption(f"Showing {start + 1}-{start + len(shown)} of {len(titles)} briefs" if shown else "No briefs match")
+
+    for title in shown:
+        title_col, download_col = st.columns([5, 1])
+        with title_col:
+            is_open = st.toggle(f"📄 {title}", key=f"open_brief_{title}")
+        with download_col:
+            st.download_button(
+                label="📥",
+                data=lambda title=title: brief_store.get(session_id, title) or "",
+                file_name=brief_filename(title),
+                mime="text/markdown",
+                on_click="ignore",
+                help="Download as Markdown",
+                key=f"btn_{title}"
+            )
+        if is_open:
+            content = brief_store.get(session_id, title)
+            with st.container(border=True):
+                if content is None:
+                    st.warning("This brief is no longer stored on the server. Generate it again to see it.")
+                else:
+                    st.markdown(content)
+
 # ============================================================================
 # MAIN APP INTERFACE - HEADER
 # ============================================================================
 
-st.markdown("""
-<div style='text-align: center; padding: 2rem 0 1rem 0;'>
-    <div style='display: inline-flex; align-items: center; gap: 1rem; margin-bottom: 1rem;'>
-        <div style='font-size: 3.5rem; filter: drop-shadow(0 4px 12px rgba(102, 126, 234, 0.3));'>
-            💎
-        </div>
-        <h1 style='font-size: 2.8rem; margin: 0; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); -webkit-background-clip: text; -webkit-text-fill-color: transparent; font-weight: 800; letter-spacing: -1px;'>
-            SEO Strategy Planner
-        </h1>
-    </div>
-    <p style='font-size: 1.15rem; color: #6b7280; margin-top: 0.5rem; font-weight: 500;'>
-        AI-Powered Content Strategy Generator
-    </p>
-    <div style='display: flex; justify-content: center; gap: 1.5rem; margin-top: 1rem; font-size: 0.9rem; color: #9ca3af;'>
-        <span>⚡ Claude Haiku</span>
-        <span>•</span>
-        <span>🎯 SEO Optimized</span>
-        <span>•</span>
-        <span>📊 Data-Driven</span>
-    </div>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(load_static_asset("header.html"), unsafe_allow_html=True)
 
 st.markdown("---")
 
@@ -381,6 +476,78 @@ with st.sidebar:
             help="Enter your Anthropic API key"
         )
 
+        brief_concurrency = st.slider(
+            "Parallel brief requests",
+            min_value=1,
+            max_value=MAX_BRIEF_CONCURRENCY,
+            value=DEFAULT_BRIEF_CONCURRENCY,
+            help="How many briefs are generated at the same time"
+        )
+
+        bypass_cache = st.checkbox(
+            "Bypass response cache",
+            value=False,
+            help="Always call the API, even if an identical request was answered before"
+        )
+        use_batches = st.checkbox(
+            "Use Message Batches API",
+            value=False,
+            help="Half the price for large lists, but briefs arrive only when the batch ends "
+                 "(usually within an hour, up to 24 hours) and are not streamed"
+        )
+        write_by_sections = st.checkbox(
+            "Write brief sections in parallel",
+            value=False,
+            disabled=use_batches,
+            help="Generate each ## section of the template at the same time, then assemble them. "
+                 "Much faster per brief on long templates, at the cost of a few more API calls"
+        )
+        stream_responses = st.checkbox(
+            "Stream responses",
+            value=True,
+            help="Show titles and briefs while they are being written"
+        )
+        prefetch_briefs = st.checkbox(
+            "Prefetch briefs while titles stream",
+            value=False,
+            help="Start writing briefs for the first titles in the background before you select them"
+        )
+        prefetch_budget = st.number_input(
+            "Titles to prefetch",
+            min_value=1,
+            max_value=10,
+            value=DEFAULT_PREFETCH_BUDGET,
+            disabled=not prefetch_briefs,
+            help="Briefs are prefetched for the first N generated titles"
+        )
+        prefetch_policy = st.selectbox(
+            "Unselected prefetched briefs",
+            options=list(PREFETCH_POLICIES),
+            format_func=PREFETCH_POLICIES.get,
+            disabled=not prefetch_briefs
+        )
+        cache_stats = response_cache.stats()
+        st.caption(
+            f"🗄️ Cache: {cache_stats['entries']} responses ({cache_stats['bytes'] / 1024:.0f} KB) · "
+            f"{cache_stats['hits']} hits / {cache_stats['misses']} misses"
+        )
+        scheduler_stats = client_registry.scheduler_stats()
+        if any(stats["completed"] or stats["throttled"] for stats in scheduler_stats):
+            st.caption(
+                f"🚦 Scheduler: concurrency limit {min(stats['limit'] for stats in scheduler_stats):.1f} · "
+                f"{sum(stats['throttled'] for stats in scheduler_stats)} throttled · "
+                f"{sum(stats['retries'] for stats in scheduler_stats)} retries"
+            )
+        last_usage = st.session_state.last_run_usage
+        if last_usage and last_usage["calls"]:
+            st.caption(
+                f"🧮 Last run ({last_usage['calls']} calls): "
+                f"{last_usage['cache_read_input_tokens']:,} prompt-cache read / "
+                f"{last_usage['cache_creation_input_tokens']:,} written / "
+                f"{last_usage['input_tokens']:,} uncached input · "
+                f"{last_usage['output_tokens']:,} output tokens"
+            )
+
     with st.expander("📂 Source Data", expanded=True):
         st.markdown("**Existing Titles**")
         st.caption("Upload a file or paste titles manually to avoid repetition")
@@ -404,6 +571,15 @@ with st.sidebar:
         if all_titles:
             st.success(f"✅ {len(all_titles)} unique titles loaded")
 
+        novelty_threshold = st.slider(
+            "Near-duplicate threshold",
+            min_value=0.5,
+            max_value=1.0,
+            value=NOVELTY_THRESHOLD,
+            step=0.05,
+            help="Generated titles at least this similar to an existing title are replaced"
+        )
+
     with st.expander("🧠 Strategic Guidelines", expanded=False):
         st.markdown("**Content Strategy Guidelines**")
         st.caption("Upload guidelines or edit the default template")
@@ -423,6 +599,12 @@ with st.sidebar:
 
         file_guidelines = load_guidelines_from_file(guidelines_file) if guidelines_file else ""
         final_guidelines = combine_guidelines(file_guidelines, manual_guidelines)
+        guideline_tokens = estimate_tokens(final_guidelines)
+        if guideline_tokens > PROMPT_TOKEN_BUDGET // 2:
+            st.caption(
+                f"📏 About {guideline_tokens:,} tokens. Prompts over {PROMPT_TOKEN_BUDGET:,} tokens are compacted: "
+                "repeated lines are dropped first, then the guidelines are shortened."
+            )
 
     with st.expander("📝 Brief Template", expanded=False):
         st.markdown("**Content Brief Structure**")
@@ -434,6 +616,86 @@ with st.sidebar:
             help="This template structure will be used for generating content briefs"
         )
 
+    with st.expander("📊 Metrics", expanded=False):
+        metrics = telemetry.summary()
+        st.caption(f"API usage of this server since {time.strftime('%d %b %H:%M', time.localtime(metrics['since']))}")
+        calls_col, cost_col = st.columns(2)
+        calls_col.metric("API calls", f"{metrics['api_calls']:,}", help=f"{metrics['cached']:,} more answered from the response cache")
+        cost_col.metric("Est. cost", f"${metrics['cost_usd']:.4f}")
+        errors_col, retries_col = st.columns(2)
+        errors_col.metric("Errors", sum(metrics["errors"].values()))
+        retries_col.metric("Retries", metrics["retries"])
+
+        latency_rows = []
+        for kind, stats in metrics["by_kind"].items():
+            for name, label in (("ttft", "First token"), ("latency", "Total")):
+                if name in stats:
+                    latency_rows.append({
+                        "Call": f"{kind} · {label}",
+                        **{quantile: f"{seconds:.2f}s" for quantile, seconds in stats[name].items()}
+                    })
+        if latency_rows:
+            import pandas as pd
+            st.dataframe(pd.DataFrame(latency_rows).set_index("Call"), use_container_width=True)
+
+        route_rows = [
+            {
+                "Route": row["route"],
+                "Model": ("▶️ " if row["active"] else "") + row["model"],
+                "Calls": row["calls"],
+                "Success": f"{row['success_rate']:.0%}",
+                "p95": f"{row['latency_p95']:.2f}s" if row["latency_p95"] is not None else "-",
+                "Within SLO": f"{row['within_slo']:.0%} ≤ {row['slo_seconds']:g}s" if row["slo_seconds"] else "-",
+            }
+            for row in model_router.stats() if row["calls"]
+        ]
+        if route_rows:
+            st.caption("🔀 Model routes (last few minutes; ▶️ marks the model each route uses now)")
+            st.dataframe(route_rows, hide_index=True, use_container_width=True)
+
+        tokens = metrics["tokens"]
+        st.caption(
+            f"🧮 Tokens: {tokens['input_tokens']:,} input · {tokens['cache_read_input_tokens']:,} cache read · "
+            f"{tokens['cache_creation_input_tokens']:,} cache write · {tokens['output_tokens']:,} output"
+        )
+        estimates = metrics["token_estimates"]
+        if estimates["ratio"]:
+            st.caption(
+                f"📏 Input estimate: {estimates['estimated']:,} estimated vs {estimates['actual']:,} billed "
+                f"(×{estimates['ratio']:.2f})",
+                help="Set SEO_PLANNER_TOKEN_ESTIMATE_SCALE to calibrate the local token estimate"
+            )
+        if metrics["compactions"]:
+            st.caption("✂️ Compacted to fit the prompt budget: " + ", ".join(
+                f"{block} ×{counts['count']}" for block, counts in metrics["compactions"].items()
+            ))
+        if metrics["hedges"]:
+            st.caption("🪞 Hedged: " + ", ".join(
+                f"{kind} ×{counts['hedged']} ({counts['won']} won by the duplicate)"
+                for kind, counts in metrics["hedges"].items()
+            ), help="Calls slow to start answering got a duplicate request (SEO_PLANNER_HEDGE_MAX_RATE)")
+        if metrics["abandoned_cost_usd"]:
+            st.caption(
+                f"🗑️ Cancelled requests: ${metrics['abandoned_cost_usd']:.4f} of the cost",
+                help="Hedge losers and calls past their deadline, billed for what they used before being cancelled"
+            )
+        if metrics["errors"]:
+            st.caption("⚠️ " + ", ".join(f"{name}: {count}" for name, count in metrics["errors"].items()))
+
+        export_col, reset_col = st.columns(2)
+        with export_col:
+            st.download_button(
+                "📥 Prometheus",
+                data=telemetry.prometheus_text,
+                file_name="seo_planner_metrics.prom",
+                mime="text/plain",
+                use_container_width=True
+            )
+        with reset_col:
+            if st.button("🔄 Reset", key="reset_metrics", use_container_width=True):
+                telemetry.reset()
+                st.rerun()
+
 # ============================================================================
 # MAIN CONTENT AREA - TWO TABS
 # ============================================================================
@@ -446,27 +708,94 @@ tab1, tab2 = st.tabs(["🚀 Strategy Generator", "✍️ Manual Brief Creator"])
 
 with tab1:
     st.markdown("### Generate AI-Powered Content Strategies")
-    st.markdown("Generate 10 article titles based on your guidelines, then select titles to create detailed briefs.")
+    st.markdown("Generate article titles based on your guidelines, then select titles to create detailed briefs.")
 
     col1, col2 = st.columns([1, 1], gap="large")
 
     with col1:
         st.markdown("#### Step 1: Generate Strategy Ideas")
 
-        if st.button("🎲 Generate 10 New Strategies", use_container_width=True, type="primary", key="gen_strategies"):
-            existing_titles_str = "\n".join(all_titles) if all_titles else ""
+        strategy_count = st.number_input(
+            "Number of titles",
+            min_value=10,
+            max_value=STRATEGY_MAX_TITLES,
+            value=10,
+            step=10,
+            help="More than 10 titles are generated by several parallel requests, each covering one subtopic "
+                 "or content level of your guidelines, then deduplicated and ranked by priority"
+        )
+
+        if st.button(f"🎲 Generate {strategy_count} New Strategies", use_container_width=True, type="primary", key="gen_strategies"):
+            context_titles = []
+            title_index = None
+            if all_titles:
+                from seo_engine import titles_fingerprint
+                title_index = get_title_index(titles_fingerprint(all_titles), all_titles)
+                context_titles = title_index.select_context(final_guidelines)
+            existing_titles_str = "\n".join(context_titles)
 
             with st.status("Generating strategies...", expanded=True) as status:
                 st.write("🔍 Analyzing existing content...")
+                if len(context_titles) < len(all_titles):
+                    st.write(
+                        f"📚 Using the {len(context_titles)} of {len(all_titles)} existing titles "
+                        "most relevant to your guidelines"
+                    )
                 st.write("🤖 Consulting Claude Haiku...")
                 st.write("✨ Generating unique titles based on your guidelines...")
 
-                strategies = generate_strategies(existing_titles_str, final_guidelines, api_key_input)
+                claim_prefetched_briefs([], prefetch_policy)
+                streamed_titles = []
+
+                def on_title(title):
+                    streamed_titles.append(title)
+                    if stream_responses:
+                        st.write(f"{len(streamed_titles)}. {title}")
+                    if prefetch_briefs and len(streamed_titles) <= prefetch_budget:
+                        client = get_anthropic_client(api_key_input)
+                        key = prefetch_key(title, brief_template, final_guidelines, write_by_sections)
+                        brief_prefetcher.submit(
+                            key, request_brief_by_sections if write_by_sections else request_brief,
+                            client, title, brief_template, final_guidelines, not bypass_cache
+                        )
+                        st.session_state.prefetched_briefs[title] = key
+
+                run_usage = TokenUsage()
+                details = {}
+                if strategy_count > 10:
+                    st.write(f"🧩 Splitting the plan into subtopics and generating {strategy_count} titles in parallel...")
+                    duplicates = []
+                    ranked = generate_many_strategies(
+                        existing_titles_str, final_guidelines, api_key_input, strategy_count,
+                        use_cache=not bypass_cache,
+                        usage=run_usage,
+                        title_index=title_index,
+                        novelty_threshold=novelty_threshold,
+                        on_duplicate=duplicates.append
+                    )
+                    if duplicates:
+                        st.write(f"♻️ Dropped {len(duplicates)} near-duplicate titles")
+                    details = {item["title"]: item for item in ranked}
+                    strategies = list(details)
+                else:
+                    strategies = generate_strategies(
+                        existing_titles_str, final_guidelines, api_key_input,
+                        use_cache=not bypass_cache,
+                        on_title=on_title if stream_responses or prefetch_briefs else None,
+                        usage=run_usage,
+                        title_index=title_index,
+                        novelty_threshold=novelty_threshold,
+                        on_duplicate=lambda title: st.write(f"♻️ Replacing near-duplicate: {title}")
+                    )
+                st.session_state.last_run_usage = run_usage.summary()
 
                 if strategies:
                     st.session_state.generated_strategies = strategies
+                    st.session_state.strategy_details = details
                     st.session_state.selected_strategies = []
-                    st.session_state.generated_briefs = {}
+                    brief_store.delete(st.session_state.brief_session_id)
+                    st.session_state.brief_handles = {}
+                    st.session_state.pop("keyword_index", None)
                     status.update(label="✅ Generation complete!", state="complete")
                 else:
                     status.update(label="❌ Generation failed", state="error")
@@ -491,11 +820,29 @@ with tab1:
                 </div>
                 """, unsafe_allow_html=True)
 
+                detail = st.session_state.strategy_details.get(title)
+                if detail:
+                    keyword = f" · 🔑 {detail['primary_keyword']}" if detail["primary_keyword"] else ""
+                    st.caption(f"⭐ {detail['score']}/10 · {detail['shard']}{keyword}")
+
+                prefetched_key = st.session_state.prefetched_briefs.get(title)
+                prefetch_future = brief_prefetcher.peek(prefetched_key) if prefetched_key else None
+                if prefetch_future is not None and prefetch_future.done() and not prefetch_future.exception():
+                    st.caption("⚡ Brief ready")
+
                 is_checked = st.checkbox(f"Select this title", key=f"strategy_{idx}", label_visibility="collapsed")
                 if is_checked:
                     selected.append(title)
 
             st.session_state.selected_strategies = selected
+
+            # Briefs for titles that were deselected are no longer wanted.
+            active_job = job_queue.get(st.session_state.active_brief_job) if st.session_state.active_brief_job else None
+            if active_job and active_job["status"] in ACTIVE_STATUSES and any(
+                title in st.session_state.generated_strategies and title not in selected
+                for title in active_job["titles"]
+            ):
+                job_queue.cancel(active_job["id"])
             if selected:
                 st.success(f"✅ {len(selected)} title(s) selected for brief generation")
 
@@ -504,38 +851,53 @@ with tab1:
 
         if st.session_state.selected_strategies:
             if st.button(f"📄 Generate Briefs ({len(st.session_state.selected_strategies)})", type="primary", use_container_width=True, key="gen_briefs"):
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-
-                for i, title in enumerate(st.session_state.selected_strategies):
-                    status_text.text(f"✍️ Writing brief for: {title}...")
-                    brief = generate_brief(title, brief_template, final_guidelines, api_key_input)
-
-                    if brief:
-                        st.session_state.generated_briefs[title] = brief
-
-                    progress_bar.progress((i + 1) / len(st.session_state.selected_strategies))
-
-                status_text.success("✅ All briefs generated successfully!")
-                time.sleep(1)
-                status_text.empty()
-                progress_bar.empty()
-                st.rerun()
-
-        if st.session_state.generated_briefs:
+                titles_to_generate = list(st.session_state.selected_strategies)
+                prefetched = claim_prefetched_briefs(
+                    titles_to_generate, prefetch_policy, brief_template, final_guidelines, write_by_sections
+                )
+                job_id = submit_brief_job(
+                    titles_to_generate, brief_template, final_guidelines, api_key_input, brief_concurrency,
+                    use_cache=not bypass_cache, use_batches=use_batches, prefetched=prefetched,
+                    by_sections=write_by_sections
+                )
+                if job_id:
+                    attach_brief_job(job_id)
+
+        if st.session_state.active_brief_job:
+            show_brief_job(stream_responses and not use_batches)
+        else:
+            recent_jobs = [
+                job for job in job_queue.list_jobs(limit=RECENT_JOBS_SHOWN)
+                if job["status"] in ACTIVE_STATUSES or job["done"] or job["status"] == "interrupted"
+            ]
+            if recent_jobs:
+                with st.expander("🗂️ Background jobs", expanded=any(job["status"] in ACTIVE_STATUSES for job in recent_jobs)):
+                    st.caption("Jobs keep running when you refresh or close the page. Follow one to load its briefs here.")
+                    for job in recent_jobs:
+                        job_col, action_col = st.columns([3, 1])
+                        with job_col:
+                            st.markdown(
+                                f"**{job['label']}** · {job['status']} · {job['done']}/{job['total']} done · "
+                                f"{time.strftime('%d %b %H:%M', time.localtime(job['created_at']))}"
+                            )
+                        with action_col:
+                            if job["status"] == "interrupted":
+                                if st.button("▶️ Resume", key=f"resume_{job['id']}", use_container_width=True):
+                                    client = get_anthropic_client(api_key_input)
+                                    if client and job_queue.resume(job["id"], client):
+                                        attach_brief_job(job["id"])
+                                        st.rerun()
+                            elif st.button("🔗 Follow", key=f"follow_{job['id']}", use_container_width=True):
+                                attach_brief_job(job["id"])
+                                st.rerun()
+
+        for title, error in st.session_state.brief_job_errors:
+            st.error(f"Error generating brief for '{title}': {error}")
+
+        if st.session_state.brief_handles:
             st.markdown("---")
             st.markdown("#### 📂 Your Content Briefs")
-            for title, content in st.session_state.generated_briefs.items():
-                with st.expander(f"📄 {title}", expanded=False):
-                    st.download_button(
-                        label=f"📥 Download '{title[:20]}...'",
-                        data=content,
-                        file_name=f"{title.replace(' ', '_')[:50]}.md",
-                        mime="text/markdown",
-                        key=f"btn_{title}"
-                    )
-                    st.markdown("---")
-                    st.markdown(content)
+            show_brief_list()
         elif not st.session_state.selected_strategies:
             st.info("👈 Select strategies from Step 1 to generate briefs")
 
@@ -560,26 +922,47 @@ with tab2:
                 st.write("🤖 Consulting Claude Haiku...")
                 st.write("✍️ Creating detailed content brief...")
 
-                brief = generate_brief(manual_title.strip(), brief_template, final_guidelines, api_key_input)
+                result_area = st.empty()
+                streamer = None
+                if stream_responses:
+                    with result_area.container():
+                        st.markdown("---")
+                        st.markdown("### 📄 Generated Brief")
+                        st.markdown(f"**Title:** {manual_title}")
+                        download_slot = st.empty()
+                        st.markdown("---")
+                        streamer = MarkdownStreamer(st.empty())
+
+                run_usage = TokenUsage()
+                brief = generate_brief(
+                    manual_title.strip(), brief_template, final_guidelines, api_key_input,
+                    use_cache=not bypass_cache, on_text=streamer, usage=run_usage, by_sections=write_by_sections
+                )
+                st.session_state.last_run_usage = run_usage.summary()
 
                 if brief:
                     status.update(label="✅ Brief generated!", state="complete")
-                    st.markdown("---")
-                    st.markdown("### 📄 Generated Brief")
-                    st.markdown(f"**Title:** {manual_title}")
-
-                    st.download_button(
+                    if streamer:
+                        streamer.flush()
+                    else:
+                        with result_area.container():
+                            st.markdown("---")
+                            st.markdown("### 📄 Generated Brief")
+                            st.markdown(f"**Title:** {manual_title}")
+                            download_slot = st.empty()
+                            st.markdown("---")
+                            st.markdown(brief)
+
+                    download_slot.download_button(
                         label="📥 Download Brief (Markdown)",
                         data=brief,
-                        file_name=f"{manual_title.replace(' ', '_')[:50]}.md",
+                        file_name=brief_filename(manual_title),
                         mime="text/markdown",
                         use_container_width=True,
                         key="manual_download"
                     )
-
-                    st.markdown("---")
-                    st.markdown(brief)
                 else:
+                    result_area.empty()
                     status.update(label="❌ Generation failed", state="error")
         else:
             st.warning("⚠️ Please enter a title first")
@@ -588,41 +971,78 @@ with tab2:
 # RESULTS DISPLAY (for Tab 1)
 # ============================================================================
 
-if st.session_state.generated_briefs:
+if st.session_state.brief_handles:
     st.markdown("---")
     st.markdown("## 📊 Generated Content Briefs Summary")
 
     col_exp1, col_exp2, col_exp3 = st.columns([1, 1, 2])
     with col_exp1:
-        st.metric("Total Briefs", len(st.session_state.generated_briefs))
+        st.metric("Total Briefs", len(st.session_state.brief_handles))
+    # Parquet needs pyarrow, which Streamlit normally brings along.
+    export_formats = [fmt for fmt in EXPORT_FORMATS if fmt != "parquet" or importlib.util.find_spec("pyarrow")]
     with col_exp2:
-        if len(st.session_state.generated_briefs) > 0:
-            df = pd.DataFrame([
-                {"Title": title, "Brief": brief}
-                for title, brief in st.session_state.generated_briefs.items()
-            ])
-            csv = df.to_csv(index=False)
-            st.download_button(
-                label="📥 Download All (CSV)",
-                data=csv,
-                file_name="content_briefs.csv",
-                mime="text/csv",
-                use_container_width=True,
-                key="download_all_csv"
+        export_format = st.selectbox(
+            "Export format", export_formats, format_func=lambda fmt: EXPORT_FORMATS[fmt][0], key="export_format"
+        )
+    with col_exp3:
+        _, extension, mime, _ = EXPORT_FORMATS[export_format]
+        st.download_button(
+            label="📥 Download All",
+            data=partial(
+                export_all_briefs, st.session_state.brief_session_id, list(st.session_state.brief_handles),
+                export_format
+            ),
+            file_name=f"content_briefs{extension}",
+            mime=mime,
+            on_click="ignore",
+            use_container_width=True,
+            help="Built when you click, with each brief's generation time and token usage",
+            key="download_all"
+        )
+
+    keyword_index = get_keyword_index()
+    conflicts = keyword_index.conflicts()
+    contested = keyword_index.contested_keywords()
+    shown_conflicts = conflicts[:KEYWORD_CONFLICTS_SHOWN]
+    shown_keywords = contested[:KEYWORD_CONFLICTS_SHOWN]
+    if conflicts:
+        st.warning(
+            f"🔀 {len(conflicts)} pairs of briefs share at least {CANNIBALIZATION_THRESHOLD:.0%} of their keywords "
+            "and may compete for the same searches"
+        )
+    elif len(keyword_index) > 1:
+        st.caption("🔀 No keyword cannibalization between briefs")
+    if conflicts or contested:
+        with st.expander(f"🔀 Keyword overlap ({len(contested)} keywords in more than one brief)"):
+            if conflicts:
+                st.markdown("**Conflicting briefs**")
+                st.dataframe(
+                    {
+                        "Brief": [conflict["titles"][0] for conflict in shown_conflicts],
+                        "Competes with": [conflict["titles"][1] for conflict in shown_conflicts],
+                        "Overlap": [f"{conflict['score']:.0%}" for conflict in shown_conflicts],
+                        "Shared keywords": [", ".join(conflict["keywords"]) for conflict in shown_conflicts],
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
+            st.markdown("**Keywords targeted by several briefs**")
+            st.dataframe(
+                {
+                    "Keyword": [item["keyword"] for item in shown_keywords],
+                    "Briefs": [item["briefs"] for item in shown_keywords],
+                    "Volume": [item["volume"] for item in shown_keywords],
+                    "Titles": [", ".join(item["titles"]) for item in shown_keywords],
+                },
+                hide_index=True,
+                use_container_width=True
             )
+            if max(len(conflicts), len(contested)) > KEYWORD_CONFLICTS_SHOWN:
+                st.caption(f"Showing the top {KEYWORD_CONFLICTS_SHOWN}")
 
 # ============================================================================
 # FOOTER
 # ============================================================================
 
 st.markdown("---")
-st.markdown("""
-<div style='text-align: center; color: #888; font-size: 0.9rem; padding: 1rem 0;'>
-    <p>
-        SEO Strategy Planner | Powered by
-        <a href='https://www.anthropic.com/' target='_blank' style='color: #666; text-decoration: none;'>
-            Claude Haiku
-        </a>
-    </p>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(load_static_asset("footer.html"), unsafe_allow_html=True)
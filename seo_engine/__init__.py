@@ -0,0 +1,58 @@
+"""Streamlit-free generation engine behind the SEO Strategy Planner.
+
+The Streamlit app (app.py) and the batch command line (python -m seo_engine)
+are both thin layers over these functions.
+
+Names are exported lazily: a submodule is imported the first time one of its
+names is used, so importing the package does not load the Anthropic SDK,
+pandas or numpy before something needs them.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "batches": ("request_briefs_in_batches", "submit_brief_batches", "summarize_batches"),
+    "budget": ("PromptBudgetError", "estimate_tokens", "fit_to_budget"),
+    "cache": ("ResponseCache", "get_response_cache", "set_response_cache"),
+    "clients": ("ClientRegistry", "get_client_registry"),
+    "corpus": ("NoveltyFilter", "TitleIndex", "clean_titles", "parse_titles", "read_titles", "titles_fingerprint"),
+    "generation": (
+        "BriefPrefetcher",
+        "TokenUsage",
+        "brief_cache_key",
+        "build_message_request",
+        "create_completion",
+        "get_brief_prefetcher",
+        "plan_strategy_shards",
+        "request_brief",
+        "request_brief_by_sections",
+        "request_briefs_concurrently",
+        "request_many_strategies",
+        "request_strategies",
+    ),
+    "export": ("EXPORT_FORMATS", "brief_filename", "build_export", "export_briefs"),
+    "hedging": ("Hedger", "get_hedger", "set_hedger"),
+    "jobs": ("JobQueue", "get_job_queue"),
+    "keywords": ("KeywordIndex", "parse_keyword_table"),
+    "prompts": ("DEFAULT_GUIDELINES", "DEFAULT_TEMPLATE", "split_template_sections"),
+    "store": ("BriefStore", "get_brief_store"),
+    "routing": ("ModelRouter", "get_model_router", "set_model_router"),
+    "scheduler": (
+        "CallCancelledError", "DeadlineExceededError", "RequestScheduler", "StreamInterruptedError", "TokenBucket"
+    ),
+    "telemetry": ("Telemetry", "call_cost", "get_telemetry"),
+}
+_MODULE_OF = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_MODULE_OF)
+
+def __getattr__(name):
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,231 @@
+"""Brief generation through the Message Batches API.
+
+A Message Batch is processed asynchronously, usually within an hour and at
+most within 24 hours, at half the price of the same synchronous calls. That
+suits large offline jobs where nobody is waiting for the first brief.
+
+Briefs are submitted with exactly the parameters request_brief would send, so
+batch results land in the same response-cache entries, and every item that
+does not come back succeeded (errored, expired, cancelled or missing from the
+results) is retried with an ordinary request.
+
+Callers that outlive the process, like the CLI, can persist the ids of the
+submitted batches (on_submit/on_finish) and hand them back on the next run
+(resume), which polls those batches again instead of paying for the same
+briefs twice.
+"""
+
+import time
+
+from .cache import get_response_cache
+from .clients import get_client_registry
+from .config import (
+    BATCH_MAX_REQUESTS,
+    BATCH_POLL_BACKOFF,
+    BATCH_POLL_INITIAL_SECONDS,
+    BATCH_POLL_MAX_SECONDS,
+    BATCH_RETRY_WORKERS,
+    BRIEF_MAX_TOKENS,
+    STREAM_REFRESH_SECONDS,
+)
+from .generation import (
+    TokenUsage,
+    brief_cache_key,
+    build_message_request,
+    fit_brief_inputs,
+    message_text,
+    request_briefs_concurrently,
+)
+from .prompts import build_brief_prompt
+from .routing import get_model_router
+from .telemetry import get_telemetry
+
+REQUEST_COUNT_FIELDS = ("processing", "succeeded", "errored", "canceled", "expired")
+
+def summarize_batches(batches):
+    """Totals of the request counts of several MessageBatch objects, plus how many have ended."""
+    summary = {"batches": len(batches), "ended": 0, **dict.fromkeys(REQUEST_COUNT_FIELDS, 0)}
+    for batch in batches:
+        summary["ended"] += batch.processing_status == "ended"
+        for field in REQUEST_COUNT_FIELDS:
+            summary[field] += getattr(batch.request_counts, field)
+    return summary
+
+def read_results(results, telemetry):
+    """The items of a batch's results download, up to the point where the download fails, if it does.
+
+    A failed download is recorded in the telemetry as a "batch_results" error;
+    only errors raised while reading are caught, not those of the caller.
+    """
+    items = iter(results)
+    while True:
+        try:
+            item = next(items)
+        except StopIteration:
+            return
+        except Exception as e:
+            telemetry.record("batch_results", "", status="error", error=e)
+            return
+        yield item
+
+def submit_brief_batches(client, titles, template, guidelines, max_requests=BATCH_MAX_REQUESTS, on_submit=None):
+    """Create Message Batches of at most max_requests briefs each.
+
+    Returns (batch, titles_by_custom_id) pairs; custom ids are only unique
+    within their batch. on_submit(batch_id, requests) is called as soon as each
+    batch exists, with requests mapping its custom ids to the title and the
+    response-cache key of each brief.
+    """
+    scheduler = get_client_registry().scheduler_for(client)
+    response_cache = get_response_cache()
+    template, guidelines = fit_brief_inputs(template, guidelines)
+    router = get_model_router()
+    model, max_tokens = router.policy("brief")["model"], router.max_tokens("brief", BRIEF_MAX_TOKENS)
+    submitted = []
+    for start in range(0, len(titles), max_requests):
+        chunk = titles[start:start + max_requests]
+        titles_by_id = {}
+        keys = {}
+        requests = []
+        for offset, title in enumerate(chunk):
+            custom_id = f"brief-{start + offset}"
+            system, prompt = build_brief_prompt(title, template, guidelines)
+            titles_by_id[custom_id] = title
+            keys[custom_id] = response_cache.make_key(model, system, prompt, max_tokens)
+            params = build_message_request(prompt, max_tokens, system, model=model)
+            requests.append({"custom_id": custom_id, "params": params})
+        batch = scheduler.call(lambda: client.messages.batches.create(requests=requests))
+        if on_submit:
+            on_submit(batch.id, {
+                custom_id: {"title": title, "key": keys[custom_id]} for custom_id, title in titles_by_id.items()
+            })
+        submitted.append((batch, titles_by_id))
+    return submitted
+
+def request_briefs_in_batches(client, titles, template, guidelines, use_cache=True, usage=None, on_status=None,
+                              prefetched=None, retry_workers=BATCH_RETRY_WORKERS,
+                              poll_interval=BATCH_POLL_INITIAL_SECONDS, max_poll_interval=BATCH_POLL_MAX_SECONDS,
+                              brief_stats=None, resume=None, on_submit=None, on_finish=None, cancel_on_close=True,
+                              on_tick=None):
+    """Generate briefs with Message Batches, yielding (title, brief, error) like request_briefs_concurrently.
+
+    Cached briefs are yielded first and not submitted. Batches are then polled,
+    waiting poll_interval seconds between rounds and growing the wait by
+    BATCH_POLL_BACKOFF up to max_poll_interval; on_status receives
+    summarize_batches() of the latest state after every poll, and on_tick()
+    is called every STREAM_REFRESH_SECONDS in between, so a caller can stop
+    the run without waiting for the next poll. Each batch's results are
+    yielded as soon as it ends; a results download that fails part way leaves
+    its unread titles to the retries. Finally, titles the batches did
+    not answer are requested one by one (retry_workers at a time), together
+    with any prefetched futures, which are awaited instead.
+
+    brief_stats is filled as in request_briefs_concurrently; for batch results
+    seconds is the time from submission until the result was read.
+
+    resume maps the ids of batches submitted by an earlier run to their
+    requests, as passed to on_submit. Those batches are polled again and their
+    titles are not submitted anew; items whose cache key no longer matches
+    (the template or guidelines changed) are ignored, and a batch that can no
+    longer be retrieved is given up. on_finish(batch_id) is called once the
+    results of a batch have been read, or a resumed batch was given up.
+
+    Closing the generator before the batches end cancels them, unless
+    cancel_on_close is false.
+    """
+    if not titles:
+        return
+
+    response_cache = get_response_cache()
+    telemetry = get_telemetry()
+    prefetched = {title: future for title, future in (prefetched or {}).items() if title in titles}
+    keys = {}
+    todo = []
+    for title in titles:
+        if title in prefetched:
+            continue
+        keys[title] = brief_cache_key(title, template, guidelines)
+        cached = response_cache.get(keys[title]) if use_cache else None
+        if cached is not None:
+            telemetry.record("brief", get_model_router().policy("brief")["model"], status="cached")
+            yield title, cached, None
+        else:
+            todo.append(title)
+
+    answered = set()
+    pending = {}
+    submitted_at = time.monotonic()
+    scheduler = get_client_registry().scheduler_for(client)
+    try:
+        waiting = set(todo)
+        for batch_id, requests in (resume or {}).items():
+            titles_by_id = {
+                custom_id: request["title"] for custom_id, request in requests.items()
+                if request["title"] in waiting and request["key"] == keys[request["title"]]
+            }
+            batch = None
+            if titles_by_id:
+                try:
+                    batch = scheduler.call(lambda: client.messages.batches.retrieve(batch_id))
+                except Exception:
+                    # Expired or unknown: its titles are submitted again below.
+                    pass
+            if batch is None:
+                if on_finish:
+                    on_finish(batch_id)
+                continue
+            pending[batch_id] = (batch, titles_by_id)
+            waiting -= set(titles_by_id.values())
+
+        submit = [title for title in todo if title in waiting]
+        if submit:
+            for batch, titles_by_id in submit_brief_batches(client, submit, template, guidelines, on_submit=on_submit):
+                pending[batch.id] = (batch, titles_by_id)
+
+        latest = {batch_id: batch for batch_id, (batch, _) in pending.items()}
+        while pending:
+            poll_at = time.monotonic() + poll_interval
+            while time.monotonic() < poll_at:
+                time.sleep(max(0.0, min(STREAM_REFRESH_SECONDS, poll_at - time.monotonic())))
+                if on_tick:
+                    on_tick()
+            poll_interval = min(max_poll_interval, poll_interval * BATCH_POLL_BACKOFF)
+            for batch_id in pending:
+                latest[batch_id] = scheduler.call(lambda: client.messages.batches.retrieve(batch_id))
+            if on_status:
+                on_status(summarize_batches(list(latest.values())))
+            for batch_id in [batch_id for batch_id in pending if latest[batch_id].processing_status == "ended"]:
+                _, titles_by_id = pending.pop(batch_id)
+                results = scheduler.call(lambda: client.messages.batches.results(batch_id))
+                for item in read_results(results, telemetry):
+                    title = titles_by_id.get(item.custom_id)
+                    if title is None or item.result.type != "succeeded":
+                        continue
+                    message = item.result.message
+                    brief = message_text(message)
+                    telemetry.record("brief", message.model, usage=message.usage, batch=True)
+                    if usage is not None:
+                        usage.add(message.usage)
+                    if brief_stats is not None:
+                        title_usage = TokenUsage()
+                        title_usage.add(message.usage)
+                        brief_stats[title] = {
+                            "seconds": round(time.monotonic() - submitted_at, 3), **title_usage.summary()
+                        }
+                    response_cache.put(keys[title], brief)
+                    answered.add(title)
+                    yield title, brief, None
+                if on_finish:
+                    on_finish(batch_id)
+    finally:
+        for batch_id in pending if cancel_on_close else ():
+            try:
+                client.messages.batches.cancel(batch_id)
+            except Exception:
+                pass
+
+    retry = [title for title in todo if title not in answered] + list(prefetched)
+    yield from request_briefs_concurrently(
+        client, retry, template, guidelines, retry_workers, use_cache=False, on_tick=on_tick, prefetched=prefetched,
+        usage=usage, brief_stats=brief_stats
+    )
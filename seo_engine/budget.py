@@ -0,0 +1,152 @@
+"""Pre-flight prompt token budgeting.
+
+Token counts are estimated locally, without a tokenizer or an API call, from
+the words, numbers and symbols of a text; estimates are memoized per text
+block, so the guidelines and template shared by a whole batch are counted
+once. Before a prompt is built, fit_to_budget() checks its estimated size
+against PROMPT_TOKEN_BUDGET and compacts the largest oversized inputs until it
+fits: duplicate guideline and template lines are dropped first, then the
+existing-title list is cut from its least relevant end and the guidelines are
+shortened. A prompt that cannot be brought under the budget raises
+PromptBudgetError before anything is sent.
+
+Every call records its estimate next to the input tokens the API reports, so
+telemetry shows how far off the estimator is; TOKEN_ESTIMATE_SCALE corrects it.
+"""
+
+import math
+import re
+from functools import lru_cache
+
+from .config import PROMPT_TOKEN_BUDGET, TOKEN_ESTIMATE_CACHE_SIZE, TOKEN_ESTIMATE_SCALE
+from .telemetry import get_telemetry
+
+TOKEN_PIECE_RE = re.compile(r"[^\W\d_]+|\d+|\S")
+# Characters per token of an ASCII word beyond its first token, and of digit runs and non-ASCII words.
+WORD_CHARS_PER_TOKEN = 6
+DIGITS_PER_TOKEN = 3
+NON_ASCII_CHARS_PER_TOKEN = 2
+TRUNCATION_MARKER = "[... shortened to fit the prompt budget]"
+
+class PromptBudgetError(ValueError):
+    """The prompt is over PROMPT_TOKEN_BUDGET even after every input was compacted."""
+
+def count_tokens(text):
+    """Estimated tokens of text: about one per common word or symbol, more for long words and numbers."""
+    tokens = 0
+    for piece in TOKEN_PIECE_RE.findall(text or ""):
+        if piece.isdigit():
+            tokens += math.ceil(len(piece) / DIGITS_PER_TOKEN)
+        elif not piece.isascii():
+            tokens += math.ceil(len(piece) / NON_ASCII_CHARS_PER_TOKEN)
+        elif piece.isalpha():
+            tokens += 1 + (len(piece) - 1) // WORD_CHARS_PER_TOKEN
+        else:
+            tokens += 1
+    return math.ceil(tokens * TOKEN_ESTIMATE_SCALE)
+
+@lru_cache(maxsize=TOKEN_ESTIMATE_CACHE_SIZE)
+def estimate_tokens(text):
+    """count_tokens(text), memoized for whole prompt blocks."""
+    return count_tokens(text)
+
+def estimate_prompt_tokens(system, prompt):
+    return estimate_tokens(system) + estimate_tokens(prompt)
+
+def dedupe_lines(text):
+    """text without repeated lines (ignoring case and spacing) or runs of blank lines."""
+    seen = set()
+    kept = []
+    for line in text.splitlines():
+        key = " ".join(line.lower().split())
+        if not key:
+            if kept and kept[-1].strip():
+                kept.append("")
+            continue
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.append(line)
+    return "\n".join(kept).strip()
+
+def keep_first_lines(text, target_tokens):
+    """The leading lines of text that fit in target_tokens, with a marker saying the rest was cut."""
+    budget = target_tokens - estimate_tokens(TRUNCATION_MARKER)
+    kept = []
+    for line in text.splitlines():
+        budget -= count_tokens(line) + 1
+        if budget < 0:
+            break
+        kept.append(line)
+    if len(kept) == len(text.splitlines()):
+        return text
+    return "\n".join(kept + [TRUNCATION_MARKER])
+
+def keep_first_titles(text, target_tokens):
+    """The first titles of a newline-separated list that fit in target_tokens.
+
+    Titles are kept in the order given; TitleIndex.select_context() lists the
+    most relevant ones first, so the least relevant are dropped.
+    """
+    lines = text.splitlines()
+    budget = target_tokens
+    kept = 0
+    for line in lines:
+        budget -= count_tokens(line) + 1
+        if budget < 0:
+            break
+        kept += 1
+    if kept == len(lines):
+        return text
+    return "\n".join(lines[:kept] + [f"(and {len(lines) - kept} more titles)"])
+
+# Compaction steps of each prompt input, applied in order, each at most once. dedupe_lines drops
+# nothing but repeats, so it takes no target; the later steps cut the text down to one.
+COMPACTORS = {
+    "guidelines": (dedupe_lines, keep_first_lines),
+    "existing_titles": (dedupe_lines, keep_first_titles),
+    "template": (dedupe_lines,),
+}
+
+@lru_cache(maxsize=64)
+def _fit(build, blocks, budget, fixed):
+    blocks = dict(blocks)
+    fixed = dict(fixed)
+    frame = estimate_prompt_tokens(*build(**fixed, **dict.fromkeys(blocks, "")))
+    sizes = {name: estimate_tokens(text) for name, text in blocks.items()}
+    steps = dict.fromkeys(blocks, 0)
+    compactions = []
+    while frame + sum(sizes.values()) > budget:
+        candidates = [name for name in blocks if steps[name] < len(COMPACTORS[name]) and sizes[name]]
+        if not candidates:
+            raise PromptBudgetError(
+                f"The prompt needs about {frame + sum(sizes.values()):,} tokens even after compaction, "
+                f"over the budget of {budget:,}; shorten the guidelines or the template."
+            )
+        name = max(candidates, key=sizes.get)
+        target = max(0, sizes[name] - (frame + sum(sizes.values()) - budget))
+        compact = COMPACTORS[name][steps[name]]
+        compacted = compact(blocks[name]) if compact is dedupe_lines else compact(blocks[name], target)
+        steps[name] += 1
+        if estimate_tokens(compacted) >= sizes[name]:
+            continue
+        compactions.append((name, sizes[name], estimate_tokens(compacted)))
+        blocks[name] = compacted
+        sizes[name] = estimate_tokens(compacted)
+    return blocks, tuple(compactions)
+
+def fit_to_budget(build, blocks, budget=PROMPT_TOKEN_BUDGET, **fixed):
+    """blocks, a dict of build's large text inputs, compacted until build(**fixed, **blocks) fits budget.
+
+    The prompt's frame (build with the blocks left empty) is estimated once and
+    each block separately; the largest block that can still shrink is
+    compacted by its next COMPACTORS step, targeting the tokens over budget.
+    Results are memoized, so every call with the same inputs gets the same
+    compacted text and keeps the same prompt-cache prefix; the compactions are
+    recorded in the telemetry on every call, memoized or not.
+    """
+    fitted, compactions = _fit(build, tuple(blocks.items()), budget, tuple(sorted(fixed.items())))
+    telemetry = get_telemetry()
+    for name, tokens_before, tokens_after in compactions:
+        telemetry.record_compaction(name, tokens_before, tokens_after)
+    return dict(fitted)
@@ -0,0 +1,264 @@
+"""Headless bulk brief generation with resumable JSONL output.
+
+    python -m seo_engine --titles titles.csv --out briefs.jsonl \
+        --guidelines guidelines.md --template template.md --concurrency 8
+
+With --batch the briefs are sent through the Message Batches API instead:
+half the price, but a batch can take up to 24 hours to finish.
+
+Titles are read from the first column of a CSV/Excel file. Each finished
+brief is appended to the output file as one JSON record and flushed to disk
+immediately, so the output doubles as the checkpoint: running the same
+command again skips titles that already have a successful record and retries
+the ones that failed. With --batch the ids of submitted batches are kept next
+to the output (OUT.batches.json), so an interrupted run picks its batches up
+again instead of submitting them twice.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from .batches import request_briefs_in_batches
+from .cache import ResponseCache, set_response_cache
+from .clients import get_client_registry
+from .corpus import read_titles
+from .generation import request_briefs_concurrently
+from .prompts import DEFAULT_GUIDELINES, DEFAULT_TEMPLATE
+from .routing import ModelRouter, get_model_router, set_model_router
+from .telemetry import get_telemetry
+
+DEFAULT_CONCURRENCY = 5
+
+class JsonlCheckpoint:
+    """Append-only JSONL results file that is also the resume checkpoint."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def completed_titles(self):
+        """Titles with a successful record. Unreadable (e.g. half-written) lines are ignored."""
+        completed = set()
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("status") == "ok":
+                    completed.add(record["title"])
+        return completed
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a+", encoding="utf-8")
+        # A crash can leave a partial last line; start on a fresh one so the next record stays valid.
+        if self._file.tell() > 0:
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                self._file.write("\n")
+        return self
+
+    def append(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+class BatchLedger:
+    """JSON file of the Message Batches a run has submitted and not yet read, for resuming them."""
+
+    def __init__(self, path):
+        self.path = path
+        self._batches = self.load()
+
+    def load(self):
+        """{batch_id: requests} as recorded by add(); an unreadable file counts as empty."""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError:
+            return {}
+
+    def add(self, batch_id, requests):
+        self._batches[batch_id] = requests
+        self._save()
+
+    def remove(self, batch_id):
+        if self._batches.pop(batch_id, None) is not None:
+            self._save()
+
+    def _save(self):
+        if not self._batches:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+        # Written to a temporary file first so a crash never leaves a half-written ledger.
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self._batches, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+def read_text(path, default):
+    if not path:
+        return default
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+def print_batch_status(summary):
+    print(
+        f"Batches: {summary['ended']}/{summary['batches']} ended · {summary['processing']} processing, "
+        f"{summary['succeeded']} succeeded, {summary['errored']} errored, "
+        f"{summary['canceled'] + summary['expired']} cancelled/expired",
+        file=sys.stderr
+    )
+
+def print_metrics(summary):
+    tokens = summary["tokens"]
+    print(
+        f"API calls: {summary['api_calls']:,} ({summary['cached']:,} cached, {summary['retries']:,} retries, "
+        f"{sum(summary['errors'].values()):,} errors) · est. cost ${summary['cost_usd']:.4f}\n"
+        f"Tokens: {tokens['input_tokens']:,} input, {tokens['cache_read_input_tokens']:,} cache read, "
+        f"{tokens['cache_creation_input_tokens']:,} cache write, {tokens['output_tokens']:,} output",
+        file=sys.stderr
+    )
+    estimates = summary["token_estimates"]
+    if estimates["ratio"]:
+        print(
+            f"Input token estimate: {estimates['estimated']:,} estimated vs {estimates['actual']:,} billed "
+            f"over {estimates['calls']:,} calls (actual/estimated {estimates['ratio']:.2f})",
+            file=sys.stderr
+        )
+    for block, counts in summary["compactions"].items():
+        print(f"  {block} compacted {counts['count']}x to fit the prompt budget, "
+              f"~{counts['tokens_saved']:,} tokens saved", file=sys.stderr)
+    for kind, counts in summary["hedges"].items():
+        print(f"  {kind}: {counts['hedged']} hedged requests, {counts['won']} won by the duplicate", file=sys.stderr)
+    if summary["abandoned_cost_usd"]:
+        print(f"  Cancelled requests (hedge losers, deadlines): est. ${summary['abandoned_cost_usd']:.4f}",
+              file=sys.stderr)
+    for kind, stats in summary["by_kind"].items():
+        for name in ("ttft", "latency"):
+            if name in stats:
+                quantiles = " ".join(f"{q}={seconds:.2f}s" for q, seconds in stats[name].items())
+                print(f"  {kind} {name}: {quantiles}", file=sys.stderr)
+    for error_type, count in summary["errors"].items():
+        print(f"  {error_type}: {count}", file=sys.stderr)
+
+def print_routes(rows):
+    for row in rows:
+        if row["calls"]:
+            p95 = f"{row['latency_p95']:.2f}s" if row["latency_p95"] is not None else "-"
+            print(
+                f"  route {row['route']} -> {row['model']}{' (active)' if row['active'] else ''}: "
+                f"{row['calls']} calls, {row['success_rate']:.0%} ok, p95 {p95}, "
+                f"{row['within_slo']:.0%} within SLO",
+                file=sys.stderr
+            )
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m seo_engine",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--titles", required=True, help="CSV/Excel file with one title per row in the first column")
+    parser.add_argument("--out", required=True, help="JSONL file to append results to (and resume from)")
+    parser.add_argument("--guidelines", help="text/markdown file with the strategic guidelines")
+    parser.add_argument("--template", help="text/markdown file with the brief template")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="briefs generated at once")
+    parser.add_argument("--sections", action="store_true",
+                        help="write each brief section by section in parallel (faster per brief, more calls)")
+    parser.add_argument("--batch", action="store_true",
+                        help="use the Message Batches API; failed items are retried with --concurrency regular calls")
+    parser.add_argument("--api-key", default=os.environ.get("ANTHROPIC_API_KEY"),
+                        help="Anthropic API key (default: $ANTHROPIC_API_KEY)")
+    parser.add_argument("--cache-path", help="response cache file (default: $SEO_PLANNER_CACHE_PATH)")
+    parser.add_argument("--routes", help="JSON file of model routing policies (default: $SEO_PLANNER_ROUTES_PATH)")
+    parser.add_argument("--no-cache", action="store_true", help="always call the API, ignoring cached responses")
+    parser.add_argument("--metrics-out", help="write the run's metrics to this file in Prometheus text format")
+    parser.add_argument("--telemetry-jsonl", help="append one JSON record per API call to this file")
+    args = parser.parse_args(argv)
+    if not args.api_key:
+        parser.error("an API key is required: pass --api-key or set ANTHROPIC_API_KEY")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.cache_path:
+        set_response_cache(ResponseCache(args.cache_path))
+    if args.routes:
+        set_model_router(ModelRouter.from_file(args.routes))
+    telemetry = get_telemetry()
+    if args.telemetry_jsonl:
+        telemetry.jsonl_path = args.telemetry_jsonl
+
+    titles = list(dict.fromkeys(read_titles(args.titles)))
+    guidelines = read_text(args.guidelines, DEFAULT_GUIDELINES)
+    template = read_text(args.template, DEFAULT_TEMPLATE)
+
+    checkpoint = JsonlCheckpoint(args.out)
+    completed = checkpoint.completed_titles()
+    todo = [title for title in titles if title not in completed]
+    print(f"{len(titles)} titles: {len(titles) - len(todo)} already done, {len(todo)} to generate", file=sys.stderr)
+    if not todo:
+        return 0
+
+    client = get_client_registry().get(args.api_key)
+    failures = 0
+    started = time.monotonic()
+    checkpoint.open()
+    try:
+        brief_stats = {}
+        if args.batch:
+            ledger = BatchLedger(f"{args.out}.batches.json")
+            resume = ledger.load()
+            if resume:
+                print(f"Resuming {len(resume)} submitted batch(es)", file=sys.stderr)
+            results = request_briefs_in_batches(
+                client, todo, template, guidelines, use_cache=not args.no_cache,
+                on_status=print_batch_status, retry_workers=args.concurrency, brief_stats=brief_stats,
+                resume=resume, on_submit=ledger.add, on_finish=ledger.remove, cancel_on_close=False
+            )
+        else:
+            results = request_briefs_concurrently(
+                client, todo, template, guidelines, args.concurrency, use_cache=not args.no_cache,
+                by_sections=args.sections, brief_stats=brief_stats
+            )
+        for done, (title, brief, error) in enumerate(results, start=1):
+            failures += bool(error)
+            checkpoint.append({
+                "title": title,
+                "status": "error" if error else "ok",
+                "brief": brief,
+                "error": f"{type(error).__name__}: {error}" if error else None,
+                "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                **brief_stats.pop(title, {})
+            })
+            print(f"[{done}/{len(todo)}] {'FAILED' if error else 'ok'}: {title}", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume.", file=sys.stderr)
+        return 130
+    finally:
+        checkpoint.close()
+
+    print(f"Done in {time.monotonic() - started:.1f}s: {len(todo) - failures} ok, {failures} failed.", file=sys.stderr)
+    print_metrics(telemetry.summary())
+    print_routes(get_model_router().stats())
+    if args.metrics_out:
+        with open(args.metrics_out, "w", encoding="utf-8") as f:
+            f.write(telemetry.prometheus_text())
+    return 1 if failures else 0
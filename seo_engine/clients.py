@@ -0,0 +1,116 @@
+"""Process-wide pool of Anthropic clients."""
+
+import hashlib
+import threading
+import time
+import weakref
+
+from .config import (
+    CLIENT_CONNECT_TIMEOUT_SECONDS,
+    CLIENT_IDLE_TTL_SECONDS,
+    CLIENT_KEEPALIVE_EXPIRY_SECONDS,
+    CLIENT_MAX_CONNECTIONS,
+    CLIENT_MAX_ENTRIES,
+    CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+    CLIENT_READ_TIMEOUT_SECONDS,
+)
+from .scheduler import RequestScheduler
+
+class ClientRegistry:
+    """Process-wide pool of Anthropic clients, one per API key.
+
+    Clients are keyed on a SHA-256 of the key so raw keys are never used as
+    dictionary keys. Sessions sharing a key share one HTTP connection pool and
+    keep its connections warm. Entries idle for longer than idle_ttl_seconds are
+    dropped, and a dropped client's connection pool is closed once the last
+    reference to the client goes away, so a batch still holding an evicted
+    client can finish normally.
+
+    Each API key gets its own RequestScheduler, since rate limits apply per key.
+    Schedulers are keyed on the key hash rather than the client, so a key's
+    token buckets and throttled concurrency survive the eviction of its idle
+    client. The SDK's built-in retries are disabled so the scheduler owns all
+    retrying.
+    """
+
+    def __init__(self, idle_ttl_seconds=CLIENT_IDLE_TTL_SECONDS, max_entries=CLIENT_MAX_ENTRIES):
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_entries = max_entries
+        self._clients = {}
+        self._schedulers = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_hash(api_key):
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    def get(self, api_key):
+        now = time.time()
+        key_hash = self.key_hash(api_key)
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._clients.get(key_hash)
+            if entry is None:
+                if len(self._clients) >= self.max_entries:
+                    oldest = min(self._clients, key=lambda h: self._clients[h][1])
+                    del self._clients[oldest]
+                entry = [self._build_client(api_key), now]
+                self._clients[key_hash] = entry
+            entry[1] = now
+            return entry[0]
+
+    def scheduler_for(self, client):
+        key_hash = self.key_hash(client.api_key)
+        with self._lock:
+            scheduler = self._schedulers.get(key_hash)
+            if scheduler is None:
+                # Keys without a live client are the ones whose schedulers can go when the table is full.
+                stale = [h for h in self._schedulers if h not in self._clients]
+                for old_hash in stale[:max(0, len(self._schedulers) - self.max_entries + 1)]:
+                    del self._schedulers[old_hash]
+                scheduler = self._schedulers[key_hash] = RequestScheduler()
+            return scheduler
+
+    def scheduler_stats(self):
+        with self._lock:
+            schedulers = list(self._schedulers.values())
+        return [scheduler.stats() for scheduler in schedulers]
+
+    def _evict_idle(self, now):
+        idle = [h for h, (_, last_used) in self._clients.items() if now - last_used > self.idle_ttl_seconds]
+        for key_hash in idle:
+            del self._clients[key_hash]
+
+    @staticmethod
+    def _build_client(api_key):
+        # The SDK takes over a second to import, so it is loaded with the first client, not with the app.
+        import anthropic
+
+        # DEFAULT_CONNECTION_LIMITS is an instance of the SDK transport's Limits class,
+        # which lets us tune the pool without importing the HTTP library directly.
+        limits = type(anthropic.DEFAULT_CONNECTION_LIMITS)(
+            max_connections=CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=CLIENT_KEEPALIVE_EXPIRY_SECONDS
+        )
+        timeout = anthropic.Timeout(CLIENT_READ_TIMEOUT_SECONDS, connect=CLIENT_CONNECT_TIMEOUT_SECONDS)
+        http_client = anthropic.DefaultHttpxClient(limits=limits, timeout=timeout)
+        client = anthropic.Anthropic(api_key=api_key, timeout=timeout, max_retries=0, http_client=http_client)
+        # An HTTP client passed in by the caller is never closed by the SDK, so its pool goes with the client.
+        weakref.finalize(client, http_client.close)
+        return client
+
+    def __len__(self):
+        with self._lock:
+            return len(self._clients)
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+def get_client_registry():
+    """The process-wide ClientRegistry, created on first use."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ClientRegistry()
+        return _default_registry
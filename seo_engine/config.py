@@ -0,0 +1,125 @@
+"""Engine-wide settings. Values that depend on the deployment read environment variables."""
+
+import os
+
+MODEL_NAME = "claude-3-haiku-20240307"
+FALLBACK_MODEL_NAME = "claude-3-5-haiku-20241022"
+# USD per million tokens.
+MODEL_PRICES = {
+    "claude-3-haiku-20240307": {"input": 0.25, "output": 1.25, "cache_write": 0.30, "cache_read": 0.03},
+    "claude-3-5-haiku-20241022": {"input": 0.80, "output": 4.00, "cache_write": 1.00, "cache_read": 0.08},
+}
+BATCH_PRICE_FACTOR = 0.5
+STRATEGY_MAX_TOKENS = 1024
+BRIEF_MAX_TOKENS = 4096
+BRIEF_SECTION_MAX_TOKENS = 1536
+BRIEF_ANCHORS_MAX_TOKENS = 200
+
+TITLE_FILE_CHUNK_ROWS = 50_000
+
+TITLE_INDEX_FEATURES = 2 ** 16
+TITLE_INDEX_NGRAMS = (3, 4)
+CONTEXT_TOP_K = 100
+CONTEXT_CLUSTERS = 40
+NOVELTY_THRESHOLD = 0.8
+NOVELTY_MAX_ROUNDS = 3
+
+# "Generate N titles": titles per shard call, how many extra to ask for to
+# survive deduplication, and how many shard calls run at once.
+STRATEGY_SHARD_SIZE = 25
+STRATEGY_OVERSAMPLE = 1.3
+STRATEGY_SHARD_WORKERS = 8
+STRATEGY_SHARD_MAX_TOKENS = 4096
+STRATEGY_MAX_TITLES = 500
+
+# Estimated input tokens allowed per call; larger prompts are compacted first (see budget.py).
+PROMPT_TOKEN_BUDGET = int(os.environ.get("SEO_PLANNER_PROMPT_TOKEN_BUDGET", "30000"))
+# Multiplies local token estimates; set it to the actual/estimated ratio the metrics report.
+TOKEN_ESTIMATE_SCALE = float(os.environ.get("SEO_PLANNER_TOKEN_ESTIMATE_SCALE", "1.0"))
+TOKEN_ESTIMATE_CACHE_SIZE = 512
+
+STREAM_REFRESH_SECONDS = 0.15
+PROMPT_CACHE_WARMUP_SECONDS = 3
+# How long stopped brief requests get to wind down and report the tokens they were billed for.
+CANCEL_GRACE_SECONDS = 1.0
+# Shortest prefix, in tokens, the API will prompt-cache for each model; shorter system blocks are sent unmarked.
+PROMPT_CACHE_MIN_TOKENS = {
+    "claude-3-haiku-20240307": 2048,
+    "claude-3-5-haiku-20241022": 2048,
+}
+PROMPT_CACHE_DEFAULT_MIN_TOKENS = 1024
+
+# Model routing per call type (see routing.py). max_tokens caps each call of the route, slo_seconds is the
+# latency its calls should stay within and deadline_seconds the point at which a call is abandoned;
+# ROUTES_PATH, a JSON file of the same shape, overrides these.
+ROUTE_POLICIES = {
+    "strategy": {"model": MODEL_NAME, "max_tokens": 4096, "slo_seconds": 30, "deadline_seconds": 120,
+                 "fallbacks": [FALLBACK_MODEL_NAME]},
+    "brief": {"model": MODEL_NAME, "max_tokens": 4096, "slo_seconds": 90, "deadline_seconds": 180,
+              "fallbacks": [FALLBACK_MODEL_NAME]},
+    "manual_brief": {"model": MODEL_NAME, "max_tokens": 4096, "slo_seconds": 60, "deadline_seconds": 180,
+                     "fallbacks": [FALLBACK_MODEL_NAME]},
+}
+ROUTES_PATH = os.environ.get("SEO_PLANNER_ROUTES_PATH", "routes.json")
+ROUTING_WINDOW_SECONDS = 5 * 60
+ROUTING_MIN_SAMPLES = 5
+ROUTING_SLO_TARGET = 0.9
+ROUTING_OVERLOAD_COOLDOWN_SECONDS = 30
+ROUTING_PROBE_SECONDS = 30
+
+# Hedged requests (see hedging.py): a streamed call with no first token after the HEDGE_PERCENTILE of its kind's
+# recent times to first token gets a duplicate request. At most HEDGE_MAX_RATE of streamed calls are hedged; 0 turns
+# hedging off.
+HEDGE_MAX_RATE = float(os.environ.get("SEO_PLANNER_HEDGE_MAX_RATE", "0.05"))
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY_SECONDS = 0.5
+HEDGE_WINDOW = 200
+
+BATCH_MAX_REQUESTS = 10_000
+BATCH_POLL_INITIAL_SECONDS = 5.0
+BATCH_POLL_MAX_SECONDS = 60.0
+BATCH_POLL_BACKOFF = 1.5
+BATCH_RETRY_WORKERS = 5
+
+EXPORT_SPOOL_BYTES = 32 * 1024 * 1024
+EXPORT_ROW_GROUP_SIZE = 500
+XLSX_MAX_CELL_CHARS = 32_767
+
+# Two briefs conflict when they share at least this share of the smaller one's keywords.
+CANNIBALIZATION_THRESHOLD = 0.5
+
+PREFETCH_MAX_WORKERS = 4
+PREFETCH_RESULT_TTL_SECONDS = 60 * 60
+
+RESPONSE_CACHE_PATH = os.environ.get("SEO_PLANNER_CACHE_PATH", os.path.join(".cache", "responses.sqlite3"))
+RESPONSE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+RESPONSE_CACHE_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+
+BRIEF_STORE_PATH = os.environ.get("SEO_PLANNER_BRIEFS_PATH", os.path.join(".cache", "briefs.sqlite3"))
+BRIEF_STORE_MAX_BYTES = 500 * 1024 * 1024
+BRIEF_STORE_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+JOBS_PATH = os.environ.get("SEO_PLANNER_JOBS_PATH", os.path.join(".cache", "jobs.sqlite3"))
+JOB_MAX_RUNNING = 2
+JOB_RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+TELEMETRY_JSONL_PATH = os.environ.get("SEO_PLANNER_TELEMETRY_PATH")
+TELEMETRY_WINDOW = 5000
+
+CLIENT_MAX_CONNECTIONS = 20
+CLIENT_MAX_KEEPALIVE_CONNECTIONS = 10
+CLIENT_KEEPALIVE_EXPIRY_SECONDS = 60
+CLIENT_CONNECT_TIMEOUT_SECONDS = 10
+CLIENT_READ_TIMEOUT_SECONDS = 120
+CLIENT_IDLE_TTL_SECONDS = 30 * 60
+CLIENT_MAX_ENTRIES = 64
+
+RATE_LIMIT_REQUESTS_PER_MINUTE = int(os.environ.get("SEO_PLANNER_RPM", "50"))
+RATE_LIMIT_INPUT_TOKENS_PER_MINUTE = int(os.environ.get("SEO_PLANNER_ITPM", "50000"))
+RATE_LIMIT_BURST_SECONDS = 10
+SCHEDULER_MAX_CONCURRENCY = 10
+SCHEDULER_MAX_RETRIES = 6
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+THROTTLE_COOLDOWN_SECONDS = 2.0
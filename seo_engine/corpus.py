@@ -0,0 +1,214 @@
+"""Reading title files, and the similarity index used for prompt context and duplicate filtering."""
+
+import hashlib
+import io
+import math
+import re
+import zlib
+
+import numpy as np
+from scipy import sparse
+
+from .config import (
+    CONTEXT_CLUSTERS,
+    CONTEXT_TOP_K,
+    NOVELTY_THRESHOLD,
+    TITLE_FILE_CHUNK_ROWS,
+    TITLE_INDEX_FEATURES,
+    TITLE_INDEX_NGRAMS,
+)
+
+def clean_titles(values):
+    titles = (
+        str(value).strip() for value in values
+        if value is not None and not (isinstance(value, float) and math.isnan(value))
+    )
+    return [title for title in titles if title]
+
+def parse_titles(data, file_name):
+    """Read the titles in the first column of a CSV or Excel file given as bytes.
+
+    Only the first column is read: CSVs in chunks of TITLE_FILE_CHUNK_ROWS rows and
+    .xlsx files row by row with a read-only workbook, so memory stays bounded.
+    """
+    import pandas as pd
+
+    titles = []
+    if file_name.endswith('.csv'):
+        chunks = pd.read_csv(io.BytesIO(data), usecols=[0], dtype=str, chunksize=TITLE_FILE_CHUNK_ROWS)
+        for chunk in chunks:
+            titles.extend(clean_titles(chunk.iloc[:, 0]))
+    elif file_name.endswith('.xlsx'):
+        import openpyxl
+        workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(min_row=2, max_col=1, values_only=True)
+            titles.extend(clean_titles(row[0] for row in rows if row))
+        finally:
+            workbook.close()
+    else:
+        df = pd.read_excel(io.BytesIO(data), usecols=[0])
+        titles.extend(clean_titles(df.iloc[:, 0]))
+    return titles
+
+def read_titles(path):
+    """Titles from the first column of a CSV/Excel file on disk."""
+    with open(path, "rb") as f:
+        return parse_titles(f.read(), str(path))
+
+class TitleIndex:
+    """TF-IDF vectors of the existing titles over hashed character n-grams.
+
+    Each word is padded with spaces and split into n-grams of the lengths in
+    TITLE_INDEX_NGRAMS, hashed into TITLE_INDEX_FEATURES buckets. Rows are
+    L2-normalised, so a sparse dot product gives cosine similarity.
+    """
+
+    def __init__(self, titles):
+        self.titles = list(titles)
+        counts = self._count_matrix(self.titles)
+        document_frequency = np.bincount(counts.indices, minlength=TITLE_INDEX_FEATURES)
+        self.idf = (np.log((1 + len(self.titles)) / (1 + document_frequency)) + 1).astype(np.float32)
+        self.vectors = self._weigh(counts)
+        self._postings = self.vectors.T.tocsr()
+        self._representatives = {}
+
+    @staticmethod
+    def _count_matrix(texts):
+        word_ids = {}
+        indices = []
+        indptr = [0]
+        for text in texts:
+            for word in re.findall(r"\w+", text.lower()):
+                ids = word_ids.get(word)
+                if ids is None:
+                    padded = f" {word} "
+                    ids = word_ids[word] = [
+                        zlib.crc32(padded[i:i + n].encode()) % TITLE_INDEX_FEATURES
+                        for n in TITLE_INDEX_NGRAMS
+                        for i in range(max(1, len(padded) - n + 1))
+                    ]
+                indices.extend(ids)
+            indptr.append(len(indices))
+        counts = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), np.array(indices, dtype=np.int64), np.array(indptr)),
+            shape=(len(texts), TITLE_INDEX_FEATURES)
+        )
+        counts.sum_duplicates()
+        return counts
+
+    def _weigh(self, counts):
+        weighted = sparse.csr_matrix(counts.multiply(self.idf))
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.csr_matrix(sparse.diags(1 / norms) @ weighted)
+
+    def vectorize(self, texts):
+        return self._weigh(self._count_matrix(texts))
+
+    def similarities(self, vectors):
+        """Cosine similarity of each row of vectors to every title (sparse, rows x titles)."""
+        return sparse.csr_matrix(vectors @ self._postings)
+
+    def max_similarity(self, vectors):
+        """Highest similarity of each row of vectors to any title, in one sparse product."""
+        if not self.titles:
+            return np.zeros(vectors.shape[0], dtype=np.float32)
+        return self.similarities(vectors).max(axis=1).toarray().ravel()
+
+    def most_relevant(self, text, k):
+        """Indices of the k titles most similar to text, best first."""
+        scores = self.similarities(self.vectorize([text])).toarray().ravel()
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])].tolist()
+
+    def representatives(self, n_clusters, iterations=8):
+        """One title per spherical k-means cluster, largest clusters first."""
+        n_clusters = min(n_clusters, len(self.titles))
+        if n_clusters not in self._representatives:
+            self._representatives[n_clusters] = self._cluster(n_clusters, iterations) if n_clusters else []
+        return self._representatives[n_clusters]
+
+    def _cluster(self, n_clusters, iterations):
+        n = len(self.titles)
+        rng = np.random.default_rng(0)
+        centers = self.vectors[rng.choice(n, n_clusters, replace=False)].toarray()
+        for _ in range(iterations):
+            similarity = np.asarray(self.vectors @ centers.T)
+            labels = similarity.argmax(axis=1)
+            assignment = sparse.csr_matrix(
+                (np.ones(n, dtype=np.float32), (labels, np.arange(n))), shape=(n_clusters, n)
+            )
+            centers = np.asarray((assignment @ self.vectors).todense(), dtype=np.float32)
+            norms = np.linalg.norm(centers, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            centers /= norms
+
+        similarity = np.asarray(self.vectors @ centers.T)
+        labels = similarity.argmax(axis=1)
+        sizes = np.bincount(labels, minlength=n_clusters)
+        representatives = []
+        for cluster in np.argsort(-sizes):
+            members = np.flatnonzero(labels == cluster)
+            if len(members):
+                representatives.append(int(members[similarity[members, cluster].argmax()]))
+        return representatives
+
+    def select_context(self, query, top_k=CONTEXT_TOP_K, n_clusters=CONTEXT_CLUSTERS):
+        """Titles to show the model: the top_k most relevant to query plus cluster representatives.
+
+        The result has at most top_k + n_clusters titles whatever the corpus size;
+        small corpora are returned whole.
+        """
+        if len(self.titles) <= top_k + n_clusters:
+            return list(self.titles)
+        chosen = self.most_relevant(query, top_k)
+        seen = set(chosen)
+        for idx in self.representatives(n_clusters):
+            if idx not in seen:
+                seen.add(idx)
+                chosen.append(idx)
+        return [self.titles[idx] for idx in chosen]
+
+class NoveltyFilter:
+    """Rejects candidate titles that near-duplicate the corpus or an already accepted candidate.
+
+    Similarity is the TitleIndex cosine score; anything at or above threshold
+    counts as a duplicate. Rejected titles are kept so replacement requests can
+    tell the model what to avoid.
+    """
+
+    def __init__(self, index, threshold=NOVELTY_THRESHOLD):
+        self.index = index
+        self.threshold = threshold
+        self.accepted = []
+        self.rejected = []
+        self._accepted_vectors = None
+
+    def filter(self, candidates):
+        """Return the novel candidates, scoring them all against the corpus in one pass."""
+        if not candidates:
+            return []
+        vectors = self.index.vectorize(candidates)
+        corpus_scores = self.index.max_similarity(vectors)
+        novel = []
+        for row, title in enumerate(candidates):
+            vector = vectors[row]
+            score = corpus_scores[row]
+            if self._accepted_vectors is not None:
+                score = max(score, (self._accepted_vectors @ vector.T).max())
+            if score >= self.threshold:
+                self.rejected.append(title)
+                continue
+            self.accepted.append(title)
+            novel.append(title)
+            self._accepted_vectors = vector if self._accepted_vectors is None else sparse.vstack(
+                [self._accepted_vectors, vector], format="csr"
+            )
+        return novel
+
+def titles_fingerprint(titles):
+    return hashlib.sha256("\n".join(titles).encode("utf-8")).hexdigest()
@@ -0,0 +1,167 @@
+"""Bulk export of briefs as a ZIP of Markdown files, XLSX, Parquet, JSONL or CSV.
+
+Exporters take an iterable of brief records (dicts with "title" and "brief",
+plus optional metadata) and write them to a binary file one record at a time:
+no DataFrame of the whole batch is built, Parquet is written in row groups and
+XLSX with a write-only workbook, so memory stays bounded by one row group
+whatever the number of briefs. build_export() writes into a spooled temporary
+file that moves to disk past EXPORT_SPOOL_BYTES.
+
+Convert a CLI output file without loading it:
+
+    python -m seo_engine.export briefs.jsonl briefs.zip
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import zipfile
+from datetime import datetime, timezone
+
+from .config import EXPORT_ROW_GROUP_SIZE, EXPORT_SPOOL_BYTES, XLSX_MAX_CELL_CHARS
+
+METADATA_FIELDS = (
+    "generated_at", "seconds", "input_tokens", "output_tokens", "cache_creation_input_tokens",
+    "cache_read_input_tokens"
+)
+FIELDS = ("title", "brief") + METADATA_FIELDS
+
+def brief_filename(title, extension=".md"):
+    """The download file name for a brief, as the per-brief download buttons name it."""
+    return f"{title.replace(' ', '_')[:50]}{extension}"
+
+def export_row(record):
+    """A record reduced to FIELDS, with generated_at as an ISO 8601 UTC string.
+
+    generated_at may be a Unix timestamp; CLI records call it finished_at.
+    """
+    row = {field: record.get(field) for field in FIELDS}
+    generated_at = record.get("generated_at", record.get("finished_at"))
+    if isinstance(generated_at, (int, float)):
+        generated_at = datetime.fromtimestamp(generated_at, timezone.utc).isoformat(timespec="seconds")
+    row["generated_at"] = generated_at
+    return row
+
+def write_zip(records, out):
+    """One Markdown file per brief plus index.jsonl with each file's metadata."""
+    used = set()
+    index = io.StringIO()
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for record in records:
+            row = export_row(record)
+            name = brief_filename(row["title"])
+            stem, number = name[:-3], 2
+            while name in used:
+                name, number = f"{stem}_{number}.md", number + 1
+            used.add(name)
+            archive.writestr(f"briefs/{name}", row["brief"] or "")
+            index.write(json.dumps({"file": f"briefs/{name}", "title": row["title"],
+                                    **{field: row[field] for field in METADATA_FIELDS}}, ensure_ascii=False) + "\n")
+        archive.writestr("index.jsonl", index.getvalue())
+
+def write_jsonl(records, out):
+    for record in records:
+        out.write((json.dumps(export_row(record), ensure_ascii=False) + "\n").encode("utf-8"))
+
+def write_csv(records, out):
+    text = io.TextIOWrapper(out, encoding="utf-8-sig", newline="", write_through=True)
+    writer = csv.DictWriter(text, fieldnames=FIELDS)
+    writer.writeheader()
+    for record in records:
+        writer.writerow(export_row(record))
+    text.detach()
+
+def write_xlsx(records, out):
+    """A single sheet; briefs longer than Excel's cell limit are cut and marked."""
+    import openpyxl
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Briefs")
+    sheet.append(FIELDS)
+    marker = "\n[truncated]"
+    for record in records:
+        row = export_row(record)
+        brief = ILLEGAL_CHARACTERS_RE.sub("", row["brief"] or "")
+        if len(brief) > XLSX_MAX_CELL_CHARS:
+            brief = brief[:XLSX_MAX_CELL_CHARS - len(marker)] + marker
+        row["brief"] = brief
+        row["title"] = ILLEGAL_CHARACTERS_RE.sub("", row["title"] or "")
+        sheet.append([row[field] for field in FIELDS])
+    workbook.save(out)
+
+def write_parquet(records, out):
+    """Written in row groups of EXPORT_ROW_GROUP_SIZE briefs. Needs pyarrow."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [("title", pa.string()), ("brief", pa.string()), ("generated_at", pa.string()), ("seconds", pa.float64())]
+        + [(field, pa.int64()) for field in METADATA_FIELDS[2:]]
+    )
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        rows = []
+        for record in records:
+            rows.append(export_row(record))
+            if len(rows) == EXPORT_ROW_GROUP_SIZE:
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                rows = []
+        if rows:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+
+# format: (label, extension, MIME type, writer)
+EXPORT_FORMATS = {
+    "zip": ("ZIP of Markdown files", ".zip", "application/zip", write_zip),
+    "xlsx": ("Excel (XLSX)", ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", write_xlsx),
+    "parquet": ("Parquet", ".parquet", "application/vnd.apache.parquet", write_parquet),
+    "jsonl": ("JSON Lines", ".jsonl", "application/x-ndjson", write_jsonl),
+    "csv": ("CSV", ".csv", "text/csv", write_csv),
+}
+
+def export_briefs(records, fmt, out):
+    """Write records to the binary file object out in the given EXPORT_FORMATS format."""
+    EXPORT_FORMATS[fmt][3](records, out)
+
+def build_export(records, fmt):
+    """The export as a rewound spooled temporary file, kept in memory up to EXPORT_SPOOL_BYTES."""
+    out = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    try:
+        export_briefs(records, fmt, out)
+    except BaseException:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+def read_jsonl_records(path):
+    """Successful records of a CLI output file, read lazily; broken lines are skipped."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status", "ok") == "ok" and record.get("brief"):
+                yield record
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m seo_engine.export", description="Convert a brief JSONL file.")
+    parser.add_argument("source", help="JSONL written by python -m seo_engine")
+    parser.add_argument("out", help="output file; the format follows its extension unless --format is given")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS))
+    args = parser.parse_args(argv)
+
+    fmt = args.format or os.path.splitext(args.out)[1].lstrip(".").lower()
+    if fmt not in EXPORT_FORMATS:
+        parser.error(f"cannot tell the format from {args.out!r}; pass --format")
+    with open(args.out, "wb") as out:
+        export_briefs(read_jsonl_records(args.source), fmt, out)
+    print(f"Wrote {args.out}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,675 @@
+"""Strategy and brief generation on top of the cache, client pool and scheduler.
+
+Nothing here touches Streamlit: functions take an Anthropic client, raise on
+failure and report progress through callbacks, so the app and the CLI can
+share them.
+"""
+
+import json
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from types import SimpleNamespace
+
+from .budget import estimate_prompt_tokens, estimate_tokens, fit_to_budget
+from .cache import get_response_cache
+from .clients import get_client_registry
+from .config import (
+    BRIEF_ANCHORS_MAX_TOKENS,
+    BRIEF_MAX_TOKENS,
+    BRIEF_SECTION_MAX_TOKENS,
+    CANCEL_GRACE_SECONDS,
+    MODEL_NAME,
+    NOVELTY_MAX_ROUNDS,
+    NOVELTY_THRESHOLD,
+    PREFETCH_MAX_WORKERS,
+    PREFETCH_RESULT_TTL_SECONDS,
+    PROMPT_CACHE_DEFAULT_MIN_TOKENS,
+    PROMPT_CACHE_MIN_TOKENS,
+    PROMPT_CACHE_WARMUP_SECONDS,
+    STRATEGY_MAX_TOKENS,
+    STRATEGY_OVERSAMPLE,
+    STRATEGY_SHARD_MAX_TOKENS,
+    STRATEGY_SHARD_SIZE,
+    STRATEGY_SHARD_WORKERS,
+    STREAM_REFRESH_SECONDS,
+)
+from .hedging import get_hedger, run_hedged
+from .prompts import (
+    SHARDS_TOOL,
+    TITLES_TOOL,
+    assemble_brief,
+    build_brief_anchors_prompt,
+    build_brief_prompt,
+    build_replacement_prompt,
+    build_section_prompt,
+    build_shard_plan_prompt,
+    build_shard_titles_prompt,
+    build_strategy_prompt,
+    clean_section,
+    parse_brief_anchors,
+    parse_shard_titles,
+    parse_shards,
+    parse_strategy_line,
+    split_template_sections,
+)
+from .routing import DEFAULT_ROUTE, ROUTE_OF_KIND, get_model_router, is_overloaded_error
+from .scheduler import CallCancelledError, DeadlineExceededError, StreamInterruptedError, is_retryable_error
+from .telemetry import get_telemetry
+
+class TokenUsage:
+    """Thread-safe running totals of the message.usage counters of several calls.
+
+    Usage added to a TokenUsage with a parent is added to the parent too.
+    """
+
+    FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.calls = 0
+        self.totals = dict.fromkeys(self.FIELDS, 0)
+        self._lock = threading.Lock()
+
+    def add(self, usage):
+        with self._lock:
+            self.calls += 1
+            for field in self.FIELDS:
+                self.totals[field] += getattr(usage, field, 0) or 0
+        if self.parent is not None:
+            self.parent.add(usage)
+
+    def summary(self):
+        with self._lock:
+            return {"calls": self.calls, **self.totals}
+
+def fit_strategy_inputs(existing_titles, guidelines):
+    """existing_titles and guidelines, compacted if a strategy prompt would exceed PROMPT_TOKEN_BUDGET."""
+    fitted = fit_to_budget(build_strategy_prompt, {"existing_titles": existing_titles, "guidelines": guidelines})
+    return fitted["existing_titles"], fitted["guidelines"]
+
+def fit_brief_inputs(template, guidelines):
+    """template and guidelines, compacted if a brief prompt would exceed PROMPT_TOKEN_BUDGET.
+
+    The title is left out, so every brief of a batch keeps the same system block.
+    """
+    fitted = fit_to_budget(build_brief_prompt, {"template": template, "guidelines": guidelines}, title="")
+    return fitted["template"], fitted["guidelines"]
+
+def prompt_cacheable(system, model):
+    """Whether system is long enough for the API to prompt-cache it for model."""
+    return estimate_tokens(system) >= PROMPT_CACHE_MIN_TOKENS.get(model, PROMPT_CACHE_DEFAULT_MIN_TOKENS)
+
+def build_message_request(prompt, max_tokens, system="", tool=None, model=MODEL_NAME):
+    """Messages API parameters for a prompt, with system sent as a prompt-cacheable block if it is long enough.
+
+    With a tool definition the model is forced to answer by calling that tool.
+    """
+    request = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "messages": [
+            {"role": "user", "content": prompt}
+        ]
+    }
+    if system:
+        block = {"type": "text", "text": system}
+        if prompt_cacheable(system, model):
+            block["cache_control"] = {"type": "ephemeral"}
+        request["system"] = [block]
+    if tool:
+        request["tools"] = [tool]
+        request["tool_choice"] = {"type": "tool", "name": tool["name"]}
+    return request
+
+def message_text(message):
+    """The text of a response: the JSON input of its tool call if it made one, else its text blocks."""
+    for block in message.content:
+        if block.type == "tool_use":
+            return json.dumps(block.input, ensure_ascii=False)
+    return "".join(block.text for block in message.content if block.type == "text")
+
+def create_completion(client, prompt, max_tokens, use_cache=True, on_text=None, system="", usage=None,
+                      kind="completion", tool=None, route=None, cancel=None):
+    """Return the completion text for a prompt, reusing a cached response when allowed.
+
+    With use_cache=False the API is always called, and the fresh response replaces
+    whatever was cached for the same prompt. When on_text is given the response is
+    streamed and on_text receives each text delta as it arrives (a cached response
+    is delivered as a single delta).
+
+    system holds the part of the prompt that stays the same across a batch. It is
+    sent as a system block marked with cache_control so the API can serve it from
+    its prompt cache; the usage counters of the call are added to usage.
+
+    The model and the max_tokens cap come from the policy of route (by default
+    the route of kind) in the ModelRouter. The router's candidates are tried in
+    order: a model that answers "overloaded", or keeps failing after the
+    scheduler's retries, hands the call to the next one. The response is cached
+    under the route's primary model, whichever model wrote it.
+
+    The call goes through the client's RequestScheduler, which applies rate limits
+    and retries throttled or failed requests, and is recorded in the telemetry
+    under kind. The local estimate of its input tokens is what the rate limiter
+    reserves, and is recorded next to the input tokens the API reports.
+
+    A streamed request slow to start answering may be hedged with a duplicate
+    (see hedging.py). The route's deadline runs from the first request and
+    covers its retries and fallbacks; a call still unanswered by then raises
+    DeadlineExceededError. Setting cancel, a threading.Event, abandons the call
+    and raises CallCancelledError. Requests cancelled on the way, such as hedge
+    losers, are recorded as "abandoned" calls and added to usage with the tokens
+    they were billed for.
+
+    With tool, the model must answer through that tool and the returned text is
+    the JSON of its input; tool calls are never streamed.
+    """
+    telemetry = get_telemetry()
+    response_cache = get_response_cache()
+    router = get_model_router()
+    route = route or ROUTE_OF_KIND.get(kind, DEFAULT_ROUTE)
+    max_tokens = router.max_tokens(route, max_tokens)
+    key = response_cache.make_key(router.policy(route)["model"], system, prompt, max_tokens, tool)
+    if tool:
+        on_text = None
+    if use_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            telemetry.record(kind, router.policy(route)["model"], status="cached")
+            if on_text:
+                on_text(cached)
+            return cached
+
+    estimated_tokens = estimate_prompt_tokens(system, prompt) + (estimate_tokens(json.dumps(tool)) if tool else 0)
+    scheduler = get_client_registry().scheduler_for(client)
+    hedger = get_hedger()
+    hedge_after = hedger.plan(kind) if on_text else None
+    deadline = router.deadline(route)
+    # The deadline runs from the first request and covers every retry and fallback after it.
+    window = {}
+    models = router.candidates(route)
+    for position, model in enumerate(models):
+        has_fallback = position < len(models) - 1
+        request = build_message_request(prompt, max_tokens, system, tool, model)
+        timing = {"retries": 0}
+
+        def send(request=request, model=model):
+            timing["sent_at"] = time.monotonic()
+            for name in ("first_token_at", "hedged", "hedge_won", "abandoned"):
+                timing.pop(name, None)
+            if cancel is not None and cancel.is_set():
+                raise CallCancelledError("The call was cancelled")
+            remaining = None
+            if deadline:
+                remaining = window.setdefault("deadline_at", timing["sent_at"] + deadline) - timing["sent_at"]
+                if remaining <= 0:
+                    raise DeadlineExceededError(f"No complete response within the {deadline:g}s deadline")
+            start = partial(
+                client.messages.stream if on_text else client.messages.create, **request,
+                **({"timeout": remaining} if remaining else {})
+            )
+
+            hedge_slots = []
+
+            def allow_hedge():
+                # A hedge only runs in a concurrency slot that is free now, so it never goes past the AIMD limit.
+                if not scheduler.try_acquire_slot():
+                    return False
+                if not hedger.allow():
+                    scheduler.release_slot()
+                    return False
+                hedge_slots.append(True)
+                return True
+
+            def start_hedge():
+                scheduler.reserve(estimated_tokens)
+                return start()
+
+            chunks = []
+
+            def deliver(text):
+                chunks.append(text)
+                on_text(text)
+
+            try:
+                message = run_hedged(
+                    start, stream=bool(on_text), on_text=deliver if on_text else None, hedge_after=hedge_after,
+                    deadline=remaining, allow_hedge=allow_hedge, start_hedge=start_hedge, timing=timing,
+                    cancel=cancel
+                )
+            except Exception as e:
+                if chunks:
+                    raise StreamInterruptedError(f"Stream interrupted after {len(chunks)} chunks: {e}") from e
+                raise
+            finally:
+                for _ in hedge_slots:
+                    scheduler.release_slot()
+                # Cancelled requests were still billed for what they consumed; without a usage report the
+                # input is estimated from the prompt.
+                for spent in timing.get("abandoned", ()):
+                    spent = spent or SimpleNamespace(input_tokens=estimated_tokens)
+                    telemetry.record(kind, model, status="abandoned", usage=spent)
+                    if usage is not None:
+                        usage.add(spent)
+                if timing.get("hedged"):
+                    telemetry.record_hedge(kind, won=timing.get("hedge_won", False))
+            return "".join(chunks) if on_text else message_text(message), message
+
+        def on_retry(error):
+            timing["retries"] += 1
+
+        started = time.monotonic()
+        try:
+            response_text, message = scheduler.call(
+                send, estimated_tokens=estimated_tokens, on_retry=on_retry,
+                should_retry=(lambda error: not is_overloaded_error(error)) if has_fallback else None, window=window
+            )
+        except CallCancelledError:
+            # Giving up on a call says nothing about the model; the abandoned requests are already recorded.
+            raise
+        except Exception as e:
+            telemetry.record(kind, model, status="error", retries=timing["retries"], error=e)
+            router.record(route, model, ok=False, overloaded=is_overloaded_error(e))
+            if has_fallback and is_retryable_error(e) and not isinstance(e, StreamInterruptedError):
+                continue
+            raise
+        break
+    finished = time.monotonic()
+    router.record(route, model, finished - timing["sent_at"])
+    if on_text and "first_token_at" in timing:
+        hedger.record(kind, timing["first_token_at"] - timing["sent_at"])
+    telemetry.record(
+        kind, model, usage=message.usage, retries=timing["retries"],
+        ttft=timing["first_token_at"] - timing["sent_at"] if on_text and "first_token_at" in timing else None,
+        latency=finished - timing["sent_at"], queued=timing["sent_at"] - started,
+        estimated_input_tokens=estimated_tokens
+    )
+
+    if usage is not None:
+        usage.add(message.usage)
+    response_cache.put(key, response_text)
+    return response_text
+
+def request_strategies(client, existing_titles, guidelines, use_cache=True, on_title=None, usage=None,
+                       title_index=None, novelty_threshold=NOVELTY_THRESHOLD, on_duplicate=None):
+    """Return 10 new content strategy titles based strictly on the guidelines.
+
+    If on_title is given the response is streamed and on_title is called with each
+    title as soon as its numbered line is complete.
+
+    Candidates that near-duplicate a title in title_index (or each other) are
+    dropped and reported through on_duplicate, and replacements are requested,
+    for up to NOVELTY_MAX_ROUNDS calls in total, until 10 novel titles remain.
+    Errors in the first call are raised; if a replacement call fails, the titles
+    accepted so far are returned.
+    """
+    # The similarity index needs numpy and scipy, so it is imported with the first strategy request.
+    from .corpus import NoveltyFilter, TitleIndex
+
+    existing_titles, guidelines = fit_strategy_inputs(existing_titles, guidelines)
+    system, prompt = build_strategy_prompt(existing_titles, guidelines)
+    novelty = NoveltyFilter(title_index or TitleIndex([]), novelty_threshold)
+
+    reported = []
+
+    def accept(lines):
+        candidates = [title for title in map(parse_strategy_line, lines) if title]
+        if on_title:
+            for title in candidates:
+                if len(novelty.accepted) < 10 and novelty.filter([title]):
+                    on_title(title)
+        else:
+            novelty.filter(candidates)
+        if on_duplicate:
+            for title in novelty.rejected[len(reported):]:
+                reported.append(title)
+                on_duplicate(title)
+
+    for round_number in range(NOVELTY_MAX_ROUNDS):
+        needed = 10 - len(novelty.accepted)
+        if needed <= 0:
+            break
+        round_prompt = prompt
+        if novelty.accepted or novelty.rejected:
+            round_prompt = build_replacement_prompt(needed, novelty.accepted, novelty.rejected)
+
+        on_text = None
+        if on_title:
+            pending = {"line": ""}
+
+            def on_text(chunk):
+                pending["line"] += chunk
+                *complete_lines, pending["line"] = pending["line"].split('\n')
+                accept(complete_lines)
+
+        try:
+            response_text = create_completion(
+                client, round_prompt, max_tokens=STRATEGY_MAX_TOKENS, use_cache=use_cache, on_text=on_text,
+                system=system, usage=usage, kind="strategy"
+            )
+        except Exception:
+            if round_number == 0 or not novelty.accepted:
+                raise
+            break
+        accept([pending["line"]] if on_title else response_text.split('\n'))
+
+    return novelty.accepted[:10]
+
+def plan_strategy_shards(client, existing_titles, guidelines, count, use_cache=True, usage=None):
+    """Split the content plan into count shards (content levels or subtopics) with one structured call."""
+    if count == 1:
+        return parse_shards("", 1)
+    existing_titles, guidelines = fit_strategy_inputs(existing_titles, guidelines)
+    system, prompt = build_shard_plan_prompt(existing_titles, guidelines, count)
+    return parse_shards(create_completion(
+        client, prompt, max_tokens=STRATEGY_MAX_TOKENS, use_cache=use_cache, system=system, usage=usage,
+        kind="strategy_plan", tool=SHARDS_TOOL
+    ), count)
+
+def request_many_strategies(client, existing_titles, guidelines, count, max_workers=STRATEGY_SHARD_WORKERS,
+                            use_cache=True, usage=None, title_index=None, novelty_threshold=NOVELTY_THRESHOLD,
+                            on_duplicate=None):
+    """Return up to count new titles, ranked, as {title, primary_keyword, score, shard} dicts.
+
+    The plan is first split into shards of about STRATEGY_SHARD_SIZE titles, each
+    shard asks for its share (plus STRATEGY_OVERSAMPLE headroom for duplicates)
+    in parallel, and every reply comes back through the record_titles tool as
+    JSON with a 1-10 priority score. Candidates are deduplicated best score
+    first against title_index and across shards; if fewer than count survive,
+    the shards are asked again, for up to NOVELTY_MAX_ROUNDS rounds, with the
+    titles to avoid. The result is sorted by score, ties keeping shard order.
+
+    A shard call that fails is skipped; errors are raised only if the first
+    round produced no titles at all.
+    """
+    from .corpus import NoveltyFilter, TitleIndex
+
+    existing_titles, guidelines = fit_strategy_inputs(existing_titles, guidelines)
+    system, _ = build_strategy_prompt(existing_titles, guidelines)
+    novelty = NoveltyFilter(title_index or TitleIndex([]), novelty_threshold)
+    shard_count = max(1, math.ceil(count * STRATEGY_OVERSAMPLE / STRATEGY_SHARD_SIZE))
+    shards = plan_strategy_shards(client, existing_titles, guidelines, shard_count, use_cache, usage)
+    seen_by_shard = {shard["name"]: [] for shard in shards}
+    accepted = []
+
+    def request_shard(shard, size):
+        prompt = build_shard_titles_prompt(size, shard, seen_by_shard[shard["name"]])
+        return parse_shard_titles(create_completion(
+            client, prompt, max_tokens=STRATEGY_SHARD_MAX_TOKENS, use_cache=use_cache,
+            system=system, usage=usage, kind="strategy_shard", tool=TITLES_TOOL
+        ))
+
+    workers = max(1, min(max_workers, len(shards)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="strategy-shard") as executor:
+        for round_number in range(NOVELTY_MAX_ROUNDS):
+            needed = count - len(accepted)
+            if needed <= 0:
+                break
+            per_shard = math.ceil(needed * STRATEGY_OVERSAMPLE / len(shards))
+            futures = [executor.submit(request_shard, shard, per_shard) for shard in shards]
+            candidates = []
+            first_error = None
+            for shard, future in zip(shards, futures):
+                try:
+                    items = future.result()
+                except Exception as e:
+                    first_error = first_error or e
+                    continue
+                for item in items:
+                    candidates.append({**item, "shard": shard["name"]})
+                    seen_by_shard[shard["name"]].append(item["title"])
+            if not candidates:
+                if first_error is not None and not accepted:
+                    raise first_error
+                break
+
+            candidates.sort(key=lambda item: -item["score"])
+            rejected_before = len(novelty.rejected)
+            novel = set(novelty.filter([item["title"] for item in candidates]))
+            for item in candidates:
+                if item["title"] in novel:
+                    novel.discard(item["title"])
+                    accepted.append(item)
+            if on_duplicate:
+                for title in novelty.rejected[rejected_before:]:
+                    on_duplicate(title)
+
+    ranked = sorted(accepted, key=lambda item: -item["score"])
+    return ranked[:count]
+
+def brief_cache_key(title, template, guidelines):
+    """Response-cache key of the brief request for this title."""
+    template, guidelines = fit_brief_inputs(template, guidelines)
+    system, prompt = build_brief_prompt(title, template, guidelines)
+    router = get_model_router()
+    return get_response_cache().make_key(
+        router.policy("brief")["model"], system, prompt, router.max_tokens("brief", BRIEF_MAX_TOKENS)
+    )
+
+def request_brief(client, title, template, guidelines, use_cache=True, on_text=None, usage=None, route="brief",
+                  cancel=None):
+    """Request a single brief from the API. Raises on failure so callers decide how to report it.
+
+    route picks the ModelRouter policy; the app's manual briefs use "manual_brief".
+    cancel is passed on to create_completion.
+    """
+    template, guidelines = fit_brief_inputs(template, guidelines)
+    system, prompt = build_brief_prompt(title, template, guidelines)
+    return create_completion(
+        client, prompt, max_tokens=BRIEF_MAX_TOKENS, use_cache=use_cache, on_text=on_text,
+        system=system, usage=usage, kind="brief", route=route, cancel=cancel
+    )
+
+def request_brief_by_sections(client, title, template, guidelines, use_cache=True, on_text=None, usage=None,
+                              route="brief", cancel=None):
+    """Write a brief with one call per '## ' section of the template, all sections at once.
+
+    Output tokens are generated serially within a call, so a long brief split into
+    its sections finishes roughly as fast as its longest section. A short call
+    first fixes the H1, slug and keywords, which every section prompt receives;
+    the sections are then assembled in template order and the anchored H1 and
+    slug are forced onto their lines. on_text receives each section, in order, as
+    soon as it and the ones before it are done. Templates with fewer than two
+    sections are written with a single request_brief call.
+    """
+    sections = split_template_sections(template)
+    if len(sections) < 2:
+        return request_brief(client, title, template, guidelines, use_cache, on_text, usage, route, cancel)
+
+    template, guidelines = fit_brief_inputs(template, guidelines)
+    system, prompt = build_brief_anchors_prompt(title, template, guidelines)
+    anchors = parse_brief_anchors(create_completion(
+        client, prompt, max_tokens=BRIEF_ANCHORS_MAX_TOKENS, use_cache=use_cache, system=system, usage=usage,
+        kind="brief_anchors", route=route, cancel=cancel
+    ), title)
+
+    with ThreadPoolExecutor(max_workers=len(sections), thread_name_prefix="brief-section") as executor:
+        futures = []
+        for heading, body in sections:
+            system, prompt = build_section_prompt(title, template, guidelines, heading, body, anchors)
+            futures.append(executor.submit(
+                create_completion, client, prompt, BRIEF_SECTION_MAX_TOKENS, use_cache=use_cache, system=system,
+                usage=usage, kind="brief_section", route=route, cancel=cancel
+            ))
+        parts = []
+        try:
+            for (heading, _), future in zip(sections, futures):
+                parts.append(clean_section(future.result(), heading))
+                if on_text:
+                    on_text(("\n\n" if len(parts) > 1 else "") + parts[-1])
+        finally:
+            for future in futures:
+                future.cancel()
+    return assemble_brief(parts, anchors)
+
+def request_briefs_concurrently(client, titles, template, guidelines, max_workers, use_cache=True,
+                                on_text=None, on_tick=None, prefetched=None, usage=None, by_sections=False,
+                                brief_stats=None):
+    """Generate briefs in parallel, yielding (title, brief, error) as each one completes.
+
+    Results arrive in completion order, not input order. With on_text, briefs are
+    streamed and on_text(title, chunk) is called from the worker threads, while
+    on_tick() is called on the consuming thread every STREAM_REFRESH_SECONDS so
+    the caller can repaint partial output.
+
+    prefetched maps titles to futures already started by the BriefPrefetcher;
+    those titles are awaited instead of being requested again. With by_sections,
+    each brief is written with request_brief_by_sections.
+
+    If brief_stats is a dict, the seconds and token usage of each brief are
+    stored in it under its title before the brief is yielded (prefetched briefs
+    have none).
+
+    The first brief is sent alone until it starts answering (or for at most
+    PROMPT_CACHE_WARMUP_SECONDS), so that the shared guidelines/template prefix is
+    already in the API prompt cache when the rest of the batch starts. Prefixes
+    too short for the model to cache are not waited for. Closing the generator
+    early, or an exception raised by on_tick, cancels the briefs that have not
+    started yet and abandons the ones in flight: streamed ones have their
+    connections closed, and none is waited for longer than CANCEL_GRACE_SECONDS.
+    """
+    if not titles:
+        return
+
+    prefetched = prefetched or {}
+    brief_fn = request_brief_by_sections if by_sections else request_brief
+    stop = threading.Event()
+
+    def write_brief(title, title_on_text):
+        if brief_stats is None:
+            return brief_fn(client, title, template, guidelines, use_cache, title_on_text, usage, cancel=stop)
+        title_usage = TokenUsage(parent=usage)
+        started = time.monotonic()
+        brief = brief_fn(client, title, template, guidelines, use_cache, title_on_text, title_usage, cancel=stop)
+        brief_stats[title] = {"seconds": round(time.monotonic() - started, 3), **title_usage.summary()}
+        return brief
+    fresh_titles = [title for title in titles if title not in prefetched]
+    workers = max(1, min(max_workers, len(fresh_titles)))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {future: title for title, future in prefetched.items() if title in titles}
+    pending = set()
+    try:
+        if fresh_titles:
+            first_title = fresh_titles[0]
+            prefix_cached = threading.Event()
+
+            def on_first_text(chunk):
+                prefix_cached.set()
+                if on_text:
+                    on_text(first_title, chunk)
+
+            first_future = executor.submit(write_brief, first_title, on_first_text)
+            first_future.add_done_callback(lambda _: prefix_cached.set())
+            futures[first_future] = first_title
+            if len(fresh_titles) > 1 and prompt_cacheable(
+                build_brief_prompt("", *fit_brief_inputs(template, guidelines))[0],
+                get_model_router().policy("brief")["model"]
+            ):
+                warm_until = time.monotonic() + PROMPT_CACHE_WARMUP_SECONDS
+                # on_tick keeps running during the warmup, so the caller can still stop the batch.
+                while not prefix_cached.wait(min(STREAM_REFRESH_SECONDS, max(0.0, warm_until - time.monotonic()))):
+                    if time.monotonic() >= warm_until:
+                        break
+                    if on_tick:
+                        on_tick()
+
+        for title in fresh_titles[1:]:
+            future = executor.submit(write_brief, title, partial(on_text, title) if on_text else None)
+            futures[future] = title
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(
+                pending, timeout=STREAM_REFRESH_SECONDS if on_tick else None, return_when=FIRST_COMPLETED
+            )
+            if on_tick:
+                on_tick()
+            for future in done:
+                title = futures[future]
+                try:
+                    yield title, future.result(), None
+                except Exception as e:
+                    yield title, "", e
+    finally:
+        for future in pending:
+            future.cancel()
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        # Streamed requests stop at once, so a short wait is enough for their usage to be counted.
+        wait([future for future, title in futures.items() if title not in prefetched], timeout=CANCEL_GRACE_SECONDS)
+
+class BriefPrefetcher:
+    """Runs speculative brief requests in the background, shared by every session.
+
+    Futures are keyed by the brief's response-cache key, so the same request made
+    from two sessions only calls the API once, and finished briefs also land in
+    the response cache. Results nobody claims are forgotten after ttl_seconds.
+    discard() only removes cache entries a prefetch wrote itself, never a brief
+    that was already cached before it ran.
+    """
+
+    def __init__(self, max_workers=PREFETCH_MAX_WORKERS, ttl_seconds=PREFETCH_RESULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="brief-prefetch")
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _run(key, fn, args, state):
+        was_cached = get_response_cache().get(key) is not None
+        result = fn(*args)
+        state["wrote_cache"] = not was_cached
+        return result
+
+    def submit(self, key, fn, *args):
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, started, _) in self._futures.items() if now - started > self.ttl_seconds]
+            for k in expired:
+                del self._futures[k]
+            entry = self._futures.get(key)
+            if entry and not entry[0].cancelled():
+                return entry[0]
+            state = {}
+            future = self._executor.submit(self._run, key, fn, args, state)
+            self._futures[key] = (future, now, state)
+            return future
+
+    def peek(self, key):
+        with self._lock:
+            entry = self._futures.get(key)
+        return entry[0] if entry else None
+
+    def take(self, key):
+        with self._lock:
+            entry = self._futures.pop(key, None)
+        return entry[0] if entry else None
+
+    def discard(self, key):
+        """Cancel a speculative request and drop the response it wrote, if any, from the response cache."""
+        with self._lock:
+            entry = self._futures.pop(key, None)
+        if entry is None:
+            return
+        future, _, state = entry
+        if future.cancel():
+            return
+
+        def forget(_):
+            if state.get("wrote_cache"):
+                get_response_cache().delete(key)
+
+        future.add_done_callback(forget)
+
+_default_prefetcher = None
+_default_prefetcher_lock = threading.Lock()
+
+def get_brief_prefetcher():
+    """The process-wide BriefPrefetcher, created on first use."""
+    global _default_prefetcher
+    with _default_prefetcher_lock:
+        if _default_prefetcher is None:
+            _default_prefetcher = BriefPrefetcher()
+        return _default_prefetcher
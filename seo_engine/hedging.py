@@ -0,0 +1,268 @@
+"""Per-call deadlines and hedged requests.
+
+Every request runs on a worker thread while the calling thread waits for its
+events, so a call can be given up on without waiting for the connection. A
+streamed call that has not produced its first token after the HEDGE_PERCENTILE
+of the recent times to first token of its kind (at least
+HEDGE_MIN_DELAY_SECONDS, and only once HEDGE_MIN_SAMPLES are known) gets a
+duplicate request. Whichever request starts answering first is kept and the
+other is cancelled by closing its connection. Plain calls are never hedged:
+their first token comes with the whole response, so the losing request could
+not be stopped and would be paid in full. The Hedger allows at most
+HEDGE_MAX_RATE of the calls it plans to be hedged, which bounds the extra
+spend; a hedge is also only sent into a free slot of the RequestScheduler, so
+it never goes past the concurrency limit. The usage of every cancelled request
+is reported so that the spend shows up in the metrics.
+
+A call with no complete response by its deadline is cancelled too and raises
+DeadlineExceededError; one whose caller sets its cancel event raises
+CallCancelledError.
+"""
+
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from types import SimpleNamespace
+
+from .budget import estimate_tokens
+from .config import (
+    HEDGE_MAX_RATE,
+    HEDGE_MIN_DELAY_SECONDS,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+    HEDGE_WINDOW,
+)
+from .scheduler import CallCancelledError, DeadlineExceededError
+from .telemetry import INPUT_TOKEN_FIELDS, percentiles
+
+# How often the calling thread passes the text buffered by the answering request on to on_text.
+DELIVERY_INTERVAL_SECONDS = 0.05
+
+class Hedger:
+    """When to hedge a call of each kind, from recent times to first token, and the cap on hedges."""
+
+    def __init__(self, max_rate=HEDGE_MAX_RATE, percentile=HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES,
+                 min_delay=HEDGE_MIN_DELAY_SECONDS, window=HEDGE_WINDOW):
+        self.max_rate = max_rate
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.window = window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.hedged = 0
+            self._ttfts = defaultdict(lambda: deque(maxlen=self.window))
+
+    def plan(self, kind):
+        """Count one call of kind; returns the seconds after which to hedge it, or None to never hedge it.
+
+        Call it once per call, however many times the call is retried.
+        """
+        with self._lock:
+            self.calls += 1
+            ttfts = list(self._ttfts[kind])
+        if not self.max_rate or len(ttfts) < self.min_samples:
+            return None
+        return max(self.min_delay, percentiles(ttfts, (self.percentile,))[0])
+
+    def allow(self):
+        """Whether one more call may be hedged without going over max_rate; counts the hedge if so."""
+        with self._lock:
+            if self.hedged + 1 > self.max_rate * self.calls:
+                return False
+            self.hedged += 1
+            return True
+
+    def record(self, kind, ttft):
+        with self._lock:
+            self._ttfts[kind].append(ttft)
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "hedged": self.hedged, "rate": self.hedged / self.calls if self.calls else 0.0}
+
+class _Attempt:
+    """One request of a call, run on its own thread.
+
+    Text deltas of a stream are buffered in chunks; only the first token, the
+    final message and errors are put on the call's event queue, so the calling
+    thread is not woken for every delta.
+    """
+
+    def __init__(self, number, start, events, stream):
+        self.number = number
+        self.chunks = []
+        self.cancelled = False
+        self.message = None
+        self.started_usage = None
+        self._stream = None
+        self._lock = threading.Lock()
+        threading.Thread(
+            target=self._run, args=(start, events, stream), name=f"request-attempt-{number}", daemon=True
+        ).start()
+
+    def _run(self, start, events, stream):
+        try:
+            if not stream:
+                self.message = start()
+                events.put((self, "done", self.message))
+                return
+            with start() as stream:
+                with self._lock:
+                    if self.cancelled:
+                        return
+                    self._stream = stream
+                started = False
+                for event in stream:
+                    if self.cancelled:
+                        return
+                    if event.type == "message_start":
+                        self.started_usage = event.message.usage
+                    if event.type != "content_block_delta":
+                        continue
+                    if event.delta.type == "text_delta":
+                        self.chunks.append(event.delta.text)
+                    if not started:
+                        started = True
+                        events.put((self, "first", None))
+                self.message = stream.get_final_message()
+                events.put((self, "done", self.message))
+        except Exception as e:
+            events.put((self, "error", e))
+
+    def spent(self):
+        """Tokens billed for this request as far as known, or None if it never started answering.
+
+        That is the final usage if it finished, else the input tokens its
+        stream reported at the start plus an estimate of the text it streamed.
+        """
+        if self.message is not None:
+            return self.message.usage
+        if self.started_usage is None:
+            return None
+        return SimpleNamespace(
+            **{field: getattr(self.started_usage, field, 0) or 0 for field in INPUT_TOKEN_FIELDS},
+            output_tokens=estimate_tokens("".join(self.chunks))
+        )
+
+    def cancel(self):
+        """Stop the request; its connection is closed now if the response has started, else once it does."""
+        with self._lock:
+            self.cancelled = True
+            stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+def run_hedged(start, stream=False, on_text=None, hedge_after=None, deadline=None, allow_hedge=None,
+               start_hedge=None, timing=None, cancel=None):
+    """The final message of the request sent by start(), hedged and bounded by deadline.
+
+    start() returns the Message, or with stream a Messages API stream manager
+    whose text deltas from the request that answers first are passed to
+    on_text, on the calling thread, in batches every DELIVERY_INTERVAL_SECONDS.
+    After hedge_after seconds without a first token, and if allow_hedge()
+    agrees, a duplicate is sent with start_hedge (default start). timing, if
+    given, gets "first_token_at" and, for a hedged call, "hedged" and
+    "hedge_won" (whether the duplicate answered first). Once the call is over,
+    timing["abandoned"] lists _Attempt.spent() of every request that was
+    cancelled, hedge losers as well as requests cut off by the deadline, even
+    after they started answering.
+
+    Setting cancel, a threading.Event, abandons the call within
+    DELIVERY_INTERVAL_SECONDS: its requests are cancelled and
+    CallCancelledError is raised. A plain request cannot be stopped once
+    sent, so only streamed ones actually stop.
+    """
+    timing = {} if timing is None else timing
+    events = queue.SimpleQueue()
+    started = time.monotonic()
+    attempts = [_Attempt(0, start, events, stream)]
+    failed = []
+    winner = None
+    finished = None
+    delivered = 0
+    hedge_at = started + hedge_after if hedge_after is not None else None
+    deadline_at = started + deadline if deadline else None
+
+    def deliver():
+        nonlocal delivered
+        chunks = winner.chunks[delivered:]
+        delivered += len(chunks)
+        for chunk in chunks:
+            on_text(chunk)
+
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise CallCancelledError("The call was cancelled")
+            now = time.monotonic()
+            waits = [at - now for at in (hedge_at if winner is None else None, deadline_at) if at is not None]
+            if (winner is not None and on_text) or cancel is not None:
+                waits.append(DELIVERY_INTERVAL_SECONDS)
+            try:
+                attempt, kind, payload = events.get(timeout=max(0.0, min(waits)) if waits else None)
+            except queue.Empty:
+                if winner is not None and on_text:
+                    deliver()
+                if deadline_at is not None and time.monotonic() >= deadline_at:
+                    raise DeadlineExceededError("No complete response before the deadline") from None
+                if winner is not None or hedge_at is None or time.monotonic() < hedge_at:
+                    continue
+                hedge_at = None
+                if allow_hedge is None or allow_hedge():
+                    timing["hedged"] = True
+                    attempts.append(_Attempt(1, start_hedge or start, events, stream))
+                continue
+            if attempt.cancelled or (winner is not None and attempt is not winner):
+                continue
+            if kind == "error":
+                failed.append(attempt)
+                if attempt is winner or len(failed) == len(attempts):
+                    if winner is not None and on_text:
+                        deliver()
+                    raise payload
+                continue
+            if winner is None:
+                winner = attempt
+                timing["first_token_at"] = time.monotonic()
+                if timing.get("hedged"):
+                    timing["hedge_won"] = attempt.number > 0
+                for other in attempts:
+                    if other is not attempt:
+                        other.cancel()
+            if kind == "done":
+                if on_text:
+                    deliver()
+                finished = attempt
+                return payload
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
+        timing["abandoned"] = [
+            attempt.spent() for attempt in attempts if attempt is not finished and attempt not in failed
+        ]
+
+_default_hedger = None
+_default_hedger_lock = threading.Lock()
+
+def get_hedger():
+    """The process-wide Hedger, created on first use."""
+    global _default_hedger
+    with _default_hedger_lock:
+        if _default_hedger is None:
+            _default_hedger = Hedger()
+        return _default_hedger
+
+def set_hedger(hedger):
+    """Replace the process-wide hedger (e.g. one with another max_rate)."""
+    global _default_hedger
+    with _default_hedger_lock:
+        _default_hedger = hedger
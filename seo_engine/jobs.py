@@ -0,0 +1,397 @@
+"""Persistent queue of brief jobs that run independently of any browser session.
+
+A job is a list of titles plus the guidelines and template to write them with.
+Jobs run on worker threads of this process and every finished brief is written
+to SQLite as soon as it completes, so progress and results survive reruns,
+page refreshes and closed tabs, and any session can reattach to a job by id.
+
+API keys are never written to disk. The client only lives in memory while the
+job runs, so jobs left unfinished by a server restart are marked
+"interrupted"; resume() continues them with a new client. Every job records
+the process running it (host, boot id and pid), so a queue opened by another
+server process sharing the database only interrupts jobs whose process is
+gone. The Message Batches a job has submitted are recorded until their
+results are read, so resuming it polls them again instead of paying for the
+same briefs twice. A failed job leaves its batches running for that; a
+cancelled one cancels them.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .batches import request_briefs_in_batches
+from .config import JOB_MAX_RUNNING, JOB_RETENTION_SECONDS, JOBS_PATH
+from .generation import TokenUsage, request_briefs_concurrently
+
+ACTIVE_STATUSES = ("queued", "running")
+
+def boot_id():
+    """Identifier of the current boot of this machine, or "" where the OS does not expose one."""
+    try:
+        with open("/proc/sys/kernel/random/boot_id", encoding="ascii") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+def process_owner():
+    """Owner id of the jobs this process runs: host name, boot id and pid."""
+    return json.dumps([socket.gethostname(), boot_id(), os.getpid()])
+
+def owner_alive(owner):
+    """Whether the process recorded as owner may still be running.
+
+    Owners on another host are assumed alive since they cannot be checked;
+    on this host the boot id and the pid have to match a live process.
+    """
+    try:
+        host, owner_boot_id, pid = json.loads(owner)
+    except (TypeError, ValueError):
+        return False
+    if host != socket.gethostname():
+        return True
+    if owner_boot_id != boot_id():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class JobCancelled(Exception):
+    """Raised inside a job's worker thread to stop it once cancel() was called."""
+
+class JobQueue:
+    """SQLite-backed brief jobs executed by at most max_running worker threads."""
+
+    def __init__(self, path=JOBS_PATH, max_running=JOB_MAX_RUNNING, retention_seconds=JOB_RETENTION_SECONDS):
+        self.path = path
+        self.owner = process_owner()
+        self._lock = threading.Lock()
+        self._runs = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_running, thread_name_prefix="brief-job")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                label TEXT NOT NULL,
+                status TEXT NOT NULL,
+                template TEXT NOT NULL,
+                guidelines TEXT NOT NULL,
+                max_workers INTEGER NOT NULL,
+                use_cache INTEGER NOT NULL,
+                use_batches INTEGER NOT NULL,
+                by_sections INTEGER NOT NULL DEFAULT 0,
+                owner TEXT,
+                error TEXT,
+                usage TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                status TEXT NOT NULL,
+                brief TEXT,
+                error TEXT,
+                stats TEXT,
+                finished_at REAL,
+                PRIMARY KEY (job_id, position)
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS job_batches (
+                job_id TEXT NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+                batch_id TEXT NOT NULL,
+                requests TEXT NOT NULL,
+                PRIMARY KEY (job_id, batch_id)
+            )"""
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "by_sections" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN by_sections INTEGER NOT NULL DEFAULT 0")
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        if "stats" not in {row[1] for row in self._conn.execute("PRAGMA table_info(job_items)")}:
+            self._conn.execute("ALTER TABLE job_items ADD COLUMN stats TEXT")
+        now = time.time()
+        # Active jobs whose process is gone will never finish; those of live processes are left alone.
+        orphaned = [
+            (now, job_id) for job_id, owner in self._conn.execute(
+                "SELECT id, owner FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+            if owner != self.owner and not owner_alive(owner)
+        ]
+        self._conn.executemany("UPDATE jobs SET status = 'interrupted', updated_at = ? WHERE id = ?", orphaned)
+        self._conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'cancelled', 'failed', 'interrupted') AND updated_at < ?",
+            (now - retention_seconds,)
+        )
+        self._conn.commit()
+
+    def submit(self, client, titles, template, guidelines, max_workers, use_cache=True, use_batches=False,
+               prefetched=None, label="", by_sections=False):
+        """Queue briefs for titles and return the new job's id.
+
+        prefetched maps titles to futures already started by the BriefPrefetcher;
+        they are awaited instead of being requested again. by_sections writes each
+        brief section by section; it does not apply to Message Batches.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        titles = list(dict.fromkeys(titles))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, label, status, template, guidelines, max_workers, use_cache, use_batches, "
+                "by_sections, owner, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, label or f"{len(titles)} briefs", template, guidelines, max_workers,
+                 int(use_cache), int(use_batches), int(by_sections), self.owner, now, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, position, title, status) VALUES (?, ?, ?, 'pending')",
+                [(job_id, position, title) for position, title in enumerate(titles)]
+            )
+            self._conn.commit()
+        self._start(job_id, client, prefetched)
+        return job_id
+
+    def resume(self, job_id, client):
+        """Re-queue the unfinished and failed briefs of a job that is no longer running."""
+        with self._lock:
+            if job_id in self._runs:
+                return False
+            updated = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', error = NULL, owner = ?, updated_at = ? WHERE id = ? AND status IN "
+                "('done', 'cancelled', 'failed', 'interrupted')", (self.owner, time.time(), job_id)
+            ).rowcount
+            self._conn.execute(
+                "UPDATE job_items SET status = 'pending', error = NULL WHERE job_id = ? AND status = 'error'",
+                (job_id,)
+            )
+            self._conn.commit()
+        if updated:
+            self._start(job_id, client, None)
+        return bool(updated)
+
+    def cancel(self, job_id):
+        """Stop a job and mark it cancelled at once.
+
+        Briefs finished so far are kept; streamed requests in flight are
+        abandoned by closing their connections, and the job's worker stops
+        within a STREAM_REFRESH_SECONDS tick.
+        """
+        with self._lock:
+            run = self._runs.get(job_id)
+        if run is None:
+            return False
+        run["cancelled"].set()
+        if run["future"].cancel():
+            self._finish(job_id, "cancelled")
+        else:
+            self._set_status(job_id, "cancelled")
+        return True
+
+    def _start(self, job_id, client, prefetched):
+        run = {"cancelled": threading.Event(), "partials": {}}
+        with self._lock:
+            self._runs[job_id] = run
+            run["future"] = self._executor.submit(self._run, job_id, client, prefetched or {}, run)
+
+    def _run(self, job_id, client, prefetched, run):
+        cancelled = run["cancelled"]
+        partials = run["partials"]
+        usage = TokenUsage()
+        brief_stats = {}
+
+        def check_cancelled(*_):
+            if cancelled.is_set():
+                raise JobCancelled()
+
+        def on_text(title, chunk):
+            partials.setdefault(title, []).append(chunk)
+
+        results = None
+        status, error = "done", None
+        try:
+            with self._lock:
+                job = self._conn.execute(
+                    "SELECT template, guidelines, max_workers, use_cache, use_batches, by_sections FROM jobs "
+                    "WHERE id = ?", (job_id,)
+                ).fetchone()
+                titles = [row[0] for row in self._conn.execute(
+                    "SELECT title FROM job_items WHERE job_id = ? AND status = 'pending' ORDER BY position", (job_id,)
+                )]
+            if job is None:
+                raise LookupError(f"No job {job_id}")
+            template, guidelines, max_workers, use_cache, use_batches, by_sections = job
+            check_cancelled()
+            self._set_status(job_id, "running")
+
+            if use_batches:
+                results = request_briefs_in_batches(
+                    client, titles, template, guidelines, use_cache=bool(use_cache), usage=usage,
+                    on_tick=check_cancelled, prefetched=prefetched, retry_workers=max_workers,
+                    brief_stats=brief_stats, resume=self._batches(job_id),
+                    on_submit=partial(self._add_batch, job_id), on_finish=partial(self._remove_batch, job_id),
+                    cancel_on_close=False
+                )
+            else:
+                results = request_briefs_concurrently(
+                    client, titles, template, guidelines, max_workers, use_cache=bool(use_cache), on_text=on_text,
+                    on_tick=check_cancelled, prefetched=prefetched, usage=usage, by_sections=bool(by_sections),
+                    brief_stats=brief_stats
+                )
+            for title, brief, item_error in results:
+                self._record(job_id, title, brief, item_error, brief_stats.pop(title, None))
+                partials.pop(title, None)
+                check_cancelled()
+        except JobCancelled:
+            status = "cancelled"
+            self._cancel_batches(job_id, client)
+        except Exception as e:
+            status, error = "failed", f"{type(e).__name__}: {e}"
+        finally:
+            if results is not None:
+                results.close()
+            if cancelled.is_set():
+                status, error = "cancelled", None
+            self._finish(job_id, status, error, usage.summary())
+
+    def _batches(self, job_id):
+        """{batch_id: requests} of the Message Batches the job submitted and has not read yet."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT batch_id, requests FROM job_batches WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        return {batch_id: json.loads(requests) for batch_id, requests in rows}
+
+    def _cancel_batches(self, job_id, client):
+        """Cancel the job's unread batches; they stay recorded so a resume still reads what they finished."""
+        for batch_id in self._batches(job_id):
+            try:
+                client.messages.batches.cancel(batch_id)
+            except Exception:
+                # Already ended or expired; there is nothing left to stop.
+                pass
+
+    def _add_batch(self, job_id, batch_id, requests):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_batches (job_id, batch_id, requests) VALUES (?, ?, ?)",
+                (job_id, batch_id, json.dumps(requests))
+            )
+            self._conn.commit()
+
+    def _remove_batch(self, job_id, batch_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM job_batches WHERE job_id = ? AND batch_id = ?", (job_id, batch_id))
+            self._conn.commit()
+
+    def _record(self, job_id, title, brief, error, stats=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_items SET status = ?, brief = ?, error = ?, stats = ?, finished_at = ? "
+                "WHERE job_id = ? AND title = ?",
+                ("error" if error else "done", brief, f"{type(error).__name__}: {error}" if error else None,
+                 json.dumps(stats) if stats else None, time.time(), job_id, title)
+            )
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+            self._conn.commit()
+
+    def _set_status(self, job_id, status):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (status, time.time(), job_id))
+            self._conn.commit()
+
+    def _finish(self, job_id, status, error=None, usage=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, usage = ?, updated_at = ? WHERE id = ?",
+                (status, error, json.dumps(usage) if usage else None, time.time(), job_id)
+            )
+            self._conn.commit()
+            self._runs.pop(job_id, None)
+
+    def get(self, job_id):
+        """Status and progress counters of a job, or None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, label, status, error, usage, created_at, updated_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            items = self._conn.execute(
+                "SELECT title, status FROM job_items WHERE job_id = ? ORDER BY position", (job_id,)
+            ).fetchall()
+        job_id, label, status, error, usage, created_at, updated_at = row
+        return {
+            "id": job_id,
+            "label": label,
+            "status": status,
+            "error": error,
+            "usage": json.loads(usage) if usage else None,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "titles": [title for title, _ in items],
+            "total": len(items),
+            "done": sum(item_status == "done" for _, item_status in items),
+            "failed": sum(item_status == "error" for _, item_status in items)
+        }
+
+    def results(self, job_id, since=0.0):
+        """(title, brief, error, finished_at, stats) of the briefs finished after since, in completion order.
+
+        stats holds the seconds and token usage of the brief, or None if unknown.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, brief, error, finished_at, stats FROM job_items WHERE job_id = ? "
+                "AND status != 'pending' AND finished_at > ? ORDER BY finished_at", (job_id, since)
+            ).fetchall()
+        return [(title, brief, error, finished_at, json.loads(stats) if stats else None)
+                for title, brief, error, finished_at, stats in rows]
+
+    def partial_briefs(self, job_id):
+        """Text streamed so far for the briefs of a running job that are not finished yet."""
+        with self._lock:
+            run = self._runs.get(job_id)
+        if run is None:
+            return {}
+        return {title: "".join(chunks) for title, chunks in list(run["partials"].items())}
+
+    def list_jobs(self, active_only=False, limit=20):
+        """The most recent jobs, newest first."""
+        query = "SELECT id FROM jobs"
+        if active_only:
+            query += " WHERE status IN ('queued', 'running')"
+        with self._lock:
+            job_ids = [row[0] for row in self._conn.execute(query + " ORDER BY created_at DESC LIMIT ?", (limit,))]
+        return [job for job in map(self.get, job_ids) if job is not None]
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """The process-wide JobQueue at JOBS_PATH, created on first use."""
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue()
+        return _default_queue
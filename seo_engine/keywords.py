@@ -0,0 +1,256 @@
+"""Keyword cannibalization across briefs, from their "Keywords Table" sections.
+
+Each brief's keyword table is parsed into rows of (keyword, volume, notes),
+appended to column arrays shared by the whole set. A sparse brief x keyword
+matrix over those rows gives, in one sparse product, how many keywords every
+pair of briefs shares; pairs sharing at least CANNIBALIZATION_THRESHOLD of the
+smaller brief's keywords are reported as conflicts. Adding briefs only
+computes the products that involve the new rows.
+
+Report on a CLI output file:
+
+    python -m seo_engine.keywords briefs.jsonl
+"""
+
+import argparse
+import json
+import re
+import sys
+
+import numpy as np
+from scipy import sparse
+
+from .config import CANNIBALIZATION_THRESHOLD
+
+KEYWORD_SECTION_RE = re.compile(r"^#{1,6}\s*keywords?\b", re.IGNORECASE)
+HEADING_RE = re.compile(r"^#{1,6}\s")
+SEPARATOR_RE = re.compile(r"^:?-{2,}:?$")
+VOLUME_RE = re.compile(r"(\d+(?:[.,]\d+)*)\s*([km])?\b", re.IGNORECASE)
+HEADER_CELLS = {"keyword", "keywords", "keyword phrase", "term"}
+
+def normalize_keyword(text):
+    """Lower case, without Markdown emphasis, quotes or repeated spaces."""
+    text = re.sub(r"[*_`\"“”]", "", text).strip().strip("-•").strip()
+    return " ".join(text.lower().split())
+
+def parse_volume(text):
+    """A search volume such as '1,200', '1.2K' or '10K-50K' (the first number) as a float, else None."""
+    match = VOLUME_RE.search(text or "")
+    if match is None:
+        return None
+    number, suffix = match.groups()
+    try:
+        value = float(number.replace(",", ""))
+    except ValueError:
+        return None
+    return value * {"k": 1e3, "m": 1e6}.get((suffix or "").lower(), 1)
+
+def parse_keyword_table(brief):
+    """(keyword, volume, notes) rows of the brief's keywords section.
+
+    Reads Markdown table rows and "Keyword | Volume | Notes" bullets up to the
+    next heading; header and separator rows are skipped, and a keyword listed
+    twice is kept once.
+    """
+    rows = []
+    seen = set()
+    in_section = False
+    for line in (brief or "").splitlines():
+        stripped = line.strip()
+        if HEADING_RE.match(stripped):
+            in_section = bool(KEYWORD_SECTION_RE.match(stripped))
+            continue
+        if not in_section or not stripped:
+            continue
+        if not stripped.startswith("|"):
+            if stripped[0] not in "-*•":
+                continue
+            stripped = stripped[1:]
+        cells = [cell.strip() for cell in stripped.strip("|").split("|")]
+        if all(SEPARATOR_RE.match(cell) or not cell for cell in cells):
+            continue
+        keyword = normalize_keyword(cells[0])
+        if not keyword or keyword in HEADER_CELLS or keyword in seen:
+            continue
+        seen.add(keyword)
+        volume = parse_volume(cells[1]) if len(cells) > 1 else None
+        notes = " | ".join(cells[2:]) if len(cells) > 2 else ""
+        rows.append((keyword, volume, notes))
+    return rows
+
+class KeywordIndex:
+    """The keyword tables of a set of briefs and the pairwise keyword overlap between them.
+
+    Rows live in column arrays (brief, keyword, volume, notes); the brief x
+    keyword matrix is binary, so matrix @ matrix.T counts shared keywords.
+    Replacing a brief (same title) retires its old row.
+    """
+
+    def __init__(self):
+        self.titles = []
+        self.keywords = []
+        self._keyword_ids = {}
+        self._rows = {}
+        self.columns = {"brief": [], "keyword": [], "volume": [], "notes": []}
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self._shared = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self._active = np.zeros(0, dtype=bool)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, title, brief):
+        self.add_many([(title, brief)])
+
+    def add_many(self, briefs):
+        """Index (title, brief) pairs, updating the overlap counts with the new rows only.
+
+        A title given more than once keeps its last brief, as with successive add() calls.
+        """
+        briefs = list(dict(briefs).items())
+        if not briefs:
+            return
+        replaced = [self._rows[title] for title, _ in briefs if title in self._rows]
+        if replaced:
+            self._retire(replaced)
+
+        indices, indptr = [], [0]
+        for title, brief in briefs:
+            row = len(self.titles)
+            self.titles.append(title)
+            self._rows[title] = row
+            for keyword, volume, notes in parse_keyword_table(brief):
+                keyword_id = self._keyword_ids.get(keyword)
+                if keyword_id is None:
+                    keyword_id = self._keyword_ids[keyword] = len(self.keywords)
+                    self.keywords.append(keyword)
+                indices.append(keyword_id)
+                self.columns["brief"].append(row)
+                self.columns["keyword"].append(keyword_id)
+                self.columns["volume"].append(np.nan if volume is None else volume)
+                self.columns["notes"].append(notes)
+            indptr.append(len(indices))
+
+        n_keywords = len(self.keywords)
+        new = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), np.array(indices, dtype=np.int64), np.array(indptr)),
+            shape=(len(briefs), n_keywords)
+        )
+        old = self._matrix
+        old.resize((old.shape[0], n_keywords))
+        cross = old @ new.T
+        self._shared = sparse.bmat([[self._shared, cross], [cross.T, new @ new.T]], format="csr", dtype=np.int32)
+        self._matrix = sparse.vstack([old, new], format="csr")
+        self._active = np.concatenate([self._active, np.ones(len(briefs), dtype=bool)])
+
+    def remove(self, titles):
+        rows = [self._rows[title] for title in titles if title in self._rows]
+        for title in titles:
+            self._rows.pop(title, None)
+        self._retire(rows)
+
+    def _retire(self, rows):
+        self._active[rows] = False
+        keep = sparse.diags(self._active.astype(np.int32), dtype=np.int32)
+        self._matrix = sparse.csr_matrix(keep @ self._matrix)
+        self._shared = sparse.csr_matrix(keep @ self._shared @ keep)
+        self._matrix.eliminate_zeros()
+        self._shared.eliminate_zeros()
+
+    def table(self):
+        """The keyword rows of the active briefs as columns: title, keyword, volume, notes."""
+        brief = np.array(self.columns["brief"], dtype=np.int64)
+        keep = self._active[brief] if len(brief) else np.zeros(0, dtype=bool)
+        return {
+            "title": [self.titles[row] for row in brief[keep]],
+            "keyword": [self.keywords[keyword] for keyword in np.array(self.columns["keyword"], dtype=np.int64)[keep]],
+            "volume": np.array(self.columns["volume"], dtype=np.float64)[keep],
+            "notes": [notes for notes, kept in zip(self.columns["notes"], keep) if kept],
+        }
+
+    def conflicts(self, threshold=CANNIBALIZATION_THRESHOLD, limit=None):
+        """Pairs of briefs sharing at least threshold of the smaller keyword set, highest overlap first.
+
+        Each conflict is {"titles", "score", "shared", "keywords"}; score is the
+        overlap coefficient, shared / min(keywords of either brief).
+        """
+        upper = sparse.triu(self._shared, k=1).tocoo()
+        sizes = np.asarray(self._matrix.sum(axis=1)).ravel()
+        scores = upper.data / np.maximum(1, np.minimum(sizes[upper.row], sizes[upper.col]))
+        hits = np.flatnonzero(scores >= threshold)
+        hits = hits[np.lexsort((-upper.data[hits], -scores[hits]))][:limit]
+        return [
+            {
+                "titles": (self.titles[upper.row[i]], self.titles[upper.col[i]]),
+                "score": float(scores[i]),
+                "shared": int(upper.data[i]),
+                "keywords": self._shared_keywords(upper.row[i], upper.col[i]),
+            }
+            for i in hits
+        ]
+
+    def _shared_keywords(self, first, second):
+        row_a = self._matrix.indices[self._matrix.indptr[first]:self._matrix.indptr[first + 1]]
+        row_b = self._matrix.indices[self._matrix.indptr[second]:self._matrix.indptr[second + 1]]
+        return [self.keywords[keyword] for keyword in np.intersect1d(row_a, row_b)]
+
+    def contested_keywords(self, min_briefs=2, limit=None):
+        """Keywords targeted by at least min_briefs briefs, most targeted first.
+
+        Each is {"keyword", "briefs" (count), "volume" (highest given), "titles"}.
+        """
+        counts = np.asarray(self._matrix.sum(axis=0)).ravel()
+        contested = np.flatnonzero(counts >= min_briefs)
+        contested = contested[np.argsort(-counts[contested], kind="stable")][:limit]
+        if not len(contested):
+            return []
+        brief = np.array(self.columns["brief"], dtype=np.int64)
+        keyword = np.array(self.columns["keyword"], dtype=np.int64)
+        volume = np.array(self.columns["volume"], dtype=np.float64)
+        keep = self._active[brief]
+        brief, keyword, volume = brief[keep], keyword[keep], volume[keep]
+        by_keyword = sparse.csc_matrix(self._matrix)
+        result = []
+        for keyword_id in contested:
+            rows = by_keyword.indices[by_keyword.indptr[keyword_id]:by_keyword.indptr[keyword_id + 1]]
+            volumes = volume[keyword == keyword_id]
+            result.append({
+                "keyword": self.keywords[keyword_id],
+                "briefs": int(counts[keyword_id]),
+                "volume": float(np.nanmax(volumes)) if not np.isnan(volumes).all() else None,
+                "titles": [self.titles[row] for row in rows],
+            })
+        return result
+
+def main(argv=None):
+    from .export import read_jsonl_records
+
+    parser = argparse.ArgumentParser(
+        prog="python -m seo_engine.keywords", description="Report keyword cannibalization in a brief JSONL file."
+    )
+    parser.add_argument("source", help="JSONL written by python -m seo_engine")
+    parser.add_argument("--threshold", type=float, default=CANNIBALIZATION_THRESHOLD)
+    parser.add_argument("--top", type=int, default=20, help="how many conflicts and keywords to list")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    index = KeywordIndex()
+    index.add_many((record["title"], record["brief"]) for record in read_jsonl_records(args.source))
+    conflicts = index.conflicts(args.threshold)
+    contested = index.contested_keywords()
+    if args.json:
+        print(json.dumps({"briefs": len(index), "conflicts": conflicts, "contested_keywords": contested},
+                         ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"{len(index)} briefs, {len(conflicts)} pairs sharing >= {args.threshold:.0%} of their keywords")
+    for conflict in conflicts[:args.top]:
+        first, second = conflict["titles"]
+        print(f"  {conflict['score']:.0%}  {first}  <->  {second}: {', '.join(conflict['keywords'])}")
+    print(f"{len(contested)} keywords targeted by more than one brief")
+    for item in contested[:args.top]:
+        print(f"  {item['briefs']:4d}  {item['keyword']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+"""Default guidelines and template, and the prompt builders for every call type.
+
+Each builder returns (system, prompt): system is the block that stays the same
+across a batch and is sent with cache_control, prompt is the per-call suffix.
+"""
+
+import json
+import re
+
+DEFAULT_GUIDELINES = """AUDIENCE: [Define your target audience here]
+TONE: [Define tone: Informative, Casual, Professional, etc.]
+CONTENT FOCUS: [What topics or themes to prioritize]
+CONSTRAINTS: [What to avoid or exclude]
+MANDATORY ELEMENTS: [Required angles, comparisons, or frameworks]
+GOALS: [SEO goals, conversion goals, etc.]"""
+
+DEFAULT_TEMPLATE = """## Metadatos
+- Target Audience: [Target]
+- Tone: [Tone]
+- Goal: [Specific SEO Goal]
+
+## Article Structure
+- H1: [Title]
+- Slug URL: [slug]
+- Intent: [Intent]
+- Meta Title / Description: [...]
+
+## Content Outline (Detailed)
+- H2: [Topic]
+  - Key points to cover...
+  - Analogies to use...
+- H2: [Topic]...
+
+## Keywords Table
+- Keyword | Volume | Notes
+
+## LLM Optimization Notes
+- Instructions on how to write the content (transitions, structure, etc.)."""
+
+def parse_strategy_line(line):
+    """Return the title from a numbered line such as '3. Title' or '3) Title', else None."""
+    line = line.strip()
+    if not line or not line[0].isdigit():
+        return None
+    cleaned = line.split('.', 1)[-1].split(')', 1)[-1].strip()
+    return cleaned or None
+
+def build_strategy_prompt(existing_titles, guidelines):
+    """Return (system, prompt): the stable context block and the task instruction."""
+    system = f"""You are an expert SEO strategist.
+
+EXISTING TITLES (to avoid repetition):
+{existing_titles if existing_titles.strip() else "None provided"}
+
+STRATEGIC GUIDELINES:
+{guidelines}"""
+
+    prompt = """Your task: Generate EXACTLY 10 new article titles based STRICTLY on the "STRATEGIC GUIDELINES" provided above.
+
+Constraints:
+1. The titles must appeal specifically to the AUDIENCE defined in the guidelines.
+2. Adopt the TONE defined in the guidelines completely.
+3. Avoid repeating themes from existing titles.
+4. If the guidelines mention specific topics, keywords, or constraints, follow them precisely.
+
+Format your response as a numbered list (1-10) with ONLY the titles, one per line.
+Do not include any additional explanation or commentary."""
+
+    return system, prompt
+
+def build_replacement_prompt(count, accepted, rejected):
+    """Ask for count more titles after near-duplicates were filtered out."""
+    keep = "\n".join(f"- {title}" for title in accepted) or "- None yet"
+    avoid = "\n".join(f"- {title}" for title in rejected) or "- None"
+    return f"""Your task: Generate EXACTLY {count} new article titles based STRICTLY on the "STRATEGIC GUIDELINES" provided above.
+
+These titles are already planned, do not repeat them:
+{keep}
+
+These titles were rejected because they duplicate existing content. Do not use them or close paraphrases of them:
+{avoid}
+
+Each new title must cover a clearly different angle from every title listed above and from the existing titles.
+Apply the same AUDIENCE, TONE and constraints from the guidelines.
+
+Format your response as a numbered list (1-{count}) with ONLY the titles, one per line.
+Do not include any additional explanation or commentary."""
+
+def build_brief_prompt(title, template, guidelines):
+    """Return (system, prompt). The system block is identical for every title in a batch."""
+    system = f"""You are an expert SEO content strategist creating detailed content briefs.
+
+STRATEGIC GUIDELINES:
+{guidelines}
+
+BRIEF TEMPLATE STRUCTURE TO FOLLOW:
+{template}
+
+Requirements for every brief:
+1. Fill in ALL sections from the template.
+2. Target Audience & Tone: Must match the STRATEGIC GUIDELINES provided exactly.
+3. Create a detailed content outline with multiple H2 sections.
+4. Provide a keywords table relevant to the specific topic.
+5. Add LLM optimization notes on how to write this content based on the guidelines.
+6. Follow all constraints and requirements specified in the guidelines."""
+
+    prompt = f"""ARTICLE TITLE:
+{title}
+
+Your task: Create a comprehensive content brief for this article that STRICTLY follows the template structure provided above.
+
+Generate a complete, actionable brief that a writer or LLM can use to create high-quality content."""
+
+    return system, prompt
+
+def split_template_sections(template):
+    """Split a template into (heading, body) pairs at its '## ' headings, in template order.
+
+    Text before the first heading is ignored; '### ' subheadings stay inside their section.
+    """
+    sections = []
+    for line in template.splitlines():
+        if line.startswith("## "):
+            sections.append([line[3:].strip(), []])
+        elif sections:
+            sections[-1][1].append(line)
+    return [(heading, "\n".join(body).strip()) for heading, body in sections]
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+def build_brief_anchors_prompt(title, template, guidelines):
+    """Return (system, prompt) asking for the details every section of a brief must agree on.
+
+    The system block is the one build_brief_prompt uses, so it is served from the prompt cache.
+    """
+    system, _ = build_brief_prompt(title, template, guidelines)
+    prompt = f"""ARTICLE TITLE:
+{title}
+
+Your task: The brief for this article will be written one section at a time. First fix the details that every section must agree on.
+
+Reply with EXACTLY these four lines and nothing else:
+H1: <the article's H1 headline>
+Slug: <lowercase-hyphenated-url-slug>
+Primary keyword: <the main target keyword>
+Secondary keywords: <3 to 6 comma-separated keywords>"""
+    return system, prompt
+
+def parse_brief_anchors(text, title):
+    """Read the anchors reply into a dict, falling back to values derived from the title."""
+    anchors = {"h1": title, "slug": slugify(title), "primary_keyword": title.lower(), "secondary_keywords": ""}
+    fields = {"h1": "h1", "slug": "slug", "slug url": "slug", "primary keyword": "primary_keyword",
+              "secondary keywords": "secondary_keywords"}
+    for line in text.splitlines():
+        name, _, value = line.strip().lstrip("-* ").partition(":")
+        field = fields.get(name.replace("*", "").strip().lower())
+        value = value.replace("**", "").strip()
+        if field and value:
+            anchors[field] = slugify(value) if field == "slug" else value
+    return anchors
+
+def build_section_prompt(title, template, guidelines, heading, body, anchors):
+    """Return (system, prompt) for one '## heading' section of a brief, sharing build_brief_prompt's system block."""
+    system, _ = build_brief_prompt(title, template, guidelines)
+    prompt = f"""ARTICLE TITLE:
+{title}
+
+The brief for this article is being written one section at a time. These details are fixed; use them verbatim wherever they appear:
+- H1: {anchors['h1']}
+- Slug URL: {anchors['slug']}
+- Primary keyword: {anchors['primary_keyword']}
+- Secondary keywords: {anchors['secondary_keywords']}
+
+Your task: Write ONLY the "## {heading}" section of the brief, following this part of the template:
+{body}
+
+Start your answer with the line "## {heading}". Do not write any other section, introduction or closing remarks."""
+    return system, prompt
+
+def clean_section(text, heading):
+    """Make a section reply start with its own heading and drop any other '## ' section it wandered into."""
+    lines = text.strip().splitlines()
+    if lines and lines[0].startswith("## "):
+        lines = lines[1:]
+    kept = []
+    for line in lines:
+        if line.startswith("## "):
+            break
+        kept.append(line)
+    return f"## {heading}\n" + "\n".join(kept).strip()
+
+ANCHOR_LINE_PATTERNS = (
+    ("h1", re.compile(r"^(\s*[-*]?\s*(?:\*\*)?H1(?:\*\*)?\s*:(?:\*\*)?).*$", re.MULTILINE)),
+    ("slug", re.compile(r"^(\s*[-*]?\s*(?:\*\*)?Slug(?: URL)?(?:\*\*)?\s*:(?:\*\*)?).*$", re.MULTILINE | re.IGNORECASE)),
+)
+
+def assemble_brief(sections, anchors):
+    """Join cleaned sections in template order and force the anchored H1 and slug onto their lines."""
+    brief = "\n\n".join(sections)
+    for field, pattern in ANCHOR_LINE_PATTERNS:
+        brief = pattern.sub(lambda match: f"{match.group(1)} {anchors[field]}", brief)
+    return brief
+
+SHARDS_TOOL = {
+    "name": "record_shards",
+    "description": "Record the shards the content plan is split into.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "shards": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": "string", "description": "Short name of the content level or subtopic"},
+                        "focus": {"type": "string", "description": "One sentence on what titles in this shard cover"}
+                    },
+                    "required": ["name", "focus"]
+                }
+            }
+        },
+        "required": ["shards"]
+    }
+}
+
+TITLES_TOOL = {
+    "name": "record_titles",
+    "description": "Record the generated article titles.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "titles": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "title": {"type": "string"},
+                        "primary_keyword": {"type": "string"},
+                        "score": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 10,
+                            "description": "Priority: how well the title serves the AUDIENCE and GOALS of the guidelines"
+                        }
+                    },
+                    "required": ["title", "score"]
+                }
+            }
+        },
+        "required": ["titles"]
+    }
+}
+
+def build_shard_plan_prompt(existing_titles, guidelines, count):
+    """Return (system, prompt) asking for count non-overlapping shards of the content plan."""
+    system, _ = build_strategy_prompt(existing_titles, guidelines)
+    prompt = f"""Your task: Split the content plan described in the "STRATEGIC GUIDELINES" above into EXACTLY {count} shards.
+
+Use the content levels, subtopics or angles the guidelines name; if they name fewer, divide the largest ones further.
+Together the shards must cover everything the guidelines ask for, and no two shards may overlap.
+Give each shard a short name and a one-sentence focus.
+
+Record the shards with the record_shards tool."""
+    return system, prompt
+
+def build_shard_titles_prompt(count, shard, avoid=()):
+    """Ask for count titles within one shard; the system block is build_strategy_prompt's."""
+    avoid_block = ""
+    if avoid:
+        listed = "\n".join(f"- {title}" for title in avoid)
+        avoid_block = f"""
+These titles are already planned or were rejected as duplicates. Do not use them or close paraphrases of them:
+{listed}
+"""
+    return f"""Your task: Generate EXACTLY {count} new article titles for one shard of a larger content plan, based STRICTLY on the "STRATEGIC GUIDELINES" provided above.
+
+SHARD: {shard['name']}
+FOCUS: {shard['focus']}
+
+Constraints:
+1. The titles must appeal specifically to the AUDIENCE defined in the guidelines.
+2. Adopt the TONE defined in the guidelines completely.
+3. Avoid repeating themes from existing titles.
+4. If the guidelines mention specific topics, keywords, or constraints, follow them precisely.
+5. Stay inside this shard; other shards cover the rest of the plan.
+{avoid_block}
+For each title give its primary keyword and a priority score from 1 (low) to 10 (high).
+
+Record the titles with the record_titles tool."""
+
+def parse_tool_items(text, key):
+    """Return the list under key from a tool-input JSON reply, or [] if the reply is not that JSON."""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return []
+    items = data.get(key) if isinstance(data, dict) else None
+    return [item for item in items if isinstance(item, dict)] if isinstance(items, list) else []
+
+def parse_shard_titles(text):
+    """Read a record_titles reply into {title, primary_keyword, score} dicts.
+
+    Malformed items are skipped and scores are clamped to 1-10; a plain-text
+    reply falls back to numbered-line parsing with a neutral score.
+    """
+    items = parse_tool_items(text, "titles")
+    if not items:
+        return [
+            {"title": title, "primary_keyword": "", "score": 5}
+            for title in map(parse_strategy_line, text.splitlines()) if title
+        ]
+    parsed = []
+    for item in items:
+        title = str(item.get("title") or "").strip()
+        if not title:
+            continue
+        try:
+            score = min(10, max(1, int(item.get("score", 5))))
+        except (TypeError, ValueError):
+            score = 5
+        parsed.append({"title": title, "primary_keyword": str(item.get("primary_keyword") or "").strip(), "score": score})
+    return parsed
+
+def parse_shards(text, count):
+    """Read a record_shards reply into exactly count {name, focus} dicts.
+
+    Shards with a repeated or empty name are dropped; missing ones are filled
+    with generic shards so the fan-out never depends on the planning call.
+    """
+    shards = []
+    seen = set()
+    for item in parse_tool_items(text, "shards"):
+        name = str(item.get("name") or "").strip()
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            shards.append({"name": name, "focus": str(item.get("focus") or "").strip() or name})
+    for number in range(len(shards) + 1, count + 1):
+        shards.append({
+            "name": f"Angle {number}",
+            "focus": "Any subtopic or content level the guidelines ask for that the other shards do not cover."
+        })
+    return shards[:count]
@@ -0,0 +1,200 @@
+"""Per-call-type model routing with latency SLOs and fallback models.
+
+Every API call belongs to a route: "strategy" (title generation), "brief"
+(briefs written by jobs, batches and the CLI) or "manual_brief" (the single
+briefs of the app's second tab). A route's policy names its primary model,
+the max_tokens cap of its calls, a latency SLO in seconds, the deadline after
+which a call is abandoned and the fallback models to use instead. Policies
+default to ROUTE_POLICIES and can be overridden, field by field, from a JSON
+file (ROUTES_PATH):
+
+    {"manual_brief": {"model": "claude-3-5-haiku-20241022", "slo_seconds": 30}}
+
+The router keeps the outcome and latency of every call per (route, model)
+for ROUTING_WINDOW_SECONDS. Once a model has ROUTING_MIN_SAMPLES calls in the
+window, it stays healthy while at least ROUTING_SLO_TARGET of them succeeded
+within the SLO. Calls go to the first healthy model in policy order. A model
+that answered "overloaded" is skipped for ROUTING_OVERLOAD_COOLDOWN_SECONDS.
+An unhealthy primary still gets one probe call every ROUTING_PROBE_SECONDS,
+so it can take its route back once it recovers.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from .config import (
+    ROUTE_POLICIES,
+    ROUTES_PATH,
+    ROUTING_MIN_SAMPLES,
+    ROUTING_OVERLOAD_COOLDOWN_SECONDS,
+    ROUTING_PROBE_SECONDS,
+    ROUTING_SLO_TARGET,
+    ROUTING_WINDOW_SECONDS,
+)
+from .telemetry import percentiles
+
+POLICY_FIELDS = ("model", "max_tokens", "slo_seconds", "deadline_seconds", "fallbacks")
+
+# Call kinds (as recorded in the telemetry) and the route they take unless the caller names one.
+ROUTE_OF_KIND = {
+    "strategy": "strategy",
+    "strategy_plan": "strategy",
+    "strategy_shard": "strategy",
+    "brief": "brief",
+    "brief_anchors": "brief",
+    "brief_section": "brief",
+}
+DEFAULT_ROUTE = "brief"
+
+def is_overloaded_error(error):
+    return getattr(error, "status_code", None) == 529
+
+def load_route_policies(path=None):
+    """ROUTE_POLICIES with the overrides from the JSON file at path (if it exists) applied."""
+    policies = {route: dict(policy) for route, policy in ROUTE_POLICIES.items()}
+    if not path or not os.path.exists(path):
+        return policies
+    with open(path, encoding="utf-8") as f:
+        overrides = json.load(f)
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{path}: expected an object mapping route names to policies")
+    for route, override in overrides.items():
+        unknown = set(override) - set(POLICY_FIELDS) if isinstance(override, dict) else None
+        if unknown is None or unknown:
+            raise ValueError(f"{path}: route {route!r} must be an object with fields {', '.join(POLICY_FIELDS)}")
+        policy = policies.setdefault(route, dict(policies[DEFAULT_ROUTE]))
+        policy.update(override)
+    return policies
+
+class ModelRouter:
+    """Picks the model of each call from its route's policy and the route's recent latency and success."""
+
+    def __init__(self, policies=None, window_seconds=ROUTING_WINDOW_SECONDS):
+        self.policies = policies if policies is not None else load_route_policies()
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(load_route_policies(path))
+
+    def reset(self):
+        with self._lock:
+            self._samples = defaultdict(deque)
+            self._overloaded_until = {}
+            self._probed_at = {}
+
+    def policy(self, route):
+        return self.policies.get(route) or self.policies[DEFAULT_ROUTE]
+
+    def deadline(self, route):
+        """Seconds a call of route may take before it is abandoned, or None for no deadline."""
+        return self.policy(route).get("deadline_seconds")
+
+    def max_tokens(self, route, requested):
+        """requested, capped at the route's max_tokens."""
+        cap = self.policy(route).get("max_tokens")
+        return min(requested, cap) if cap else requested
+
+    def models(self, route):
+        policy = self.policy(route)
+        return list(dict.fromkeys([policy["model"], *policy.get("fallbacks", ())]))
+
+    def candidates(self, route):
+        """The route's models in the order to try them: healthy ones first, in policy order.
+
+        Unhealthy models stay at the end of the list as a last resort, and an
+        unhealthy primary is moved to the front for one call every
+        ROUTING_PROBE_SECONDS.
+        """
+        models = self.models(route)
+        now = time.monotonic()
+        with self._lock:
+            healthy = [model for model in models if self._healthy(route, model, now)]
+            ordered = healthy + [model for model in models if model not in healthy]
+            primary = models[0]
+            if primary in healthy:
+                self._probed_at.pop(route, None)
+            elif now >= self._overloaded_until.get((route, primary), 0):
+                if now - self._probed_at.setdefault(route, now) >= ROUTING_PROBE_SECONDS:
+                    self._probed_at[route] = now
+                    ordered.remove(primary)
+                    ordered.insert(0, primary)
+        return ordered
+
+    def record(self, route, model, latency=None, ok=True, overloaded=False):
+        """Record one call of model on route; latency in seconds, None if it failed."""
+        now = time.monotonic()
+        with self._lock:
+            samples = self._samples[(route, model)]
+            samples.append((now, latency if ok else None))
+            self._expire(samples, now)
+            if overloaded:
+                self._overloaded_until[(route, model)] = now + ROUTING_OVERLOAD_COOLDOWN_SECONDS
+
+    def _expire(self, samples, now):
+        while samples and now - samples[0][0] > self.window_seconds:
+            samples.popleft()
+
+    def _healthy(self, route, model, now):
+        if now < self._overloaded_until.get((route, model), 0):
+            return False
+        samples = self._samples.get((route, model))
+        if not samples:
+            return True
+        self._expire(samples, now)
+        if len(samples) < ROUTING_MIN_SAMPLES:
+            return True
+        slo = self.policy(route).get("slo_seconds")
+        within = sum(1 for _, latency in samples if latency is not None and (not slo or latency <= slo))
+        return within / len(samples) >= ROUTING_SLO_TARGET
+
+    def stats(self):
+        """One row per (route, model) with calls, success rate, p50/p95 latency and SLO attainment in the window."""
+        now = time.monotonic()
+        rows = []
+        with self._lock:
+            for route in self.policies:
+                models = self.models(route)
+                healthy = [model for model in models if self._healthy(route, model, now)]
+                active = healthy[0] if healthy else models[0]
+                for model in models:
+                    samples = list(self._samples.get((route, model), ()))
+                    latencies = [latency for _, latency in samples if latency is not None]
+                    slo = self.policy(route).get("slo_seconds")
+                    p50, p95 = percentiles(latencies, (50, 95)) if latencies else (None, None)
+                    rows.append({
+                        "route": route,
+                        "model": model,
+                        "active": model == active,
+                        "healthy": model in healthy,
+                        "calls": len(samples),
+                        "success_rate": len(latencies) / len(samples) if samples else None,
+                        "latency_p50": p50,
+                        "latency_p95": p95,
+                        "slo_seconds": slo,
+                        "within_slo": sum(1 for latency in latencies if not slo or latency <= slo) / len(samples)
+                        if samples else None,
+                    })
+        return rows
+
+_default_router = None
+_default_router_lock = threading.Lock()
+
+def get_model_router():
+    """The process-wide ModelRouter, with the policies of ROUTES_PATH if that file exists."""
+    global _default_router
+    with _default_router_lock:
+        if _default_router is None:
+            _default_router = ModelRouter.from_file(ROUTES_PATH)
+        return _default_router
+
+def set_model_router(router):
+    """Replace the process-wide router (e.g. one built from another policy file)."""
+    global _default_router
+    with _default_router_lock:
+        _default_router = router
@@ -0,0 +1,209 @@
+"""Rate limiting, retries and adaptive concurrency for API calls."""
+
+import random
+import threading
+import time
+
+from .config import (
+    BACKOFF_BASE_SECONDS,
+    BACKOFF_MAX_SECONDS,
+    RATE_LIMIT_BURST_SECONDS,
+    RATE_LIMIT_INPUT_TOKENS_PER_MINUTE,
+    RATE_LIMIT_REQUESTS_PER_MINUTE,
+    SCHEDULER_MAX_CONCURRENCY,
+    SCHEDULER_MAX_RETRIES,
+    THROTTLE_COOLDOWN_SECONDS,
+)
+
+class StreamInterruptedError(RuntimeError):
+    """A streamed response failed after text was already delivered; retrying would duplicate it."""
+
+class CallCancelledError(Exception):
+    """The caller gave up on a call, e.g. because its job was cancelled; its requests were abandoned."""
+
+class DeadlineExceededError(TimeoutError):
+    """A call got no complete response before its deadline and was abandoned.
+
+    The deadline covers all attempts of a call, so it is not retried.
+    """
+
+def is_throttling_error(error):
+    return getattr(error, "status_code", None) in (429, 529)
+
+def is_retryable_error(error):
+    # Any error worth classifying came from a client, so the SDK is already loaded.
+    import anthropic
+
+    status = getattr(error, "status_code", None)
+    return is_throttling_error(error) or (status is not None and status >= 500) or isinstance(
+        error, anthropic.APIConnectionError
+    )
+
+def retry_after_seconds(error):
+    """The server's requested wait from retry-after-ms / retry-after headers, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+class TokenBucket:
+    """Blocking token bucket refilled continuously at per_minute / 60 per second."""
+
+    def __init__(self, per_minute, burst_seconds=RATE_LIMIT_BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+
+class RequestScheduler:
+    """Single gate that every API call for one API key passes through.
+
+    Calls wait for a concurrency slot and for the request and input-token
+    buckets. Throttling (429/529) and transient errors are retried with jittered
+    exponential backoff, or after the server's retry-after when it sends one,
+    during which the whole scheduler pauses. The concurrency limit follows AIMD:
+    it grows by one per limit-many successful calls and halves on throttling (at
+    most once per THROTTLE_COOLDOWN_SECONDS). A duplicate request sent within a
+    call (a hedge) may only take a slot that is free at the time.
+    """
+
+    def __init__(self, requests_per_minute=RATE_LIMIT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=RATE_LIMIT_INPUT_TOKENS_PER_MINUTE,
+                 max_concurrency=SCHEDULER_MAX_CONCURRENCY, max_retries=SCHEDULER_MAX_RETRIES):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.completed = 0
+        self.throttled = 0
+        self.retries = 0
+        self._resume_at = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def call(self, fn, estimated_tokens=0, on_retry=None, should_retry=None, window=None):
+        """Run fn() under the scheduler's limits, retrying when the error allows it.
+
+        on_retry(error) is called before each retry; should_retry(error) can veto
+        a retry, e.g. when the caller would rather switch to another model.
+        window, if given, is a dict in which fn sets "deadline_at", the
+        time.monotonic() by which the whole call must be over; a retry that
+        could not start before then is not made and DeadlineExceededError is
+        raised instead, and no pause waits past it.
+        """
+        window = {} if window is None else window
+        attempt = 0
+        while True:
+            self._acquire_slot()
+            try:
+                pause = self._resume_at - time.monotonic()
+                if "deadline_at" in window:
+                    pause = min(pause, window["deadline_at"] - time.monotonic())
+                if pause > 0:
+                    time.sleep(pause)
+                self.reserve(estimated_tokens)
+                result = fn()
+            except Exception as e:
+                error = e
+            else:
+                self._on_success()
+                return result
+            finally:
+                self.release_slot()
+
+            if not is_retryable_error(error) or attempt >= self.max_retries or (
+                should_retry is not None and not should_retry(error)
+            ):
+                raise error
+            delay = retry_after_seconds(error)
+            if is_throttling_error(error):
+                self._on_throttle(delay)
+            if delay is None:
+                delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+            if "deadline_at" in window and time.monotonic() + delay >= window["deadline_at"]:
+                raise DeadlineExceededError("No complete response before the deadline") from error
+            with self._cond:
+                self.retries += 1
+            if on_retry:
+                on_retry(error)
+            attempt += 1
+            time.sleep(delay)
+
+    def reserve(self, estimated_tokens=0):
+        """Take one request and estimated_tokens input tokens from the rate-limit buckets, waiting if needed.
+
+        call() does this for every attempt; a duplicate request sent within a
+        call (a hedge) reserves its own share.
+        """
+        self.request_bucket.acquire(1)
+        self.token_bucket.acquire(estimated_tokens)
+
+    def _acquire_slot(self):
+        with self._cond:
+            while self.in_flight >= max(1, int(self.limit)):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def try_acquire_slot(self):
+        """Take a concurrency slot if one is free, without waiting; returns whether it did.
+
+        A hedge takes its slot this way and gives it back with release_slot().
+        """
+        with self._cond:
+            if self.in_flight >= max(1, int(self.limit)):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release_slot(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def _on_success(self):
+        with self._cond:
+            self.completed += 1
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def _on_throttle(self, retry_after):
+        now = time.monotonic()
+        with self._cond:
+            self.throttled += 1
+            if retry_after:
+                self._resume_at = max(self._resume_at, now + retry_after)
+            if now - self._last_decrease >= THROTTLE_COOLDOWN_SECONDS:
+                self._last_decrease = now
+                self.limit = max(1.0, self.limit / 2)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "throttled": self.throttled,
+                "retries": self.retries
+            }
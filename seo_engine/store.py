@@ -0,0 +1,148 @@
+"""Disk-backed store of generated briefs, keyed by session and title.
+
+Brief text is kept zlib-compressed in SQLite instead of in each session's
+memory; sessions hold only handles (title, size, timestamp) and load a brief
+when it is shown or exported. Because the store is on disk, a session that
+comes back with the same id after a page refresh or a server restart finds its
+briefs again.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from .config import BRIEF_STORE_MAX_AGE_SECONDS, BRIEF_STORE_MAX_BYTES, BRIEF_STORE_PATH
+
+COMPRESSION_LEVEL = 6
+
+class BriefStore:
+    """SQLite-backed, compressed briefs shared by every session on this server.
+
+    Entries older than max_age_seconds are dropped, and once the compressed
+    briefs exceed max_bytes the least recently used ones are evicted first.
+    """
+
+    def __init__(self, path, max_bytes=BRIEF_STORE_MAX_BYTES, max_age_seconds=BRIEF_STORE_MAX_AGE_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS briefs (
+                session_id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                content BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL,
+                metadata TEXT,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                PRIMARY KEY (session_id, title)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_briefs_last_used ON briefs (last_used_at)")
+        self._conn.commit()
+
+    def put(self, session_id, title, brief, metadata=None):
+        """Store (or replace) a brief and return its handle."""
+        data = brief.encode("utf-8")
+        content = zlib.compress(data, COMPRESSION_LEVEL)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO briefs (session_id, title, content, size, stored_size, metadata, created_at, "
+                "last_used_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, title, content, len(data), len(content), json.dumps(metadata) if metadata else None,
+                 now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+        return {"size": len(data), "created_at": now}
+
+    def get(self, session_id, title):
+        """The brief text, or None if it was never stored or has been evicted."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content FROM briefs WHERE session_id = ? AND title = ?", (session_id, title)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE briefs SET last_used_at = ? WHERE session_id = ? AND title = ?", (now, session_id, title)
+            )
+            self._conn.commit()
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def handles(self, session_id):
+        """{title: handle} of a session's briefs, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, size, created_at FROM briefs WHERE session_id = ? ORDER BY created_at", (session_id,)
+            ).fetchall()
+        return {title: {"size": size, "created_at": created_at} for title, size, created_at in rows}
+
+    def records(self, session_id, titles):
+        """Yield {title, brief, **metadata} for titles, reading one brief at a time; evicted ones are skipped."""
+        for title in titles:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT content, metadata FROM briefs WHERE session_id = ? AND title = ?", (session_id, title)
+                ).fetchone()
+            if row is not None:
+                content, metadata = row
+                yield {"title": title, "brief": zlib.decompress(content).decode("utf-8"),
+                       **(json.loads(metadata) if metadata else {})}
+
+    def delete(self, session_id, titles=None):
+        """Drop the given titles of a session, or all of its briefs."""
+        with self._lock:
+            if titles is None:
+                self._conn.execute("DELETE FROM briefs WHERE session_id = ?", (session_id,))
+            else:
+                self._conn.executemany(
+                    "DELETE FROM briefs WHERE session_id = ? AND title = ?", [(session_id, title) for title in titles]
+                )
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM briefs WHERE created_at < ?", (now - self.max_age_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM briefs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for session_id, title, stored_size in self._conn.execute(
+            "SELECT session_id, title, stored_size FROM briefs ORDER BY last_used_at ASC"
+        ):
+            if total <= self.max_bytes:
+                break
+            stale.append((session_id, title))
+            total -= stored_size
+        self._conn.executemany("DELETE FROM briefs WHERE session_id = ? AND title = ?", stale)
+
+    def stats(self):
+        with self._lock:
+            entries, size, stored_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM briefs"
+            ).fetchone()
+        return {"entries": entries, "bytes": size, "stored_bytes": stored_size}
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_brief_store():
+    """The process-wide BriefStore at BRIEF_STORE_PATH, created on first use."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = BriefStore(BRIEF_STORE_PATH)
+        return _default_store
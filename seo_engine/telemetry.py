@@ -0,0 +1,254 @@
+"""Per-call latency, token and cost metrics.
+
+Every API call made through create_completion (and every Message Batch item)
+is recorded once. Totals are kept as plain counters; time-to-first-token,
+latency and queueing time keep the last TELEMETRY_WINDOW samples per call kind
+for p50/p95/p99. Recording is an append under a lock, so it is cheap enough to
+leave on all the time.
+
+Calls made with a local estimate of their input tokens also add it up next to
+the input tokens the API billed for them, which is how the estimator in
+budget.py is calibrated, and prompt compactions are counted per input.
+Hedged calls (see hedging.py) are counted per kind, with how often the
+duplicate request was the one that answered first. Requests that were
+cancelled after being sent (hedge losers, calls past their deadline) are
+recorded as "abandoned" calls with the tokens they were billed for, and their
+cost is also totalled on its own.
+
+Metrics can be exported as Prometheus text (prometheus_text()) and, when a
+path is configured, each call is also appended to a JSONL file.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from .config import BATCH_PRICE_FACTOR, MODEL_PRICES, TELEMETRY_JSONL_PATH, TELEMETRY_WINDOW
+
+QUANTILES = (50, 95, 99)
+TIMINGS = ("ttft", "latency", "queued")
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+INPUT_TOKEN_FIELDS = ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+def percentiles(values, quantiles=QUANTILES):
+    """Linearly interpolated percentiles (numpy's default method) without importing numpy."""
+    ordered = sorted(values)
+    result = []
+    for q in quantiles:
+        position = (len(ordered) - 1) * q / 100
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        result.append(ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower))
+    return result
+
+def call_cost(model, usage, batch=False):
+    """Price in USD of one call's usage, or 0.0 for a model missing from MODEL_PRICES."""
+    prices = MODEL_PRICES.get(model)
+    if not prices or usage is None:
+        return 0.0
+    cost = (
+        (getattr(usage, "input_tokens", 0) or 0) * prices["input"]
+        + (getattr(usage, "output_tokens", 0) or 0) * prices["output"]
+        + (getattr(usage, "cache_creation_input_tokens", 0) or 0) * prices["cache_write"]
+        + (getattr(usage, "cache_read_input_tokens", 0) or 0) * prices["cache_read"]
+    ) / 1_000_000
+    return cost * BATCH_PRICE_FACTOR if batch else cost
+
+class Telemetry:
+    """Thread-safe in-memory aggregation of call records, with an optional JSONL sink."""
+
+    def __init__(self, jsonl_path=None, window=TELEMETRY_WINDOW):
+        self.jsonl_path = jsonl_path
+        self.window = window
+        self._lock = threading.Lock()
+        self._sink = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.calls = defaultdict(int)
+            self.errors = defaultdict(int)
+            self.retries = 0
+            self.tokens = dict.fromkeys(TOKEN_FIELDS, 0)
+            self.cost = 0.0
+            self.abandoned_cost = 0.0
+            self.token_estimates = {"calls": 0, "estimated": 0, "actual": 0}
+            self.compactions = defaultdict(lambda: {"count": 0, "tokens_saved": 0})
+            self.hedges = defaultdict(lambda: {"hedged": 0, "won": 0})
+            self.samples = defaultdict(lambda: deque(maxlen=self.window))
+
+    def record(self, kind, model, status="ok", usage=None, ttft=None, latency=None, queued=None, retries=0,
+               error=None, batch=False, estimated_input_tokens=None):
+        """Record one call. status is "ok", "cached", "error" or "abandoned"; times are in seconds."""
+        cost = call_cost(model, usage, batch) if status in ("ok", "abandoned") else 0.0
+        tokens = {field: getattr(usage, field, 0) or 0 for field in TOKEN_FIELDS} if usage is not None else None
+        with self._lock:
+            if tokens and estimated_input_tokens is not None:
+                self.token_estimates["calls"] += 1
+                self.token_estimates["estimated"] += estimated_input_tokens
+                self.token_estimates["actual"] += sum(tokens[field] for field in INPUT_TOKEN_FIELDS)
+            self.calls[(kind, status)] += 1
+            self.retries += retries
+            self.cost += cost
+            if status == "abandoned":
+                self.abandoned_cost += cost
+            if error is not None:
+                self.errors[type(error).__name__] += 1
+            if tokens:
+                for field, value in tokens.items():
+                    self.tokens[field] += value
+            if status == "ok":
+                for name, value in (("ttft", ttft), ("latency", latency), ("queued", queued)):
+                    if value is not None:
+                        self.samples[(kind, name)].append(value)
+
+        if self.jsonl_path:
+            self._write({
+                "ts": round(time.time(), 3),
+                "kind": kind,
+                "model": model,
+                "status": status,
+                "batch": batch,
+                "ttft": ttft,
+                "latency": latency,
+                "queued": queued,
+                "retries": retries,
+                "error": f"{type(error).__name__}: {error}" if error is not None else None,
+                "cost_usd": round(cost, 8),
+                "estimated_input_tokens": estimated_input_tokens,
+                **(tokens or {})
+            })
+
+    def record_compaction(self, block, tokens_before, tokens_after):
+        """Count one compaction of a prompt input (guidelines, existing_titles, template) to fit the budget."""
+        with self._lock:
+            self.compactions[block]["count"] += 1
+            self.compactions[block]["tokens_saved"] += tokens_before - tokens_after
+
+    def record_hedge(self, kind, won):
+        """Count one call of kind that sent a duplicate request; won if the duplicate answered first."""
+        with self._lock:
+            self.hedges[kind]["hedged"] += 1
+            self.hedges[kind]["won"] += won
+
+    def _write(self, record):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            if self._sink is None:
+                directory = os.path.dirname(self.jsonl_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._sink = open(self.jsonl_path, "a", encoding="utf-8", buffering=1)
+            self._sink.write(line)
+
+    def summary(self):
+        """Totals plus p50/p95/p99 of ttft, latency and queued time per call kind."""
+        with self._lock:
+            calls = dict(self.calls)
+            samples = {key: list(values) for key, values in self.samples.items()}
+            summary = {
+                "since": self.started_at,
+                "calls": sum(calls.values()),
+                "api_calls": sum(count for (_, status), count in calls.items() if status != "cached"),
+                "cached": sum(count for (_, status), count in calls.items() if status == "cached"),
+                "errors": dict(self.errors),
+                "retries": self.retries,
+                "tokens": dict(self.tokens),
+                "cost_usd": self.cost,
+                "abandoned_cost_usd": self.abandoned_cost,
+                "token_estimates": {
+                    **self.token_estimates,
+                    "ratio": self.token_estimates["actual"] / self.token_estimates["estimated"]
+                    if self.token_estimates["estimated"] else None
+                },
+                "compactions": {block: dict(counts) for block, counts in self.compactions.items()},
+                "hedges": {kind: dict(counts) for kind, counts in self.hedges.items()},
+                "by_kind": {}
+            }
+        for (kind, status), count in calls.items():
+            summary["by_kind"].setdefault(kind, {"calls": {}})["calls"][status] = count
+        for (kind, name), values in samples.items():
+            if values:
+                summary["by_kind"].setdefault(kind, {"calls": {}})[name] = {
+                    f"p{q}": float(value) for q, value in zip(QUANTILES, percentiles(values))
+                }
+        return summary
+
+    def prometheus_text(self):
+        """The current metrics in the Prometheus text exposition format."""
+        with self._lock:
+            calls = dict(self.calls)
+            errors = dict(self.errors)
+            retries = self.retries
+            tokens = dict(self.tokens)
+            cost = self.cost
+            token_estimates = dict(self.token_estimates)
+            compactions = {block: dict(counts) for block, counts in self.compactions.items()}
+            hedges = {kind: dict(counts) for kind, counts in self.hedges.items()}
+            samples = {key: list(values) for key, values in self.samples.items()}
+
+        lines = [
+            "# HELP seo_planner_calls_total Completion calls by kind and status (ok, cached, error, abandoned).",
+            "# TYPE seo_planner_calls_total counter"
+        ]
+        for (kind, status), count in sorted(calls.items()):
+            lines.append(f'seo_planner_calls_total{{kind="{kind}",status="{status}"}} {count}')
+        lines += ["# HELP seo_planner_errors_total Failed calls by exception type.", "# TYPE seo_planner_errors_total counter"]
+        for error_type, count in sorted(errors.items()):
+            lines.append(f'seo_planner_errors_total{{type="{error_type}"}} {count}')
+        lines += [
+            "# HELP seo_planner_retries_total Retried API requests.",
+            "# TYPE seo_planner_retries_total counter",
+            f"seo_planner_retries_total {retries}",
+            "# HELP seo_planner_tokens_total Tokens billed, by usage field.",
+            "# TYPE seo_planner_tokens_total counter"
+        ]
+        for field, count in tokens.items():
+            lines.append(f'seo_planner_tokens_total{{type="{field.removesuffix("_tokens")}"}} {count}')
+        lines += [
+            "# HELP seo_planner_cost_usd_total Estimated spend in US dollars.",
+            "# TYPE seo_planner_cost_usd_total counter",
+            f"seo_planner_cost_usd_total {cost:.6f}",
+            "# HELP seo_planner_estimated_input_tokens_total Locally estimated input tokens of calls with an estimate.",
+            "# TYPE seo_planner_estimated_input_tokens_total counter",
+            f"seo_planner_estimated_input_tokens_total {token_estimates['estimated']}",
+            "# HELP seo_planner_estimated_calls_input_tokens_total Input tokens billed for those same calls.",
+            "# TYPE seo_planner_estimated_calls_input_tokens_total counter",
+            f"seo_planner_estimated_calls_input_tokens_total {token_estimates['actual']}",
+            "# HELP seo_planner_prompt_compactions_total Prompt inputs compacted to fit the token budget.",
+            "# TYPE seo_planner_prompt_compactions_total counter"
+        ]
+        for block, counts in sorted(compactions.items()):
+            lines.append(f'seo_planner_prompt_compactions_total{{block="{block}"}} {counts["count"]}')
+        lines += [
+            "# HELP seo_planner_hedged_calls_total Calls that sent a duplicate request, and those the duplicate won.",
+            "# TYPE seo_planner_hedged_calls_total counter"
+        ]
+        for kind, counts in sorted(hedges.items()):
+            lines.append(f'seo_planner_hedged_calls_total{{kind="{kind}",outcome="sent"}} {counts["hedged"]}')
+            lines.append(f'seo_planner_hedged_calls_total{{kind="{kind}",outcome="won"}} {counts["won"]}')
+        for name in TIMINGS:
+            metric = f"seo_planner_{name}_seconds"
+            lines += [f"# HELP {metric} Recent {name} of successful calls.", f"# TYPE {metric} summary"]
+            for (kind, sample_name), values in sorted(samples.items()):
+                if sample_name != name or not values:
+                    continue
+                for q, value in zip(QUANTILES, percentiles(values)):
+                    lines.append(f'{metric}{{kind="{kind}",quantile="{q / 100:g}"}} {value:.6f}')
+                lines.append(f'{metric}_sum{{kind="{kind}"}} {sum(values):.6f}')
+                lines.append(f'{metric}_count{{kind="{kind}"}} {len(values)}')
+        return "\n".join(lines) + "\n"
+
+_default_telemetry = None
+_default_telemetry_lock = threading.Lock()
+
+def get_telemetry():
+    """The process-wide Telemetry, writing JSONL to TELEMETRY_JSONL_PATH if set."""
+    global _default_telemetry
+    with _default_telemetry_lock:
+        if _default_telemetry is None:
+            _default_telemetry = Telemetry(TELEMETRY_JSONL_PATH)
+        return _default_telemetry
@@ -0,0 +1,45 @@
+"""Runs the engine against the in-process fake API (tools/fake_anthropic.py), with its caches in a temp dir."""
+
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [REPO_ROOT, os.path.join(REPO_ROOT, "tools")]
+
+# The engine reads these when seo_engine.config is first imported.
+CACHE_DIR = tempfile.mkdtemp(prefix="seo-planner-tests-")
+os.environ.update({
+    "SEO_PLANNER_CACHE_PATH": os.path.join(CACHE_DIR, "responses.sqlite3"),
+    "SEO_PLANNER_BRIEFS_PATH": os.path.join(CACHE_DIR, "briefs.sqlite3"),
+    "SEO_PLANNER_JOBS_PATH": os.path.join(CACHE_DIR, "jobs.sqlite3"),
+    "SEO_PLANNER_ROUTES_PATH": os.path.join(CACHE_DIR, "routes.json"),
+    "SEO_PLANNER_RPM": "100000",
+    "SEO_PLANNER_ITPM": "100000000",
+})
+
+from fake_anthropic import FakeAnthropicServer, FakeConfig  # noqa: E402
+
+@pytest.fixture
+def fake_api():
+    """Starts a fake API with the given FakeConfig fields; returns (server, client)."""
+    import anthropic
+
+    servers = []
+
+    def start(**config):
+        server = FakeAnthropicServer(FakeConfig(**{
+            "latency": 0.01, "latency_sigma": 0.0, "tokens_per_second": 100_000.0, "output_tokens": 30, "seed": 1,
+            **config
+        }))
+        servers.append(server.start())
+        # A fresh key per server, so each test gets its own RequestScheduler.
+        client = anthropic.Anthropic(api_key=f"test-{uuid.uuid4().hex}", base_url=server.url, max_retries=0)
+        return server, client
+
+    yield start
+    for server in servers:
+        server.stop()
@@ -0,0 +1,73 @@
+import pytest
+
+from seo_engine import get_response_cache, get_telemetry
+from seo_engine.batches import request_briefs_in_batches
+from seo_engine.cli import BatchLedger
+from seo_engine.prompts import DEFAULT_GUIDELINES, DEFAULT_TEMPLATE
+
+class Interrupted(Exception):
+    pass
+
+def interrupt(summary):
+    raise Interrupted
+
+def test_resumed_run_polls_submitted_batches_instead_of_resubmitting(fake_api, tmp_path):
+    server, client = fake_api(batch_latency=0.5)
+    titles = [f"Fan token title {i}" for i in range(5)]
+    ledger = BatchLedger(str(tmp_path / "briefs.jsonl.batches.json"))
+    run = request_briefs_in_batches(
+        client, titles, DEFAULT_TEMPLATE, DEFAULT_GUIDELINES, use_cache=False, on_status=interrupt, poll_interval=0.1,
+        on_submit=ledger.add, on_finish=ledger.remove, cancel_on_close=False
+    )
+    try:
+        list(run)
+    except Interrupted:
+        pass
+    assert len(BatchLedger(ledger.path).load()) == 1
+
+    ledger = BatchLedger(ledger.path)
+    results = list(request_briefs_in_batches(
+        client, titles, DEFAULT_TEMPLATE, DEFAULT_GUIDELINES, use_cache=False, poll_interval=0.1,
+        resume=ledger.load(), on_submit=ledger.add, on_finish=ledger.remove, cancel_on_close=False
+    ))
+    assert sorted(title for title, _, error in results if not error) == titles
+    assert server.stats["batches"] == 1
+    assert server.stats["requests"] == 0
+    assert ledger.load() == {}
+
+def cut_off_after_first_item(client):
+    results = client.messages.batches.results
+
+    def download(batch_id):
+        items = iter(results(batch_id))
+        yield next(items)
+        raise ConnectionResetError("connection reset")
+
+    return download
+
+def test_interrupted_results_download_retries_the_unread_titles(fake_api, monkeypatch):
+    server, client = fake_api(batch_latency=0.1)
+    monkeypatch.setattr(client.messages.batches, "results", cut_off_after_first_item(client))
+    telemetry = get_telemetry()
+    telemetry.reset()
+    titles = [f"Fan token title {i}" for i in range(5)]
+    results = list(request_briefs_in_batches(
+        client, titles, DEFAULT_TEMPLATE, DEFAULT_GUIDELINES, use_cache=False, poll_interval=0.05
+    ))
+    assert sorted(title for title, _, error in results if not error) == titles
+    assert server.stats["requests"] == 4
+    assert telemetry.summary()["errors"] == {"ConnectionResetError": 1}
+
+def test_errors_handling_the_results_are_raised(fake_api, monkeypatch):
+    server, client = fake_api(batch_latency=0.1)
+
+    def disk_full(key, value):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(get_response_cache(), "put", disk_full)
+    titles = [f"Fan token title {i}" for i in range(5)]
+    with pytest.raises(OSError):
+        list(request_briefs_in_batches(
+            client, titles, DEFAULT_TEMPLATE, DEFAULT_GUIDELINES, use_cache=False, poll_interval=0.05
+        ))
+    assert server.stats["requests"] == 0
@@ -0,0 +1,51 @@
+import pytest
+
+from seo_engine.budget import (
+    TRUNCATION_MARKER, PromptBudgetError, dedupe_lines, estimate_prompt_tokens, estimate_tokens, fit_to_budget
+)
+from seo_engine.prompts import build_brief_prompt, build_strategy_prompt
+from seo_engine.telemetry import get_telemetry
+
+GUIDELINES = "\n".join(f"Guideline {i}: write for busy readers who skim long pages." for i in range(40))
+
+def test_dedupe_lines_drops_repeats_ignoring_case_and_spacing():
+    text = "Be concise.\n\n\n  be   CONCISE. \nCite sources.\n\nBe concise."
+    assert dedupe_lines(text) == "Be concise.\n\nCite sources."
+
+def test_prompt_under_budget_is_left_alone():
+    blocks = {"template": "# Title", "guidelines": GUIDELINES}
+    assert fit_to_budget(build_brief_prompt, blocks, budget=100_000, title="") == blocks
+
+def test_duplicate_lines_go_before_anything_is_cut():
+    telemetry = get_telemetry()
+    telemetry.reset()
+    guidelines = GUIDELINES + "\n" + GUIDELINES
+    size = estimate_prompt_tokens(*build_brief_prompt("", "# Title", guidelines))
+
+    fitted = fit_to_budget(build_brief_prompt, {"template": "# Title", "guidelines": guidelines},
+                           budget=size - estimate_tokens(GUIDELINES) // 2, title="")
+
+    assert fitted["guidelines"] == GUIDELINES
+    assert dict(telemetry.compactions)["guidelines"]["count"] == 1
+
+def test_largest_input_is_cut_to_the_budget():
+    titles = "\n".join(f"Existing title number {i}" for i in range(200))
+    budget = estimate_prompt_tokens(*build_strategy_prompt("", GUIDELINES)) + 100
+
+    fitted = fit_to_budget(build_strategy_prompt, {"existing_titles": titles, "guidelines": GUIDELINES}, budget=budget)
+
+    assert fitted["guidelines"] == GUIDELINES
+    assert fitted["existing_titles"].startswith("Existing title number 0\n")
+    assert fitted["existing_titles"].endswith("more titles)")
+    assert estimate_prompt_tokens(*build_strategy_prompt(**fitted)) <= budget
+
+def test_guidelines_are_shortened_when_the_titles_are_not_enough():
+    fitted = fit_to_budget(build_brief_prompt, {"template": "# Title", "guidelines": GUIDELINES},
+                           budget=estimate_tokens(GUIDELINES) // 2 + 200, title="")
+    assert fitted["guidelines"].endswith(TRUNCATION_MARKER)
+    assert fitted["guidelines"].startswith("Guideline 0:")
+
+def test_prompt_that_cannot_fit_raises_before_sending():
+    with pytest.raises(PromptBudgetError):
+        fit_to_budget(build_brief_prompt, {"template": "# Title\n" * 5 + "## Outline", "guidelines": GUIDELINES},
+                      budget=50, title="")
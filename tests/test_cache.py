@@ -0,0 +1,70 @@
+import pytest
+
+from seo_engine import cache
+from seo_engine.cache import ResponseCache
+from seo_engine.generation import create_completion
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+def test_key_covers_every_request_parameter():
+    key = ResponseCache.make_key("model", "system", "prompt", 100)
+    assert key == ResponseCache.make_key("model", "system", "prompt", 100)
+    assert len({
+        key,
+        ResponseCache.make_key("other-model", "system", "prompt", 100),
+        ResponseCache.make_key("model", "other system", "prompt", 100),
+        ResponseCache.make_key("model", "system", "other prompt", 100),
+        ResponseCache.make_key("model", "system", "prompt", 200),
+        ResponseCache.make_key("model", "system", "prompt", 100, tool={"name": "titles"}),
+    }) == 6
+    assert ResponseCache.make_key("model", "", "prompt", 100, tool={"name": "t", "input_schema": {}}) == (
+        ResponseCache.make_key("model", "", "prompt", 100, tool={"input_schema": {}, "name": "t"})
+    )
+
+def test_least_recently_used_entries_are_evicted_over_max_bytes(tmp_path, clock):
+    responses = ResponseCache(str(tmp_path / "responses.sqlite3"), max_bytes=10)
+    responses.put("a", "aaaa")
+    clock.now += 1
+    responses.put("b", "bbbb")
+    clock.now += 1
+    assert responses.get("a") == "aaaa"
+    clock.now += 1
+    responses.put("c", "cccc")
+
+    assert responses.get("b") is None
+    assert responses.get("a") == "aaaa"
+    assert responses.get("c") == "cccc"
+    assert responses.stats() == {"hits": 3, "misses": 1, "entries": 2, "bytes": 8}
+
+def test_entries_expire_after_max_age(tmp_path, clock):
+    responses = ResponseCache(str(tmp_path / "responses.sqlite3"), max_age_seconds=60)
+    responses.put("old", "text")
+    clock.now += 61
+    assert responses.get("old") is None
+    responses.put("new", "text")
+    assert responses.stats()["entries"] == 1
+
+def test_completions_are_served_from_the_cache(fake_api):
+    server, client = fake_api()
+    first = create_completion(client, "Cache test prompt", 64)
+    assert create_completion(client, "Cache test prompt", 64) == first
+    assert server.stats["requests"] == 1
+
+    chunks = []
+    assert create_completion(client, "Cache test prompt", 64, on_text=chunks.append) == first
+    assert chunks == [first]
+    # use_cache=False always calls the API and stores the fresh response.
+    fresh = create_completion(client, "Cache test prompt", 64, use_cache=False)
+    assert server.stats["requests"] == 2
+    assert create_completion(client, "Cache test prompt", 64) == fresh
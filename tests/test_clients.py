@@ -0,0 +1,16 @@
+import gc
+
+from seo_engine.clients import ClientRegistry
+
+def test_evicted_client_keeps_its_scheduler_and_closes_its_pool_once_released():
+    registry = ClientRegistry(idle_ttl_seconds=0)
+    client = registry.get("test-key")
+    scheduler = registry.scheduler_for(client)
+    http_client = client._client
+
+    registry.get("other-key")  # evicts the idle first client
+    assert not http_client.is_closed  # still held here, e.g. by a running batch
+    del client
+    gc.collect()
+    assert http_client.is_closed
+    assert registry.scheduler_for(registry.get("test-key")) is scheduler
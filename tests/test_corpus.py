@@ -0,0 +1,47 @@
+from seo_engine.corpus import NoveltyFilter, TitleIndex
+from seo_engine.generation import request_strategies
+
+BREAD = ["How to bake sourdough bread at home", "Sourdough starter feeding schedule", "Sourdough bread flour guide"]
+
+def archive(count):
+    words = ["crypto", "wallet", "fan", "token", "stadium", "season", "ticket", "league", "exchange", "staking"]
+    return [f"{words[i % 10].title()} {words[(i // 10) % 10]} {words[(i // 7) % 10]} update {i}" for i in range(count)]
+
+def test_small_corpus_is_sent_whole():
+    titles = archive(5)
+    assert TitleIndex(titles).select_context("sourdough", top_k=3, n_clusters=2) == titles
+
+def test_context_is_the_most_relevant_titles_plus_cluster_representatives():
+    index = TitleIndex(archive(200) + BREAD)
+    context = index.select_context("Baking sourdough bread", top_k=3, n_clusters=4)
+    assert set(context[:3]) == set(BREAD)
+    assert len(context) <= 7
+    assert len(set(context)) == len(context)
+    # Representatives already among the relevant titles are not repeated.
+    assert set(context[3:]) <= set(archive(200))
+
+def test_near_duplicates_of_the_corpus_and_of_each_other_are_rejected():
+    novelty = NoveltyFilter(TitleIndex(BREAD))
+    novel = novelty.filter([
+        "How to Bake Sourdough Bread at Home!",
+        "Best running shoes for flat feet",
+        "best running shoes for flat feet",
+        "Choosing a crypto wallet for fan tokens",
+    ])
+    assert novel == ["Best running shoes for flat feet", "Choosing a crypto wallet for fan tokens"]
+    assert novelty.rejected == ["How to Bake Sourdough Bread at Home!", "best running shoes for flat feet"]
+    assert novelty.filter(["Best Running Shoes For Flat Feet"]) == []
+
+def test_strategies_replace_titles_the_archive_already_has(fake_api):
+    server, client = fake_api()
+    guidelines = "Audience: fan token holders."
+    first = request_strategies(client, "", guidelines)
+    assert len(first) == 10
+
+    duplicates = []
+    # The first round is served from the cache, so every title in it duplicates the archive.
+    second = request_strategies(client, "", guidelines, title_index=TitleIndex(first), on_duplicate=duplicates.append)
+    assert duplicates == first
+    assert len(second) == 10
+    assert not set(second) & set(first)
+    assert server.stats["requests"] >= 2
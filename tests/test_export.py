@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+import zipfile
+
+import pytest
+
+from seo_engine import export
+from seo_engine.config import XLSX_MAX_CELL_CHARS
+from seo_engine.export import FIELDS, build_export, export_briefs, read_jsonl_records
+
+RECORDS = [
+    {"title": "Sourdough for beginners", "brief": "## Outline\n- Starter", "finished_at": 0, "seconds": 1.5,
+     "input_tokens": 120, "output_tokens": 300},
+    {"title": "Sourdough for beginners", "brief": "## Outline\n- Flour", "generated_at": "2026-01-02T03:04:05+00:00"},
+    {"title": "Rye bread", "brief": "Crumb\x01 and crust " + "x" * XLSX_MAX_CELL_CHARS, "seconds": 2.0},
+]
+
+def exported(fmt, records=RECORDS):
+    out = io.BytesIO()
+    export_briefs(iter(records), fmt, out)
+    out.seek(0)
+    return out
+
+def test_zip_has_one_markdown_file_per_brief_and_an_index():
+    with zipfile.ZipFile(exported("zip")) as archive:
+        index = [json.loads(line) for line in archive.read("index.jsonl").decode("utf-8").splitlines()]
+        assert [row["file"] for row in index] == [
+            "briefs/Sourdough_for_beginners.md", "briefs/Sourdough_for_beginners_2.md", "briefs/Rye_bread.md"
+        ]
+        assert archive.read("briefs/Sourdough_for_beginners_2.md").decode("utf-8") == RECORDS[1]["brief"]
+    assert index[0]["generated_at"] == "1970-01-01T00:00:00+00:00"
+    assert index[0]["input_tokens"] == 120
+
+def test_jsonl_and_csv_round_trip():
+    rows = [json.loads(line) for line in exported("jsonl").read().decode("utf-8").splitlines()]
+    assert [row["brief"] for row in rows] == [record["brief"] for record in RECORDS]
+    assert list(rows[0]) == list(FIELDS)
+
+    text = exported("csv").read().decode("utf-8-sig")
+    rows = list(csv.DictReader(io.StringIO(text, newline="")))
+    assert [row["brief"] for row in rows] == [record["brief"] for record in RECORDS]
+    assert rows[1]["generated_at"] == "2026-01-02T03:04:05+00:00"
+    assert rows[1]["seconds"] == ""
+
+def test_xlsx_cuts_briefs_at_the_cell_limit():
+    openpyxl = pytest.importorskip("openpyxl")
+    sheet = openpyxl.load_workbook(exported("xlsx"), read_only=True)["Briefs"]
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0] == FIELDS
+    assert rows[1][1] == RECORDS[0]["brief"]
+    assert len(rows[3][1]) == XLSX_MAX_CELL_CHARS
+    assert rows[3][1].startswith("Crumb and crust") and rows[3][1].endswith("\n[truncated]")
+
+def test_parquet_is_written_in_row_groups(monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(export, "EXPORT_ROW_GROUP_SIZE", 2)
+    parquet = pq.ParquetFile(exported("parquet", RECORDS * 3))
+    assert parquet.metadata.num_row_groups == 5
+    table = parquet.read()
+    assert table.column("brief").to_pylist() == [record["brief"] for record in RECORDS * 3]
+    assert table.column("input_tokens").to_pylist()[:2] == [120, None]
+
+def test_cli_converts_the_successful_records_of_a_jsonl_file(tmp_path, capsys):
+    source = tmp_path / "briefs.jsonl"
+    lines = [json.dumps(RECORDS[0]), "{broken", json.dumps({"title": "Failed", "status": "error", "brief": None}),
+             json.dumps(RECORDS[2])]
+    source.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    assert [record["title"] for record in read_jsonl_records(source)] == ["Sourdough for beginners", "Rye bread"]
+
+    assert export.main([str(source), str(tmp_path / "briefs.zip")]) == 0
+    with zipfile.ZipFile(tmp_path / "briefs.zip") as archive:
+        assert sorted(archive.namelist()) == ["briefs/Rye_bread.md", "briefs/Sourdough_for_beginners.md", "index.jsonl"]
+    with build_export(read_jsonl_records(source), "jsonl") as out:
+        assert len(out.read().splitlines()) == 2
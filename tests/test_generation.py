@@ -0,0 +1,79 @@
+import pytest
+
+from seo_engine import get_telemetry
+from seo_engine.generation import TokenUsage, request_brief_by_sections, request_many_strategies
+from seo_engine.prompts import parse_shard_titles
+
+pytestmark = pytest.mark.filterwarnings("ignore::DeprecationWarning")
+
+TEMPLATE = """# Brief template
+
+## Metadatos
+- Target Audience:
+- Tone:
+
+## Article Structure
+- H1:
+- Slug URL:
+
+## Content Outline (Detailed)
+- H2 sections with ### subsections
+
+## Keywords Table
+| Keyword | Volume | Notes |"""
+
+def test_sections_are_written_in_parallel_and_assembled_in_template_order(fake_api):
+    server, client = fake_api()
+    telemetry = get_telemetry()
+    telemetry.reset()
+    usage = TokenUsage()
+    chunks = []
+
+    brief = request_brief_by_sections(
+        client, "Sourdough for beginners", TEMPLATE, "Write for home bakers.", use_cache=False,
+        on_text=chunks.append, usage=usage
+    )
+
+    headings = [line for line in brief.splitlines() if line.startswith("## ")]
+    assert headings == ["## Metadatos", "## Article Structure", "## Content Outline (Detailed)", "## Keywords Table"]
+    assert "".join(chunks) == brief
+    # One call fixes the anchors, then one per section.
+    assert server.stats["requests"] == 5
+    calls = {kind: stats["calls"] for kind, stats in telemetry.summary()["by_kind"].items()}
+    assert calls == {"brief_anchors": {"ok": 1}, "brief_section": {"ok": 4}}
+    assert usage.summary()["output_tokens"] > 0
+
+def test_template_with_one_section_is_written_in_one_call(fake_api):
+    server, client = fake_api()
+    brief = request_brief_by_sections(
+        client, "Sourdough for beginners", "## Outline\n- H2 sections", "Write for home bakers.", use_cache=False
+    )
+    assert brief.startswith("## Metadatos")
+    assert server.stats["requests"] == 1
+
+def test_sharded_strategies_are_ranked_unique_titles_from_every_shard(fake_api):
+    server, client = fake_api()
+    telemetry = get_telemetry()
+    telemetry.reset()
+
+    titles = request_many_strategies(client, "Sourdough for beginners", "Write for home bakers.", 60, use_cache=False)
+
+    assert len(titles) == 60
+    assert len({item["title"].lower() for item in titles}) == 60
+    scores = [item["score"] for item in titles]
+    assert scores == sorted(scores, reverse=True)
+    # 60 titles plus headroom make four shards of about 25, all asked at once after one planning call.
+    assert len({item["shard"] for item in titles}) == 4
+    calls = {kind: stats["calls"] for kind, stats in telemetry.summary()["by_kind"].items()}
+    assert calls == {"strategy_plan": {"ok": 1}, "strategy_shard": {"ok": 4}}
+    assert server.stats["requests"] == 5
+
+def test_shard_titles_fall_back_to_numbered_lines_and_clamp_scores():
+    reply = '{"titles": [{"title": "A", "score": 42}, {"title": ""}, {"title": "B", "score": "x"}]}'
+    assert parse_shard_titles(reply) == [
+        {"title": "A", "primary_keyword": "", "score": 10}, {"title": "B", "primary_keyword": "", "score": 5}
+    ]
+    assert parse_shard_titles("1. First title\n2. Second title") == [
+        {"title": "First title", "primary_keyword": "", "score": 5},
+        {"title": "Second title", "primary_keyword": "", "score": 5},
+    ]
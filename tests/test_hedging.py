@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from seo_engine import get_client_registry, get_telemetry
+from seo_engine.generation import TokenUsage, create_completion
+from seo_engine.hedging import Hedger, get_hedger, set_hedger
+from seo_engine.routing import ModelRouter, get_model_router, set_model_router
+from seo_engine.scheduler import DeadlineExceededError
+
+@pytest.fixture
+def router():
+    previous = get_model_router()
+    router = ModelRouter({"brief": {"model": "claude-3-haiku-20240307", "max_tokens": 256, "deadline_seconds": 1.0}})
+    set_model_router(router)
+    yield router
+    set_model_router(previous)
+
+@pytest.fixture
+def hedger():
+    # Every call may be hedged, 50 ms after it was sent.
+    previous = get_hedger()
+    hedger = Hedger(max_rate=1.0, min_samples=1, min_delay=0.05)
+    hedger.record("completion", 0.01)
+    set_hedger(hedger)
+    yield hedger
+    set_hedger(previous)
+
+def unstall_after_first_stall(server):
+    """Lets every request after the first stalled one answer at once, so a hedge of it wins."""
+    def run():
+        while not server.stats["stalled"]:
+            time.sleep(0.005)
+        server.config.stall_rate = 0.0
+
+    threading.Thread(target=run, daemon=True).start()
+
+def test_deadline_covers_retries_and_bills_the_abandoned_request(fake_api, router):
+    server, client = fake_api(stall_rate=1.0, stall_seconds=5.0)
+    telemetry = get_telemetry()
+    telemetry.reset()
+    usage = TokenUsage()
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        create_completion(client, "Write a brief", 256, use_cache=False, on_text=lambda chunk: None, usage=usage)
+    assert time.monotonic() - started < 2.0
+    assert server.stats["requests"] == 1
+    summary = telemetry.summary()
+    assert summary["by_kind"]["completion"]["calls"] == {"abandoned": 1, "error": 1}
+    # The stream had started, so the input tokens it reported are billed.
+    assert usage.summary()["input_tokens"] > 0
+    assert summary["abandoned_cost_usd"] > 0
+
+def test_plain_call_times_out_once_without_a_retry(fake_api, router):
+    server, client = fake_api(stall_rate=1.0, stall_seconds=5.0)
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        create_completion(client, "Write a brief", 256, use_cache=False)
+    assert time.monotonic() - started < 1.5
+    assert server.stats["requests"] == 1
+
+def test_no_retry_waits_past_the_deadline(fake_api, router):
+    server, client = fake_api(throttle_rate=1.0, retry_after=5.0)
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        create_completion(client, "Write a brief", 256, use_cache=False)
+    assert time.monotonic() - started < 1.0
+    assert server.stats["requests"] == 1
+
+def test_hedge_that_answers_first_wins_and_the_loser_is_billed(fake_api, router, hedger):
+    server, client = fake_api(stall_rate=1.0, stall_seconds=5.0)
+    unstall_after_first_stall(server)
+    telemetry = get_telemetry()
+    telemetry.reset()
+    usage = TokenUsage()
+    chunks = []
+
+    text = create_completion(client, "Write a brief", 256, use_cache=False, on_text=chunks.append, usage=usage)
+
+    assert text == "".join(chunks)
+    assert server.stats["requests"] == 2
+    summary = telemetry.summary()
+    assert summary["hedges"] == {"completion": {"hedged": 1, "won": 1}}
+    assert summary["by_kind"]["completion"]["calls"] == {"abandoned": 1, "ok": 1}
+    assert summary["abandoned_cost_usd"] > 0
+    # The loser had reported its input tokens, so they are billed next to the winner's.
+    assert usage.summary()["input_tokens"] == summary["tokens"]["input_tokens"] > 0
+
+def test_hedge_needs_a_free_concurrency_slot(fake_api, router, hedger):
+    server, client = fake_api(stall_rate=1.0, stall_seconds=5.0)
+    unstall_after_first_stall(server)
+    get_client_registry().scheduler_for(client).limit = 1.0
+    with pytest.raises(DeadlineExceededError):
+        create_completion(client, "Write a brief", 256, use_cache=False, on_text=lambda chunk: None)
+    assert server.stats["requests"] == 1
+    assert hedger.stats()["hedged"] == 0
+
+def test_hedges_are_capped_at_max_rate():
+    hedger = Hedger(max_rate=0.25, min_samples=2, min_delay=0.05)
+    assert hedger.plan("brief") is None
+    hedger.record("brief", 0.2)
+    hedger.record("brief", 0.4)
+    assert hedger.plan("brief") >= 0.2
+    for _ in range(6):
+        hedger.plan("brief")
+    assert [hedger.allow() for _ in range(4)] == [True, True, False, False]
+    assert hedger.stats() == {"calls": 8, "hedged": 2, "rate": 0.25}
@@ -0,0 +1,127 @@
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+from functools import partial
+
+import pytest
+
+from seo_engine import jobs
+from seo_engine.batches import request_briefs_in_batches
+from seo_engine.jobs import ACTIVE_STATUSES, JobQueue, boot_id
+
+TEMPLATE = "# {title}\n\n## Outline\n\n## Keywords Table"
+GUIDELINES = "Write for busy marketers."
+
+# The SDK warns about the brief model's end-of-life date on every call.
+pytestmark = pytest.mark.filterwarnings("ignore::DeprecationWarning")
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            pytest.fail("timed out")
+        time.sleep(0.02)
+
+def finished(queue, job_id):
+    return queue.get(job_id)["status"] not in ACTIVE_STATUSES and job_id not in queue._runs
+
+@pytest.fixture
+def jobs_path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+def test_cancel_stops_the_job_and_closes_its_streams(fake_api, jobs_path):
+    # Every brief streams for about 8 seconds.
+    server, client = fake_api(tokens_per_second=25.0, output_tokens=200)
+    queue = JobQueue(jobs_path)
+    titles = [f"Title {i}" for i in range(4)]
+    job_id = queue.submit(client, titles, TEMPLATE, GUIDELINES, max_workers=4, use_cache=False)
+    wait_for(lambda: server.stats["streamed"] == 4 and len(queue.partial_briefs(job_id)) == 4)
+
+    cancelled_at = time.monotonic()
+    assert queue.cancel(job_id)
+    assert queue.get(job_id)["status"] == "cancelled"
+    wait_for(lambda: finished(queue, job_id), timeout=2.0)
+    assert time.monotonic() - cancelled_at < 1.0
+
+    job = queue.get(job_id)
+    assert job["status"] == "cancelled"
+    assert job["done"] == 0
+    # The abandoned requests are billed for the input they reported.
+    assert job["usage"]["input_tokens"] > 0
+    wait_for(lambda: server.stats["disconnected"] == 4, timeout=3.0)
+    assert server.stats["requests"] == 4
+
+def test_orphaned_jobs_are_interrupted_and_resume_finishes_them(fake_api, jobs_path):
+    server, client = fake_api()
+    queue = JobQueue(jobs_path)
+    orphan = queue.submit(client, ["First", "Second", "Third"], TEMPLATE, GUIDELINES, max_workers=2, use_cache=False)
+    elsewhere = queue.submit(client, ["Remote"], TEMPLATE, GUIDELINES, max_workers=1, use_cache=False)
+    wait_for(lambda: finished(queue, orphan) and finished(queue, elsewhere))
+
+    # Leave the first job half done by a process that has exited, the other running on another host.
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    with sqlite3.connect(jobs_path) as conn:
+        conn.execute("UPDATE jobs SET status = 'running', owner = ? WHERE id = ?",
+                     (json.dumps([socket.gethostname(), boot_id(), exited.pid]), orphan))
+        conn.execute("UPDATE job_items SET status = 'pending', brief = NULL WHERE job_id = ? AND title = 'Second'",
+                     (orphan,))
+        conn.execute("UPDATE job_items SET status = 'error', brief = NULL WHERE job_id = ? AND title = 'Third'",
+                     (orphan,))
+        conn.execute("UPDATE jobs SET status = 'running', owner = ? WHERE id = ?",
+                     (json.dumps(["another-host", "", os.getpid()]), elsewhere))
+
+    reopened = JobQueue(jobs_path)
+    assert reopened.get(orphan)["status"] == "interrupted"
+    assert reopened.get(elsewhere)["status"] == "running"
+    assert not reopened.resume(elsewhere, client)
+
+    requests = server.stats["requests"]
+    assert reopened.resume(orphan, client)
+    wait_for(lambda: finished(reopened, orphan))
+    job = reopened.get(orphan)
+    assert job["status"] == "done"
+    assert job["done"] == 3
+    assert server.stats["requests"] - requests == 2
+    assert [title for title, *_ in reopened.results(orphan)][-2:] in (["Second", "Third"], ["Third", "Second"])
+
+def test_resumed_batch_job_reads_its_submitted_batches(fake_api, jobs_path, monkeypatch):
+    server, client = fake_api(batch_latency=0.3)
+    monkeypatch.setattr(jobs, "request_briefs_in_batches", partial(request_briefs_in_batches, poll_interval=0.05))
+    queue = JobQueue(jobs_path)
+    titles = [f"Batch title {i}" for i in range(5)]
+
+    def lost_connection(batch_id):
+        raise RuntimeError("lost connection")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(client.messages.batches, "retrieve", lost_connection)
+        job_id = queue.submit(client, titles, TEMPLATE, GUIDELINES, max_workers=2, use_cache=False,
+                              use_batches=True)
+        wait_for(lambda: finished(queue, job_id))
+    assert queue.get(job_id)["status"] == "failed"
+    assert len(queue._batches(job_id)) == 1
+
+    resumed = JobQueue(jobs_path)
+    assert resumed.resume(job_id, client)
+    wait_for(lambda: finished(resumed, job_id))
+    assert resumed.get(job_id)["done"] == 5
+    assert server.stats["batches"] == 1
+    assert server.stats["requests"] == 0
+    assert resumed._batches(job_id) == {}
+
+def test_cancelled_batch_job_stops_between_polls_and_cancels_its_batches(fake_api, jobs_path):
+    server, client = fake_api(batch_latency=30.0)
+    queue = JobQueue(jobs_path)
+    job_id = queue.submit(client, ["One", "Two"], TEMPLATE, GUIDELINES, max_workers=2, use_cache=False,
+                          use_batches=True)
+    wait_for(lambda: queue._batches(job_id))
+
+    queue.cancel(job_id)
+    wait_for(lambda: finished(queue, job_id), timeout=1.0)
+    (batch_id,) = queue._batches(job_id)
+    assert client.messages.batches.retrieve(batch_id).cancel_initiated_at is not None
@@ -0,0 +1,48 @@
+from seo_engine.keywords import KeywordIndex, parse_keyword_table
+
+def brief(*keywords):
+    rows = "\n".join(f"| {keyword} | 1.2K | |" for keyword in keywords)
+    table = f"| Keyword | Volume | Notes |\n|---|---|---|\n{rows}"
+    return f"# Title\n\n## Keywords Table\n\n{table}\n\n## Outline\n\n- {keywords[0]}\n"
+
+def test_keyword_table_is_parsed_up_to_the_next_heading():
+    rows = parse_keyword_table(brief("**Running Shoes**", "trail shoes", "running shoes"))
+    assert rows == [("running shoes", 1200.0, ""), ("trail shoes", 1200.0, "")]
+
+def test_briefs_sharing_most_of_their_keywords_conflict():
+    index = KeywordIndex()
+    index.add_many([
+        ("Best running shoes", brief("running shoes", "trail shoes", "shoe sizes")),
+        ("Running shoe guide", brief("running shoes", "trail shoes", "marathon")),
+        ("Baking bread", brief("sourdough", "bread flour")),
+    ])
+    index.add("Trail shoes", brief("trail shoes", "running shoes"))
+
+    conflicts = index.conflicts(threshold=0.6)
+    assert [set(conflict["titles"]) for conflict in conflicts] == [
+        {"Best running shoes", "Trail shoes"},
+        {"Running shoe guide", "Trail shoes"},
+        {"Best running shoes", "Running shoe guide"},
+    ]
+    assert conflicts[0]["score"] == 1.0
+    assert conflicts[0]["keywords"] == ["running shoes", "trail shoes"]
+    assert index.contested_keywords()[0]["briefs"] == 3
+
+    index.remove(["Trail shoes"])
+    assert [conflict["titles"] for conflict in index.conflicts(threshold=0.6)] == [
+        ("Best running shoes", "Running shoe guide")
+    ]
+
+def test_a_title_given_twice_keeps_one_row_with_its_last_brief():
+    index = KeywordIndex()
+    index.add_many([
+        ("Running shoes", brief("running shoes", "trail shoes")),
+        ("Other", brief("running shoes", "trail shoes")),
+        ("Running shoes", brief("sourdough", "bread flour")),
+    ])
+
+    assert len(index) == 2
+    assert index.conflicts() == []
+    assert sorted(set(index.table()["title"])) == ["Other", "Running shoes"]
+    assert "sourdough" in index.table()["keyword"]
+    assert index.contested_keywords() == []
@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from seo_engine import routing
+from seo_engine.generation import create_completion
+from seo_engine.routing import ModelRouter, get_model_router, set_model_router
+
+PRIMARY = "claude-3-haiku-20240307"
+FALLBACK = "claude-3-5-haiku-20241022"
+
+# The SDK warns about the fallback model's end-of-life date on every call.
+pytestmark = pytest.mark.filterwarnings("ignore::DeprecationWarning")
+
+@pytest.fixture
+def router(monkeypatch):
+    # One failed call makes a model unhealthy and one good call in two makes it healthy again.
+    monkeypatch.setattr(routing, "ROUTING_MIN_SAMPLES", 1)
+    monkeypatch.setattr(routing, "ROUTING_SLO_TARGET", 0.5)
+    monkeypatch.setattr(routing, "ROUTING_OVERLOAD_COOLDOWN_SECONDS", 0.2)
+    monkeypatch.setattr(routing, "ROUTING_PROBE_SECONDS", 0.5)
+    previous = get_model_router()
+    router = ModelRouter({"brief": {"model": PRIMARY, "max_tokens": 256, "slo_seconds": 30, "fallbacks": [FALLBACK]}})
+    set_model_router(router)
+    yield router
+    set_model_router(previous)
+
+def test_overloaded_primary_falls_back_until_a_probe_succeeds(fake_api, router):
+    server, client = fake_api(model_overload_rate={PRIMARY: 1.0})
+
+    def brief(n):
+        create_completion(client, f"Write brief {n}", 256, use_cache=False, kind="brief")
+        return server.stats["by_model"]
+
+    # The 529 hands the call to the fallback, and the primary is skipped while it cools down.
+    assert brief(1) == {PRIMARY: 1, FALLBACK: 1}
+    assert brief(2) == {PRIMARY: 1, FALLBACK: 2}
+
+    server.config.model_overload_rate = {}
+    time.sleep(0.3)
+    # Past the cooldown the primary is still unhealthy; its first probe waits one probe interval.
+    assert brief(3) == {PRIMARY: 1, FALLBACK: 3}
+    time.sleep(0.6)
+    assert brief(4) == {PRIMARY: 2, FALLBACK: 3}
+    # The probe succeeded, so the primary takes its route back.
+    assert brief(5) == {PRIMARY: 3, FALLBACK: 3}
@@ -0,0 +1,56 @@
+import threading
+import time
+
+from seo_engine.config import SCHEDULER_MAX_CONCURRENCY
+from seo_engine.scheduler import RequestScheduler
+
+def send(client):
+    return client.messages.create(
+        model="claude-3-haiku-20240307", max_tokens=64, messages=[{"role": "user", "content": "Hi"}]
+    )
+
+def test_retry_after_pauses_every_call(fake_api):
+    server, client = fake_api(throttle_rate=1.0, retry_after=0.5)
+    scheduler = RequestScheduler()
+    throttled_at = []
+    throttled = threading.Event()
+
+    def on_retry(error):
+        assert error.status_code == 429
+        throttled_at.append(time.monotonic())
+        server.config.throttle_rate = 0.0
+        throttled.set()
+
+    first = threading.Thread(target=scheduler.call, args=(lambda: send(client),), kwargs={"on_retry": on_retry})
+    first.start()
+    assert throttled.wait(5)
+    sent_at = []
+
+    def second():
+        sent_at.append(time.monotonic())
+        return send(client)
+
+    scheduler.call(second)
+    first.join(5)
+    assert sent_at[0] - throttled_at[0] >= 0.45
+    assert scheduler.stats()["throttled"] == 1
+    assert server.stats["requests"] == 3
+
+def test_throttling_halves_concurrency_then_recovers(fake_api):
+    server, client = fake_api(throttle_rate=1.0, retry_after=0.01)
+    scheduler = RequestScheduler()
+    retries = []
+
+    def on_retry(error):
+        retries.append(error)
+        if len(retries) == 2:
+            server.config.throttle_rate = 0.0
+
+    scheduler.call(lambda: send(client), on_retry=on_retry)
+    # Two 429s in a row halve the limit once: the cooldown keeps a burst of throttling from collapsing it.
+    assert scheduler.stats()["throttled"] == 2
+    assert SCHEDULER_MAX_CONCURRENCY / 2 <= scheduler.limit < SCHEDULER_MAX_CONCURRENCY / 2 + 1
+
+    for _ in range(SCHEDULER_MAX_CONCURRENCY * 4):
+        scheduler.call(lambda: send(client))
+    assert scheduler.limit == SCHEDULER_MAX_CONCURRENCY
@@ -0,0 +1,67 @@
+import zlib
+
+import pytest
+
+from seo_engine import store
+from seo_engine.store import BriefStore
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(store, "time", clock)
+    return clock
+
+def stored_size(text):
+    return len(zlib.compress(text.encode("utf-8"), store.COMPRESSION_LEVEL))
+
+def test_briefs_are_kept_compressed_per_session_and_survive_a_restart(tmp_path, clock):
+    path = str(tmp_path / "briefs.sqlite3")
+    briefs = BriefStore(path)
+    brief = "## Outline\n" + "- Feed the starter twice a day\n" * 200
+    assert briefs.put("session-1", "Sourdough", brief, {"seconds": 1.5}) == {"size": len(brief), "created_at": 1000.0}
+    clock.now += 1
+    briefs.put("session-1", "Rye", "## Outline\n- Rye")
+    briefs.put("session-2", "Sourdough", "Another session's brief")
+
+    assert briefs.stats()["stored_bytes"] < briefs.stats()["bytes"]
+    assert list(briefs.handles("session-1")) == ["Sourdough", "Rye"]
+
+    restarted = BriefStore(path)
+    assert restarted.get("session-1", "Sourdough") == brief
+    assert restarted.get("session-2", "Sourdough") == "Another session's brief"
+    assert list(restarted.records("session-1", ["Rye", "Missing", "Sourdough"])) == [
+        {"title": "Rye", "brief": "## Outline\n- Rye"},
+        {"title": "Sourdough", "brief": brief, "seconds": 1.5},
+    ]
+
+    restarted.delete("session-1", ["Rye"])
+    assert list(restarted.handles("session-1")) == ["Sourdough"]
+    restarted.delete("session-1")
+    assert restarted.handles("session-1") == {}
+    assert restarted.stats()["entries"] == 1
+
+def test_least_recently_used_briefs_are_evicted_over_max_bytes(tmp_path, clock):
+    briefs = BriefStore(str(tmp_path / "briefs.sqlite3"), max_bytes=2 * stored_size("aaaa"))
+    briefs.put("session", "a", "aaaa")
+    clock.now += 1
+    briefs.put("session", "b", "bbbb")
+    clock.now += 1
+    assert briefs.get("session", "a") == "aaaa"
+    clock.now += 1
+    briefs.put("session", "c", "cccc")
+    assert list(briefs.handles("session")) == ["a", "c"]
+    assert briefs.get("session", "b") is None
+
+def test_briefs_expire_after_max_age(tmp_path, clock):
+    briefs = BriefStore(str(tmp_path / "briefs.sqlite3"), max_age_seconds=60)
+    briefs.put("session", "old", "Old brief")
+    clock.now += 61
+    briefs.put("session", "new", "New brief")
+    assert list(briefs.handles("session")) == ["new"]
@@ -0,0 +1,65 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from seo_engine import get_telemetry
+from seo_engine.generation import create_completion
+from seo_engine.telemetry import Telemetry, call_cost
+
+MODEL = "claude-3-haiku-20240307"
+
+def usage(input_tokens=0, output_tokens=0, cache_write=0, cache_read=0):
+    return SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens,
+                           cache_creation_input_tokens=cache_write, cache_read_input_tokens=cache_read)
+
+def test_cost_uses_model_prices_and_the_batch_discount():
+    spent = usage(1_000_000, 1_000_000, 1_000_000, 1_000_000)
+    assert call_cost(MODEL, spent) == pytest.approx(0.25 + 1.25 + 0.30 + 0.03)
+    assert call_cost(MODEL, spent, batch=True) == pytest.approx(call_cost(MODEL, spent) / 2)
+    assert call_cost("unknown-model", spent) == 0.0
+
+def test_summary_totals_statuses_and_latency_percentiles(tmp_path):
+    telemetry = Telemetry(str(tmp_path / "calls.jsonl"))
+    for latency in (1.0, 2.0, 3.0, 4.0):
+        telemetry.record("brief", MODEL, usage=usage(100, 50), ttft=0.5, latency=latency, estimated_input_tokens=80)
+    telemetry.record("brief", MODEL, status="cached")
+    telemetry.record("brief", MODEL, status="error", error=TimeoutError("slow"), retries=2)
+    telemetry.record("brief", MODEL, status="abandoned", usage=usage(100))
+
+    summary = telemetry.summary()
+    assert summary["calls"] == 7
+    assert summary["api_calls"] == 6
+    assert summary["cached"] == 1
+    assert summary["errors"] == {"TimeoutError": 1}
+    assert summary["retries"] == 2
+    assert summary["tokens"]["input_tokens"] == 500
+    assert summary["cost_usd"] == pytest.approx(call_cost(MODEL, usage(500, 200)))
+    assert summary["abandoned_cost_usd"] == pytest.approx(call_cost(MODEL, usage(100)))
+    assert summary["token_estimates"] == {"calls": 4, "estimated": 320, "actual": 400, "ratio": 1.25}
+    brief = summary["by_kind"]["brief"]
+    assert brief["calls"] == {"ok": 4, "cached": 1, "error": 1, "abandoned": 1}
+    assert brief["latency"]["p50"] == pytest.approx(2.5)
+    assert brief["ttft"]["p99"] == pytest.approx(0.5)
+
+    text = telemetry.prometheus_text()
+    assert 'seo_planner_calls_total{kind="brief",status="ok"} 4' in text
+    assert 'seo_planner_errors_total{type="TimeoutError"} 1' in text
+    assert 'seo_planner_latency_seconds_count{kind="brief"} 4' in text
+
+    with open(tmp_path / "calls.jsonl", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [record["status"] for record in records] == ["ok"] * 4 + ["cached", "error", "abandoned"]
+    assert records[5]["error"] == "TimeoutError: slow"
+
+def test_streamed_calls_record_time_to_first_token(fake_api):
+    server, client = fake_api()
+    telemetry = get_telemetry()
+    telemetry.reset()
+    create_completion(client, "Telemetry test prompt", 64, use_cache=False, on_text=lambda chunk: None, kind="brief")
+    create_completion(client, "Telemetry test prompt", 64, kind="brief")
+
+    brief = telemetry.summary()["by_kind"]["brief"]
+    assert brief["calls"] == {"ok": 1, "cached": 1}
+    assert 0 < brief["ttft"]["p50"] <= brief["latency"]["p50"]
+    assert telemetry.summary()["tokens"]["output_tokens"] > 0
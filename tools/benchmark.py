@@ -0,0 +1,298 @@
+"""Reproducible benchmarks of the brief pipeline against the local fake API.
+
+    python tools/benchmark.py                          # quick suite, print results
+    python tools/benchmark.py --save tools/baselines/quick.json
+    python tools/benchmark.py --compare tools/baselines/quick.json --fail-on-regression
+
+Every scenario starts its own FakeAnthropicServer, seeded per request, so the
+same requests get the same latencies, injected 429s and stalls from run to
+run whatever the thread scheduling, and drives the seo_engine functions the
+app and CLI use, with the response cache bypassed. For each scenario the
+harness reports throughput, p50/p95/p99 latency from the engine's telemetry,
+hedged requests and billed tokens, the peak memory traced by tracemalloc and
+the process peak RSS. Requests cancelled on the way (hedge losers) are counted
+as abandoned, next to the part of the estimated cost they account for. A few
+scenarios also set engine options (see ENGINE_SETTINGS), e.g. to measure the
+stall scenarios with and without hedging.
+
+Results are written as JSON together with the Python version, platform and git
+commit they were measured on. --compare prints the change against a saved
+baseline and flags metrics that got worse by more than --threshold. Absolute
+numbers depend on the machine, so compare baselines recorded on the same one.
+
+Client-side rate limits are lifted (SEO_PLANNER_RPM / SEO_PLANNER_ITPM) unless
+already set, so scenarios measure the pipeline rather than the token buckets;
+the fake server's own --rpm limit and 429 injection exercise throttling.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("SEO_PLANNER_RPM", "1000000")
+os.environ.setdefault("SEO_PLANNER_ITPM", "1000000000")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from fake_anthropic import FakeAnthropicServer, FakeConfig  # noqa: E402
+from seo_engine import (  # noqa: E402
+    DEFAULT_GUIDELINES,
+    DEFAULT_TEMPLATE,
+    ResponseCache,
+    Hedger,
+    get_client_registry,
+    get_model_router,
+    get_telemetry,
+    request_briefs_concurrently,
+    request_briefs_in_batches,
+    request_many_strategies,
+    request_strategies,
+    set_hedger,
+    set_response_cache,
+)
+from seo_engine.config import HEDGE_MAX_RATE, MODEL_NAME  # noqa: E402
+from seo_engine.telemetry import INPUT_TOKEN_FIELDS  # noqa: E402
+
+SEED = 1234
+
+# Fake server settings shared by every scenario, overridden per scenario below.
+BASE_SERVER = {"latency": 0.2, "latency_sigma": 0.5, "tokens_per_second": 2000.0}
+
+# Scenario settings that configure the engine instead of the fake server, with their defaults.
+ENGINE_SETTINGS = {"hedge_max_rate": HEDGE_MAX_RATE}
+
+# name: (mode, titles, concurrency, fake server and engine settings)
+SUITES = {
+    "quick": {
+        "briefs-10x1": ("briefs", 10, 1, {}),
+        "briefs-10x5": ("briefs", 10, 5, {}),
+        "briefs-50x10": ("briefs", 50, 10, {}),
+        "briefs-50x10-stream": ("stream", 50, 10, {}),
+        "briefs-5x1-long": ("briefs", 5, 1, {"tokens_per_second": 300.0}),
+        "briefs-5x1-long-sections": ("sections", 5, 1, {"tokens_per_second": 300.0}),
+        "briefs-50x10-throttled": ("briefs", 50, 10, {"throttle_rate": 0.2, "retry_after": 0.2}),
+        "strategies-20x5": ("strategies", 20, 5, {}),
+        "briefs-50x10-overloaded-primary": ("briefs", 50, 10, {"model_overload_rate": {MODEL_NAME: 0.5}}),
+        "briefs-100x10-stream-stalls": ("stream", 100, 10, {"stall_rate": 0.05, "stall_seconds": 10.0,
+                                                            "hedge_max_rate": 0.1}),
+        "briefs-100x10-stream-stalls-unhedged": ("stream", 100, 10, {"stall_rate": 0.05, "stall_seconds": 10.0,
+                                                                     "hedge_max_rate": 0.0}),
+        "batch-50": ("batch", 50, 5, {"batch_latency": 1.0, "batch_error_rate": 0.1}),
+    },
+    "full": {
+        "briefs-100x1": ("briefs", 100, 1, {}),
+        "briefs-100x5": ("briefs", 100, 5, {}),
+        "briefs-100x10": ("briefs", 100, 10, {}),
+        "briefs-500x10": ("briefs", 500, 10, {}),
+        "briefs-500x10-stream": ("stream", 500, 10, {}),
+        "briefs-100x10-sections": ("sections", 100, 10, {}),
+        "briefs-500x10-stream-slow-tail": ("stream", 500, 10, {"latency_sigma": 1.2}),
+        "briefs-500x10-stream-slow-tail-unhedged": ("stream", 500, 10, {"latency_sigma": 1.2, "hedge_max_rate": 0.0}),
+        "briefs-500x10-stream-stalls": ("stream", 500, 10, {"stall_rate": 0.02, "stall_seconds": 30.0}),
+        "briefs-500x10-throttled": ("briefs", 500, 10, {"throttle_rate": 0.2, "retry_after": 0.2}),
+        "briefs-500x10-rpm": ("briefs", 500, 10, {"requests_per_minute": 600, "retry_after": 0.5}),
+        "strategies-50x10": ("strategies", 50, 10, {}),
+        "strategies-200-sharded": ("sharded", 200, 8, {}),
+        "batch-1000": ("batch", 1000, 10, {"batch_latency": 2.0, "batch_error_rate": 0.05}),
+    }
+}
+
+# Metrics where a higher value is a regression; throughput is the other way round.
+LOWER_IS_BETTER = ("wall_seconds", "latency_p50", "latency_p95", "latency_p99", "ttft_p95", "peak_traced_mb")
+HIGHER_IS_BETTER = ("throughput_per_second",)
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_workload(mode, count, concurrency, api_key):
+    """Run one scenario's workload; returns (completed, failed)."""
+    client = get_client_registry().get(api_key)
+    titles = [f"Benchmark title {i}" for i in range(count)]
+
+    if mode == "strategies":
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(request_strategies, client, "", DEFAULT_GUIDELINES, use_cache=False)
+                for _ in range(count)
+            ]
+        failed = sum(1 for future in futures if future.exception() is not None)
+        return count - failed, failed
+
+    if mode == "sharded":
+        ranked = request_many_strategies(client, "", DEFAULT_GUIDELINES, count, max_workers=concurrency, use_cache=False)
+        return len(ranked), count - len(ranked)
+
+    if mode == "batch":
+        results = request_briefs_in_batches(
+            client, titles, DEFAULT_TEMPLATE, DEFAULT_GUIDELINES, use_cache=False, retry_workers=concurrency,
+            poll_interval=0.25, max_poll_interval=1.0
+        )
+    else:
+        results = request_briefs_concurrently(
+            client, titles, DEFAULT_TEMPLATE, DEFAULT_GUIDELINES, concurrency, use_cache=False,
+            on_text=(lambda title, chunk: None) if mode == "stream" else None, by_sections=mode == "sections"
+        )
+    failed = sum(1 for _, _, error in results if error)
+    return count - failed, failed
+
+def run_scenario(name, mode, count, concurrency, settings):
+    engine = {key: settings.get(key, default) for key, default in ENGINE_SETTINGS.items()}
+    server_settings = {key: value for key, value in settings.items() if key not in ENGINE_SETTINGS}
+    config = FakeConfig(seed=SEED, **{**BASE_SERVER, **server_settings})
+    telemetry = get_telemetry()
+    telemetry.reset()
+    get_model_router().reset()
+    set_hedger(Hedger(max_rate=engine["hedge_max_rate"]))
+    with FakeAnthropicServer(config) as server:
+        os.environ["ANTHROPIC_BASE_URL"] = server.url
+        tracemalloc.start()
+        started = time.perf_counter()
+        completed, failed = run_workload(mode, count, concurrency, api_key=f"benchmark-{name}-{time.time_ns()}")
+        wall = time.perf_counter() - started
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        server_stats = server.stats
+
+    summary = telemetry.summary()
+    kind = {"strategies": "strategy", "sharded": "strategy_shard", "sections": "brief_section"}.get(mode, "brief")
+    latency = summary["by_kind"].get(kind, {}).get("latency", {})
+    ttft = summary["by_kind"].get(kind, {}).get("ttft", {})
+    return {
+        "mode": mode,
+        "titles": count,
+        "concurrency": concurrency,
+        "server": server_settings,
+        "engine": engine,
+        "completed": completed,
+        "failed": failed,
+        "wall_seconds": round(wall, 3),
+        "throughput_per_second": round(completed / wall, 3) if wall else None,
+        "latency_p50": round(latency["p50"], 3) if latency else None,
+        "latency_p95": round(latency["p95"], 3) if latency else None,
+        "latency_p99": round(latency["p99"], 3) if latency else None,
+        "ttft_p95": round(ttft["p95"], 3) if ttft else None,
+        "retries": summary["retries"],
+        "hedged": sum(counts["hedged"] for counts in summary["hedges"].values()),
+        "abandoned": sum(stats["calls"].get("abandoned", 0) for stats in summary["by_kind"].values()),
+        "cost_usd": round(summary["cost_usd"], 6),
+        "abandoned_cost_usd": round(summary["abandoned_cost_usd"], 6),
+        "input_tokens": sum(summary["tokens"][field] for field in INPUT_TOKEN_FIELDS),
+        "output_tokens": summary["tokens"]["output_tokens"],
+        "peak_traced_mb": round(peak_traced / (1024 * 1024), 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "server_stats": server_stats
+    }
+
+def warm_up():
+    """Exercise every code path once so lazy imports and first connections are not measured."""
+    with FakeAnthropicServer(FakeConfig(seed=SEED, **{**BASE_SERVER, "batch_latency": 0.1})) as server:
+        os.environ["ANTHROPIC_BASE_URL"] = server.url
+        for mode in ("briefs", "stream", "sections", "strategies", "sharded", "batch"):
+            run_workload(mode, 2, 2, api_key=f"benchmark-warm-up-{time.time_ns()}")
+
+def compare(results, baseline, threshold):
+    """Print per-metric changes against baseline; returns the list of regressions."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            print(f"{name}: no baseline")
+            continue
+        changes = []
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            new, old = result.get(metric), base.get(metric)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if metric in LOWER_IS_BETTER else change < -threshold
+            if worse:
+                regressions.append((name, metric, old, new))
+            changes.append(f"{metric} {old:g} -> {new:g} ({change:+.0%}){' REGRESSION' if worse else ''}")
+        print(f"{name}:\n  " + "\n  ".join(changes))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument("--scenario", action="append", help="run only these scenarios of the suite (repeatable)")
+    parser.add_argument("--save", help="write the results as a JSON baseline to this path")
+    parser.add_argument("--compare", help="baseline JSON to compare the results with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on regressions")
+    args = parser.parse_args()
+
+    scenarios = SUITES[args.suite]
+    unknown = set(args.scenario or ()) - set(scenarios)
+    if unknown:
+        parser.error(f"unknown scenario(s) for suite {args.suite}: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Keep the benchmark's responses out of the real cache; every call bypasses it anyway.
+        set_response_cache(ResponseCache(os.path.join(cache_dir, "responses.sqlite3")))
+        warm_up()
+        results = {}
+        for name, (mode, count, concurrency, settings) in scenarios.items():
+            if args.scenario and name not in args.scenario:
+                continue
+            print(f"Running {name}...", file=sys.stderr)
+            results[name] = result = run_scenario(name, mode, count, concurrency, settings)
+            print(
+                f"  {result['completed']}/{result['titles']} in {result['wall_seconds']:.2f}s · "
+                f"{result['throughput_per_second']}/s · p50 {result['latency_p50']}s p95 {result['latency_p95']}s "
+                f"p99 {result['latency_p99']}s · {result['retries']} retries · {result['hedged']} hedged · "
+                f"peak {result['peak_traced_mb']} MB traced",
+                file=sys.stderr
+            )
+
+    report = {
+        "suite": args.suite,
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": SEED,
+        "scenarios": results
+    }
+    if args.save:
+        directory = os.path.dirname(args.save)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Saved {args.save}", file=sys.stderr)
+    if not args.save and not args.compare:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}", file=sys.stderr)
+            if args.fail_on_regression:
+                return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
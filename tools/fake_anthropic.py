@@ -0,0 +1,551 @@
+"""Local stand-in for the Anthropic Messages API, for load and failure testing.
+
+Run it and point the app at it:
+
+    python tools/fake_anthropic.py --port 8787 --throttle-rate 0.2
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8787 streamlit run app.py
+
+Any API key is accepted. POST /v1/messages answers both plain and streamed
+(SSE) requests with synthetic titles or briefs after a configurable latency,
+and can inject 429 rate-limit and 529 overload errors, randomly or by
+enforcing a real requests-per-minute limit. Message Batches are supported
+too: a batch ends after a fixed processing time, and individual items can be
+made to fail. Latency and the overload rate can be set per model, which is
+how model routing fallbacks are exercised. A share of requests can be made to
+stall before their first token, as a hung connection would, to exercise
+deadlines and hedged requests; a client that hangs up is counted as a
+disconnect. Requests that force a tool with tool_choice get a tool_use block
+with made-up input for the app's record_shards and record_titles tools.
+GET /stats returns request counters, also per model, as JSON.
+
+Every random choice about a request (faults, latency, content) comes from a
+generator seeded with --seed, the request's parameters and how many times
+the same parameters were sent before, so a seeded run injects the same faults
+into the same requests whatever order the threads happen to run in.
+
+The server can also be started in-process with FakeAnthropicServer, which is
+what the benchmarks use.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TITLE_WORDS = (
+    "match-day volatility", "fan token momentum", "low-correlation assets", "swing setups",
+    "liquidity windows", "staking rewards", "exchange listings", "derby sentiment",
+    "transfer rumours", "cup-run rallies", "order book depth", "risk management"
+)
+SYLLABLES = ("ka", "lo", "mir", "ven", "tos", "ra", "qui", "del", "ban", "zu", "fe", "nor", "pi", "sak", "gul", "te")
+
+class FakeConfig:
+    """Behaviour knobs of the fake server. All times are in seconds."""
+
+    def __init__(self, latency=0.3, latency_sigma=0.5, tokens_per_second=400.0, output_tokens=600,
+                 throttle_rate=0.0, overload_rate=0.0, retry_after=1.0, requests_per_minute=0, batch_latency=2.0,
+                 batch_error_rate=0.0, model_latency=None, model_overload_rate=None, stall_rate=0.0,
+                 stall_seconds=30.0, seed=None):
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.throttle_rate = throttle_rate
+        self.overload_rate = overload_rate
+        self.retry_after = retry_after
+        self.requests_per_minute = requests_per_minute
+        self.batch_latency = batch_latency
+        self.batch_error_rate = batch_error_rate
+        # {model: median time to first token / probability of a 529}, overriding latency and overload_rate.
+        self.model_latency = model_latency or {}
+        self.model_overload_rate = model_overload_rate or {}
+        # Probability that a request stalls for stall_seconds before its first token.
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.seed = seed
+
+class FakeState:
+    """Counters and the prompt-cache / rate-limit bookkeeping shared by all handler threads."""
+
+    def __init__(self, config):
+        self.config = config
+        self.seed = config.seed if config.seed is not None else uuid.uuid4().hex
+        self.lock = threading.Lock()
+        self.sent = {}
+        self.cached_prefixes = set()
+        self.window = []
+        self.batches = {}
+        self.model_requests = {}
+        self.counters = {
+            "requests": 0, "streamed": 0, "throttled": 0, "overloaded": 0, "stalled": 0, "disconnected": 0,
+            "succeeded": 0, "batches": 0, "batch_requests": 0, "batch_errored": 0
+        }
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def count_model(self, model):
+        with self.lock:
+            self.model_requests[model] = self.model_requests.get(model, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            return {**self.counters, "by_model": dict(self.model_requests)}
+
+    def request_random(self, params):
+        """The random generator of one request, from the seed, its parameters and how often they were sent."""
+        digest = hashlib.sha256(json.dumps(
+            {name: value for name, value in params.items() if name != "stream"}, sort_keys=True
+        ).encode("utf-8")).hexdigest()
+        with self.lock:
+            sent = self.sent[digest] = self.sent.get(digest, 0) + 1
+        return random.Random(f"{self.seed}:{digest}:{sent}")
+
+    def first_token_delay(self, rng, model=None):
+        latency = self.config.model_latency.get(model, self.config.latency)
+        return latency * rng.lognormvariate(0, self.config.latency_sigma)
+
+    def over_rate_limit(self):
+        limit = self.config.requests_per_minute
+        if not limit:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            self.window = [t for t in self.window if now - t < 60]
+            if len(self.window) >= limit:
+                return True
+            self.window.append(now)
+            return False
+
+    def build_message(self, body, rng):
+        """The Message object answering a /v1/messages request body, made up with rng."""
+        system_text = flatten_text(body.get("system"))
+        prompt = "".join(flatten_text(message.get("content")) for message in body.get("messages", []))
+        tool_choice = body.get("tool_choice") or {}
+        if tool_choice.get("type") == "tool":
+            tool_input = fake_tool_input(tool_choice["name"], prompt, rng)
+            text = json.dumps(tool_input)
+            content = [{"type": "tool_use", "id": f"toolu_fake_{uuid.uuid4().hex[:16]}",
+                        "name": tool_choice["name"], "input": tool_input}]
+        else:
+            text = fake_completion(prompt, self.config.output_tokens, rng)
+            content = [{"type": "text", "text": text}]
+        cache_write, cache_read = self.cache_usage(system_text)
+        return {
+            "id": f"msg_fake_{uuid.uuid4().hex[:16]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "fake-model"),
+            "content": content,
+            "stop_reason": "tool_use" if tool_choice.get("type") == "tool" else "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": len(prompt) // 4 + (len(system_text) // 4 - cache_write - cache_read),
+                "output_tokens": max(1, len(text) // 4),
+                "cache_creation_input_tokens": cache_write,
+                "cache_read_input_tokens": cache_read
+            }
+        }
+
+    def create_batch(self, requests):
+        batch = FakeBatch(requests, self.config.batch_latency)
+        with self.lock:
+            self.batches[batch.id] = batch
+            self.counters["batches"] += 1
+            self.counters["batch_requests"] += len(requests)
+        return batch
+
+    def get_batch(self, batch_id):
+        with self.lock:
+            batch = self.batches.get(batch_id)
+        if batch is not None:
+            batch.process(self)
+        return batch
+
+    def cache_usage(self, system_text):
+        """Emulate prompt caching: the first request with a system prefix writes it, later ones read it."""
+        tokens = len(system_text) // 4
+        if not tokens:
+            return 0, 0
+        digest = hashlib.sha256(system_text.encode("utf-8")).hexdigest()
+        with self.lock:
+            if digest in self.cached_prefixes:
+                return 0, tokens
+            self.cached_prefixes.add(digest)
+            return tokens, 0
+
+def utc_timestamp(moment=None):
+    return (moment or datetime.now(timezone.utc)).isoformat().replace("+00:00", "Z")
+
+class FakeBatch:
+    """A Message Batch that ends latency seconds after creation (or when cancelled)."""
+
+    def __init__(self, requests, latency):
+        self.id = f"msgbatch_fake_{uuid.uuid4().hex[:16]}"
+        self.requests = requests
+        self.created_at = datetime.now(timezone.utc)
+        self.ends_at = time.monotonic() + latency
+        self.ended_at = None
+        self.cancel_initiated_at = None
+        self.results = None
+        self._lock = threading.Lock()
+
+    def process(self, state):
+        """Produce the results once the processing time is over."""
+        with self._lock:
+            if self.results is not None or time.monotonic() < self.ends_at:
+                return
+            results = []
+            for request in self.requests:
+                rng = state.request_random(request["params"])
+                if self.cancel_initiated_at:
+                    result = {"type": "canceled"}
+                elif rng.random() < state.config.batch_error_rate:
+                    state.count("batch_errored")
+                    result = {"type": "errored", "error": {
+                        "type": "error", "error": {"type": "api_error", "message": "Fake batch item failure"}
+                    }}
+                else:
+                    result = {"type": "succeeded", "message": state.build_message(request["params"], rng)}
+                results.append({"custom_id": request["custom_id"], "result": result})
+            self.results = results
+            self.ended_at = utc_timestamp()
+
+    def cancel(self, state):
+        with self._lock:
+            if self.results is None and not self.cancel_initiated_at:
+                self.cancel_initiated_at = utc_timestamp()
+                self.ends_at = time.monotonic()
+        self.process(state)
+
+    def to_json(self, base_url):
+        counts = dict.fromkeys(("processing", "succeeded", "errored", "canceled", "expired"), 0)
+        if self.results is None:
+            counts["processing"] = len(self.requests)
+        else:
+            for item in self.results:
+                counts[item["result"]["type"]] += 1
+        return {
+            "id": self.id,
+            "type": "message_batch",
+            "processing_status": "ended" if self.results is not None else "in_progress",
+            "request_counts": counts,
+            "created_at": utc_timestamp(self.created_at),
+            "expires_at": utc_timestamp(self.created_at + timedelta(hours=24)),
+            "ended_at": self.ended_at,
+            "cancel_initiated_at": self.cancel_initiated_at,
+            "archived_at": None,
+            "results_url": f"{base_url}/v1/messages/batches/{self.id}/results" if self.results is not None else None
+        }
+
+def flatten_text(content):
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content or [] if isinstance(block, dict))
+
+def fake_completion(prompt, output_tokens, rng):
+    """Numbered titles for strategy prompts, anchors or one section for section-by-section
+    briefs, and a templated brief for everything else."""
+    if "Reply with EXACTLY these four lines" in prompt:
+        topic = rng.choice(TITLE_WORDS)
+        return (
+            f"H1: {topic.title()} Playbook\nSlug: {topic.replace(' ', '-')}-playbook\n"
+            f"Primary keyword: {topic}\nSecondary keywords: {', '.join(rng.sample(TITLE_WORDS, 3))}"
+        )
+    if 'Write ONLY the "## ' in prompt:
+        heading = prompt.split('Write ONLY the "## ', 1)[1].split('"', 1)[0]
+        body = " ".join(rng.choice(TITLE_WORDS) for _ in range(max(1, output_tokens // 15)))
+        return f"## {heading}\n- {body}"
+    if "numbered list" in prompt:
+        count = 10
+        for word in prompt.split():
+            if word.isdigit():
+                count = int(word)
+                break
+        return "\n".join(
+            f"{i}. {rng.choice(TITLE_WORDS).title()}: {rng.choice(TITLE_WORDS)} playbook #{rng.randint(1, 10 ** 6)}"
+            for i in range(1, count + 1)
+        )
+
+    words = [rng.choice(TITLE_WORDS) for _ in range(max(1, output_tokens // 3))]
+    body = " ".join(words)
+    return (
+        "## Metadatos\n- Target Audience: Traders\n- Tone: Authoritative\n- Goal: Rank\n\n"
+        "## Article Structure\n- H1: Fake brief\n- Slug URL: fake-brief\n\n"
+        f"## Content Outline (Detailed)\n- H2: Overview\n  - {body}\n\n"
+        "## Keywords Table\n| Keyword | Volume | Notes |\n|---|---|---|\n"
+        f"| {rng.choice(TITLE_WORDS)} | {rng.randint(100, 9000)} | primary |\n\n"
+        "## LLM Optimization Notes\n- Keep paragraphs short."
+    )
+
+def fake_word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(3)).capitalize()
+
+def fake_tool_input(name, prompt, rng):
+    """Input for a forced tool call: shards for record_shards, scored titles for record_titles."""
+    count = 10
+    if "EXACTLY " in prompt:
+        word = prompt.split("EXACTLY ", 1)[1].split(None, 1)[0]
+        count = int(word) if word.isdigit() else count
+    if name == "record_shards":
+        return {"shards": [
+            {"name": f"{topic.title()} {i + 1}", "focus": f"Titles about {topic} for level {i + 1} readers."}
+            for i, topic in enumerate(rng.choice(TITLE_WORDS) for _ in range(count))
+        ]}
+    return {"titles": [
+        {
+            "title": f"{rng.choice(TITLE_WORDS).title()} for {fake_word(rng)} {fake_word(rng)} readers",
+            "primary_keyword": rng.choice(TITLE_WORDS),
+            "score": rng.randint(1, 10)
+        }
+        for _ in range(count)
+    ]}
+
+def split_tokens(text, size=12):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+class FakeAnthropicHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeAnthropic/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    @property
+    def base_url(self):
+        return f"http://{self.headers.get('host')}"
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        parts = path.split("/")
+        if path == "/stats":
+            self._send_json(200, self.state.snapshot())
+        elif path.startswith("/v1/messages/batches/") and len(parts) in (5, 6):
+            batch = self.state.get_batch(parts[4])
+            if batch is None:
+                self._send_error(404, "not_found_error", f"No batch {parts[4]}")
+            elif len(parts) == 5:
+                self._send_json(200, batch.to_json(self.base_url))
+            elif parts[5] == "results" and batch.results is not None:
+                self._send_jsonl(batch.results)
+            else:
+                self._send_error(404, "not_found_error", f"No route for GET {self.path}")
+        else:
+            self._send_error(404, "not_found_error", f"No route for GET {self.path}")
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.split("?")[0].rstrip("/")
+        parts = path.split("/")
+        if path == "/v1/messages":
+            self._handle_message(body)
+        elif path == "/v1/messages/batches":
+            batch = self.state.create_batch(body.get("requests", []))
+            self._send_json(200, batch.to_json(self.base_url))
+        elif path.startswith("/v1/messages/batches/") and len(parts) == 6 and parts[5] == "cancel":
+            batch = self.state.get_batch(parts[4])
+            if batch is None:
+                self._send_error(404, "not_found_error", f"No batch {parts[4]}")
+            else:
+                batch.cancel(self.state)
+                self._send_json(200, batch.to_json(self.base_url))
+        else:
+            self._send_error(404, "not_found_error", f"No route for POST {self.path}")
+
+    def _handle_message(self, body):
+        state = self.state
+        config = state.config
+        state.count("requests")
+        state.count_model(body.get("model"))
+        rng = state.request_random(body)
+
+        if state.over_rate_limit() or rng.random() < config.throttle_rate:
+            state.count("throttled")
+            self._send_error(429, "rate_limit_error", "Fake rate limit exceeded",
+                             {"retry-after": f"{config.retry_after:g}"})
+            return
+        if rng.random() < config.model_overload_rate.get(body.get("model"), config.overload_rate):
+            state.count("overloaded")
+            self._send_error(529, "overloaded_error", "Fake overload")
+            return
+
+        message = state.build_message(body, rng)
+        stall = config.stall_seconds if config.stall_rate and rng.random() < config.stall_rate else 0.0
+        if stall:
+            state.count("stalled")
+        try:
+            if body.get("stream") and message["content"][0]["type"] == "text":
+                state.count("streamed")
+                self._stream(message, state.first_token_delay(rng, body.get("model")) + stall)
+            else:
+                time.sleep(state.first_token_delay(rng, body.get("model")) + stall)
+                time.sleep(message["usage"]["output_tokens"] / config.tokens_per_second)
+                self._send_json(200, message)
+        except (BrokenPipeError, ConnectionResetError):
+            state.count("disconnected")
+            self.close_connection = True
+            return
+        state.count("succeeded")
+
+    def _stream(self, message, first_token_delay):
+        config = self.state.config
+        text = message["content"][0]["text"]
+        chunks = split_tokens(text)
+        delay = (message["usage"]["output_tokens"] / config.tokens_per_second) / max(1, len(chunks))
+
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("cache-control", "no-cache")
+        self.send_header("connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        start = dict(message, content=[], stop_reason=None, usage=dict(message["usage"], output_tokens=1))
+        self._event("message_start", {"type": "message_start", "message": start})
+        time.sleep(first_token_delay)
+        self._event("content_block_start", {
+            "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}
+        })
+        for chunk in chunks:
+            self._event("content_block_delta", {
+                "type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}
+            })
+            time.sleep(delay)
+        self._event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._event("message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+            "usage": {"output_tokens": message["usage"]["output_tokens"]}
+        })
+        self._event("message_stop", {"type": "message_stop"})
+
+    def _event(self, name, data):
+        self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_jsonl(self, records):
+        data = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        self.send_response(200)
+        self.send_header("content-type", "application/binary")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status, error_type, message, headers=None):
+        self._send_json(status, {"type": "error", "error": {"type": error_type, "message": message}}, headers)
+
+class FakeAnthropicServer:
+    """Runs the fake API on a background thread; usable as a context manager.
+
+        with FakeAnthropicServer(FakeConfig(throttle_rate=0.2)) as server:
+            client = anthropic.Anthropic(api_key="test", base_url=server.url)
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FakeConfig()
+        self.httpd = ThreadingHTTPServer((host, port), FakeAnthropicHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = FakeState(self.config)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self):
+        return self.httpd.state.snapshot()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-anthropic", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def parse_model_values(parser, items):
+    """{model: float} from MODEL=VALUE arguments."""
+    values = {}
+    for item in items:
+        model, _, value = item.rpartition("=")
+        try:
+            values[model] = float(value)
+        except ValueError:
+            parser.error(f"expected MODEL=NUMBER, got {item!r}")
+        if not model:
+            parser.error(f"expected MODEL=NUMBER, got {item!r}")
+    return values
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.3, help="median time to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal spread of the latency")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--output-tokens", type=int, default=600, help="approximate brief length")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="probability of a 429 response")
+    parser.add_argument("--overload-rate", type=float, default=0.0, help="probability of a 529 response")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry-after header sent with 429s")
+    parser.add_argument("--rpm", type=int, default=0, help="enforce a requests-per-minute limit with 429s")
+    parser.add_argument("--batch-latency", type=float, default=2.0, help="processing time of a Message Batch")
+    parser.add_argument("--batch-error-rate", type=float, default=0.0, help="probability of an errored batch item")
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=SECONDS",
+                        help="median time to first token for one model (repeatable)")
+    parser.add_argument("--model-overload-rate", action="append", default=[], metavar="MODEL=RATE",
+                        help="probability of a 529 response for one model (repeatable)")
+    parser.add_argument("--stall-rate", type=float, default=0.0,
+                        help="probability that a request stalls before its first token")
+    parser.add_argument("--stall-seconds", type=float, default=30.0, help="how long a stalled request hangs")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = FakeConfig(
+        latency=args.latency, latency_sigma=args.latency_sigma, tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens, throttle_rate=args.throttle_rate, overload_rate=args.overload_rate,
+        retry_after=args.retry_after, requests_per_minute=args.rpm, batch_latency=args.batch_latency,
+        batch_error_rate=args.batch_error_rate, model_latency=parse_model_values(parser, args.model_latency),
+        model_overload_rate=parse_model_values(parser, args.model_overload_rate), stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds, seed=args.seed
+    )
+    server = FakeAnthropicServer(config, args.host, args.port)
+    print(f"Fake Anthropic API listening on {server.url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Import-time and memory profile of a cold start of the app or of one module.
+
+    python tools/import_profile.py                        # first run of app.py
+    python tools/import_profile.py --module seo_engine    # a bare import
+    python tools/import_profile.py --forbid anthropic --forbid pandas
+
+Each profile runs in a fresh interpreter with -X importtime, the way a new
+container or worker process would start. The report lists the total time,
+the process peak RSS, the packages that cost the most import time (self time
+summed per top-level package) and which of the known heavy dependencies got
+loaded. The app is run once, without an API key, through Streamlit's AppTest,
+which is what the first page view of a new session costs; AppTest itself is
+imported before the clock starts.
+
+--forbid exits with status 1 if the named module is loaded, so a dependency
+that creeps back into the startup path fails CI.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("anthropic", "httpx", "pandas", "numpy", "scipy", "openpyxl", "pyarrow")
+
+CHILD = """
+import json, resource, sys, time
+{setup}
+started = time.perf_counter()
+{body}
+seconds = time.perf_counter() - started
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "seconds": seconds,
+    "peak_rss_mb": peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024,
+    "modules": sorted(sys.modules)
+}}))
+"""
+
+APP_SETUP = "from streamlit.testing.v1 import AppTest"
+APP_BODY = "AppTest.from_file({path!r}, default_timeout=120).run()"
+
+def parse_importtime(stderr):
+    """(package, self microseconds) pairs from -X importtime output, summed per top-level package."""
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_time, _, name = line[len("import time:"):].split("|", 2)
+        if not self_time.strip().isdigit():
+            continue
+        totals[name.strip().split(".")[0]] += int(self_time)
+    return sorted(totals.items(), key=lambda item: -item[1])
+
+def profile(setup, body):
+    code = CHILD.format(setup=setup, body=body)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"Profiled process failed:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["packages"] = parse_importtime(completed.stderr)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", help="profile `import MODULE` instead of a first run of app.py")
+    parser.add_argument("--top", type=int, default=12, help="how many packages to list")
+    parser.add_argument("--forbid", action="append", default=[], help="fail if this module gets loaded (repeatable)")
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    args = parser.parse_args()
+
+    if args.module:
+        target = f"import {args.module}"
+        result = profile("", f"import {args.module}")
+    else:
+        target = "first run of app.py"
+        result = profile(APP_SETUP, APP_BODY.format(path=os.path.join(REPO_ROOT, "app.py")))
+    loaded = set(result["modules"])
+
+    if args.json:
+        print(json.dumps({key: value for key, value in result.items() if key != "modules"}, indent=2))
+    else:
+        print(f"{target}: {result['seconds']:.2f}s, peak RSS {result['peak_rss_mb']:.0f} MB")
+        print("Slowest packages to import (self time):")
+        for package, micros in result["packages"][:args.top]:
+            print(f"  {micros / 1000:8.1f} ms  {package}")
+        print("Heavy modules loaded: " + (", ".join(m for m in HEAVY_MODULES if m in loaded) or "none"))
+
+    forbidden = [module for module in args.forbid if module in loaded]
+    if forbidden:
+        print(f"Forbidden modules loaded: {', '.join(forbidden)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())